@@ -3,17 +3,28 @@ import logging
 
 from fastapi import APIRouter, Request
 
+from app.services.bookings import add_booking
 from app.services.calendar import build_calendar_link
-from app.services.elevenlabs_call import fetch_conversation_details, pop_call
-from app.services.messages import format_call_failed, format_multi_call_update, format_ranked_results, format_summary_message, generate_smart_summary
-from app.services.ranking import rank_results
-from app.services.state import ConversationStatus, MultiCallCampaign, MultiCallProvider, find_state_by_conversation_id
+from app.services.call_screening import CallScreeningOutcome, is_machine, pop_outcome
+from app.services.elevenlabs_call import fetch_conversation_details, get_conversation_id, pop_call
+from app.services.messages import SmartSummaryResult, format_call_failed, format_call_screened, format_multi_call_update, format_ranked_results, format_summary_message, generate_smart_summary
+from app.services.metrics import SUMMARY_ERRORS, SUMMARY_SECONDS, timed
+from app.services.persistence import call_duration, record_appointment, transcript_text, update_appointment_request, update_call
+from app.services.preferences import parse_slot
+from app.services.provider_lines import release_call
+from app.services.ranking import rank_campaign
+from app.services.reputation import mark_answered, record_outcome
+from app.services.state import ConversationState, ConversationStatus, MultiCallCampaign, MultiCallProvider, end_request_trace, find_state_by_conversation_id
+from app.services.tracing import bound_span, span_for, start_span, unbind
 from app.services.twilio import send_whatsapp_message
+from app.services.user_lock import best_effort_user_lock
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["callbacks"])
 
+_TERMINAL_STATUSES = ("completed", "failed", "busy", "no-answer", "canceled")
+
 
 def _find_campaign_provider(campaign: MultiCallCampaign, call_sid: str, conversation_id: str | None) -> MultiCallProvider | None:
     """Match a call to its campaign provider by call_sid or conversation_id."""
@@ -25,6 +36,96 @@ def _find_campaign_provider(campaign: MultiCallCampaign, call_sid: str, conversa
     return None
 
 
+def _persist_call_result(
+    phone: str, call_log_id, conversation_id: str | None, name: str, conv_data: dict | None, summary: SmartSummaryResult | None,
+) -> None:
+    """Queue the finished call (and its appointment, if booked) for the database."""
+    update_call(
+        call_log_id,
+        status="completed",
+        duration_seconds=call_duration(conv_data) if conv_data else None,
+        transcript=transcript_text(conv_data) if conv_data else None,
+        outcome=summary.summary_text if summary else None,
+    )
+    if summary and summary.booking_confirmed:
+        record_appointment(
+            call_log_id, summary.provider_name or name, summary.date, summary.time,
+            address=summary.address, notes=summary.notes, duration_minutes=summary.duration_minutes,
+        )
+        start = parse_slot(summary.date or "", summary.time or "")
+        if start is not None:
+            add_booking(phone, call_log_id or conversation_id, start, summary.duration_minutes, summary.provider_name or name)
+
+
+def _record_completed_call(
+    phone: str | None, call_sid: str, place_id: str | None, conv_data: dict | None, summary: SmartSummaryResult | None
+) -> None:
+    """Fold a completed (not screened) call into the provider's reputation, by who actually picked up.
+
+    Only a summary read from the call's transcript says that; without one the
+    call counts as "unknown" and leaves the rates alone.
+    """
+    outcome = summary.outcome if conv_data and summary else "unknown"
+    record_outcome(
+        phone, outcome, call_sid, place_id=place_id,
+        booked=bool(summary and summary.booking_confirmed),
+        no_availability=bool(summary and summary.no_availability),
+        duration_seconds=call_duration(conv_data) if conv_data else None,
+    )
+
+
+def _finish_campaign_request(state: ConversationState) -> None:
+    """Final status of the appointment request once every campaign call is done."""
+    results = state.multi_call.results
+    if any(r.get("summary") and r["summary"].booking_confirmed for r in results):
+        status = "booked"
+    elif any(r["outcome"] == "completed" for r in results):
+        status = "completed"
+    else:
+        status = "failed"
+    update_appointment_request(state.appointment_request_id, status)
+
+
+async def finish_campaign(phone: str, state: ConversationState, lang: str) -> None:
+    """Close a campaign whose calls are all done: ranked results, request status and calendar link."""
+    ranked = rank_campaign(state)
+    msg = format_ranked_results(ranked, language=lang)
+    await send_whatsapp_message(phone, msg)
+    _finish_campaign_request(state)
+
+    # Calendar link for best confirmed booking
+    best_booked = next(
+        (r for r in ranked if r.get("summary") and r["summary"].booking_confirmed),
+        None,
+    )
+    if best_booked and best_booked["summary"].date and best_booked["summary"].time:
+        s = best_booked["summary"]
+        provider = s.provider_name or best_booked["provider_name"]
+        service = s.service_description or ("Turno" if lang == "es" else "Appointment")
+        cal_title = f"{service} - {provider}"
+        cal_desc_parts = []
+        if s.notes:
+            cal_desc_parts.append(s.notes)
+        if best_booked.get("phone"):
+            cal_desc_parts.append(f"Tel: {best_booked['phone']}")
+        cal_desc_parts.append("Reservado por Vocero" if lang == "es" else "Booked by Vocero")
+        cal_link = build_calendar_link(
+            summary=cal_title,
+            start_date=s.date,
+            start_time=s.time,
+            duration_minutes=s.duration_minutes or 60,
+            location=s.address,
+            description="\n".join(cal_desc_parts),
+        )
+        if lang == "es":
+            await send_whatsapp_message(phone, f"Agrega el turno a tu calendario: {cal_link}")
+        else:
+            await send_whatsapp_message(phone, f"Add the appointment to your calendar: {cal_link}")
+
+    state.status = ConversationStatus.COMPLETED
+    state.multi_call = None
+
+
 @router.post("/call-status")
 async def call_status_callback(request: Request):
     """Twilio call status webhook — receives updates as calls progress."""
@@ -34,6 +135,43 @@ async def call_status_callback(request: Request):
 
     logger.info("Call status callback: sid=%s status=%s", call_sid, call_status)
 
+    conversation_id = get_conversation_id(call_sid)
+    found = find_state_by_conversation_id(call_sid) or (
+        find_state_by_conversation_id(conversation_id) if conversation_id else None
+    )
+    with span_for(call_sid, "twilio.call_status", status=call_status):
+        if call_status == "in-progress":
+            # "answered" event: only used to measure how long providers take to pick up
+            mark_answered(call_sid)
+        else:
+            screened = pop_outcome(call_sid)
+            conv_data = None
+            if call_status == "completed" and found and conversation_id and not is_machine(screened):
+                # Wait for ElevenLabs to finalize the conversation. Done before taking the
+                # user's lock so their messages and other calls' tools aren't held up by it.
+                await asyncio.sleep(5)
+                conv_data = await fetch_conversation_details(conversation_id)
+            async with best_effort_user_lock(found[0] if found else None, "callback"):
+                await _handle_call_status(call_sid, call_status, screened, conv_data)
+
+    if call_status in _TERMINAL_STATUSES:
+        call = bound_span(call_sid)
+        if call is not None:
+            call.set(status=call_status)
+            call.end()
+        unbind(call_sid, conversation_id)
+    if found:
+        end_request_trace(found[1])
+    return {"status": "ok"}
+
+
+async def _handle_call_status(
+    call_sid: str, call_status: str, screened: CallScreeningOutcome | None, conv_data: dict | None,
+) -> None:
+    """Apply a call's final status to its user's state (under the user's lock)."""
+    if call_status in _TERMINAL_STATUSES:
+        release_call(call_sid)
+
     if call_status in ("failed", "busy", "no-answer"):
         result = find_state_by_conversation_id(call_sid)
         if result:
@@ -43,6 +181,9 @@ async def call_status_callback(request: Request):
             if state.multi_call:
                 provider = _find_campaign_provider(state.multi_call, call_sid, pop_call(call_sid))
                 name = provider.name if provider else "?"
+                update_call(provider.call_log_id if provider else None, status=call_status)
+                if provider:
+                    record_outcome(provider.phone, call_status, call_sid, place_id=provider.place_id)
                 msg = format_multi_call_update(name, call_status, language=lang)
                 await send_whatsapp_message(phone, msg)
                 state.multi_call.results.append({
@@ -56,14 +197,13 @@ async def call_status_callback(request: Request):
                 state.multi_call.pending_count -= 1
                 # Check if all calls done
                 if state.multi_call.pending_count <= 0:
-                    ranked = rank_results(state.multi_call.results)
-                    msg = format_ranked_results(ranked, language=lang)
-                    await send_whatsapp_message(phone, msg)
-                    state.status = ConversationStatus.COMPLETED
-                    state.multi_call = None
+                    await finish_campaign(phone, state, lang)
             else:
                 msg = format_call_failed(state.provider_name, language=lang)
                 await send_whatsapp_message(phone, msg)
+                update_call(state.call_log_id, status=call_status)
+                record_outcome(state.provider_phone, call_status, call_sid)
+                update_appointment_request(state.appointment_request_id, "failed")
                 state.status = ConversationStatus.COMPLETED
                 state.call_results.append({
                     "provider": state.provider_name,
@@ -80,13 +220,49 @@ async def call_status_callback(request: Request):
             find_state_by_conversation_id(conversation_id) if conversation_id else None
         )
 
-        if result and conversation_id:
+        if result and is_machine(screened):
+            # Hung up early by call screening — nothing worth summarizing
+            phone, state = result
+            lang = state.language.value
+            state.last_conversation_id = conversation_id
+
+            if state.multi_call:
+                provider = _find_campaign_provider(state.multi_call, call_sid, conversation_id)
+                name = provider.name if provider else "?"
+                update_call(provider.call_log_id if provider else None, status="completed", outcome=screened.value)
+                if provider:
+                    record_outcome(provider.phone, screened.value, call_sid, place_id=provider.place_id)
+                msg = format_multi_call_update(name, screened, language=lang)
+                await send_whatsapp_message(phone, msg)
+                state.multi_call.results.append({
+                    "provider_name": name,
+                    "phone": provider.phone if provider else "",
+                    "rating": provider.rating if provider else None,
+                    "total_ratings": provider.total_ratings if provider else 0,
+                    "summary": None,
+                    "conversation_id": conversation_id,
+                    "outcome": screened.value,
+                })
+                state.multi_call.pending_count -= 1
+                if state.multi_call.pending_count <= 0:
+                    await finish_campaign(phone, state, lang)
+            else:
+                msg = format_call_screened(state.provider_name or state.provider_phone, screened, language=lang)
+                await send_whatsapp_message(phone, msg)
+                update_call(state.call_log_id, status="completed", outcome=screened.value)
+                record_outcome(state.provider_phone, screened.value, call_sid)
+                update_appointment_request(state.appointment_request_id, "failed")
+                state.status = ConversationStatus.COMPLETED
+                state.call_results.append({
+                    "provider": state.provider_name,
+                    "outcome": screened.value,
+                    "conversation_id": conversation_id,
+                })
+
+        elif result and conversation_id:
             phone, state = result
             lang = state.language.value
             state.last_conversation_id = conversation_id
-            # Wait for ElevenLabs to finalize the conversation
-            await asyncio.sleep(5)
-            conv_data = await fetch_conversation_details(conversation_id)
 
             if state.multi_call:
                 # --- Multi-call flow ---
@@ -95,7 +271,16 @@ async def call_status_callback(request: Request):
                 provider_phone = provider.phone if provider else ""
                 summary_result = None
                 if conv_data:
-                    summary_result = await generate_smart_summary(name, provider_phone, conv_data, language=lang)
+                    with timed(SUMMARY_SECONDS, SUMMARY_ERRORS, flow="campaign"), start_span("summary", flow="campaign"):
+                        summary_result = await generate_smart_summary(
+                            name, provider_phone, conv_data, language=lang,
+                            tool_report=state.tool_reports.pop(conversation_id, None),
+                        )
+                _persist_call_result(
+                    phone, provider.call_log_id if provider else None, conversation_id, name, conv_data, summary_result,
+                )
+                if provider:
+                    _record_completed_call(provider.phone, call_sid, provider.place_id, conv_data, summary_result)
 
                 state.multi_call.results.append({
                     "provider_name": name,
@@ -110,49 +295,27 @@ async def call_status_callback(request: Request):
 
                 # When ALL calls done → rank and send consolidated message
                 if state.multi_call.pending_count <= 0:
-                    ranked = rank_results(state.multi_call.results)
-                    msg = format_ranked_results(ranked, language=lang)
-                    await send_whatsapp_message(phone, msg)
-
-                    # Calendar link for best confirmed booking
-                    best_booked = next(
-                        (r for r in ranked if r.get("summary") and r["summary"].booking_confirmed),
-                        None,
-                    )
-                    if best_booked and best_booked["summary"].date and best_booked["summary"].time:
-                        s = best_booked["summary"]
-                        provider = s.provider_name or best_booked["provider_name"]
-                        service = s.service_description or ("Turno" if lang == "es" else "Appointment")
-                        cal_title = f"{service} - {provider}"
-                        cal_desc_parts = []
-                        if s.notes:
-                            cal_desc_parts.append(s.notes)
-                        if best_booked.get("phone"):
-                            cal_desc_parts.append(f"Tel: {best_booked['phone']}")
-                        cal_desc_parts.append("Reservado por Vocero" if lang == "es" else "Booked by Vocero")
-                        cal_link = build_calendar_link(
-                            summary=cal_title,
-                            start_date=s.date,
-                            start_time=s.time,
-                            duration_minutes=s.duration_minutes or 60,
-                            location=s.address,
-                            description="\n".join(cal_desc_parts),
-                        )
-                        if lang == "es":
-                            await send_whatsapp_message(phone, f"Agrega el turno a tu calendario: {cal_link}")
-                        else:
-                            await send_whatsapp_message(phone, f"Add the appointment to your calendar: {cal_link}")
-
-                    state.status = ConversationStatus.COMPLETED
-                    state.multi_call = None
+                    await finish_campaign(phone, state, lang)
             else:
                 # --- Single-call flow ---
                 display_name = state.provider_name or state.provider_phone or "?"
                 if conv_data:
-                    summary_result = await generate_smart_summary(display_name, state.provider_phone, conv_data, language=lang)
+                    with timed(SUMMARY_SECONDS, SUMMARY_ERRORS, flow="single"), start_span("summary", flow="single"):
+                        summary_result = await generate_smart_summary(
+                            display_name, state.provider_phone, conv_data, language=lang,
+                            tool_report=state.tool_reports.pop(conversation_id, None),
+                        )
 
                     msg = format_summary_message(summary_result, display_name, language=lang)
                     await send_whatsapp_message(phone, msg)
+                    _persist_call_result(
+                        phone, state.call_log_id, conversation_id, display_name, conv_data, summary_result,
+                    )
+                    _record_completed_call(state.provider_phone, call_sid, None, conv_data, summary_result)
+                    update_appointment_request(
+                        state.appointment_request_id,
+                        "booked" if summary_result.booking_confirmed else "completed",
+                    )
 
                     # Calendar link as separate message after summary
                     if summary_result.booking_confirmed and summary_result.date and summary_result.time:
@@ -184,7 +347,9 @@ async def call_status_callback(request: Request):
                         "outcome": "completed",
                         "conversation_id": conversation_id,
                     })
+                else:
+                    update_call(state.call_log_id, status="completed")
+                    _record_completed_call(state.provider_phone, call_sid, None, None, None)
+                    update_appointment_request(state.appointment_request_id, "completed")
                 if state.status != ConversationStatus.COMPLETED:
                     state.status = ConversationStatus.COMPLETED
-
-    return {"status": "ok"}
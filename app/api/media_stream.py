@@ -1,12 +1,17 @@
-"""WebSocket endpoint for Twilio Media Stream ↔ ElevenLabs bridge."""
+"""WebSocket endpoint for the Twilio Media Stream fork used for call screening.
+
+ElevenLabs owns the conversation audio; Twilio sends us a read-only copy of the
+provider's side so we can detect voicemail / IVR early and hang up.
+"""
 
 import base64
 import json
 import logging
 
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from app.services.elevenlabs_call import bridge_call
+from app.services.call_screening import CallScreener, is_machine, record_outcome
+from app.services.elevenlabs_call import end_call
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +20,13 @@ router = APIRouter(prefix="/api", tags=["media-stream"])
 
 @router.websocket("/media-stream")
 async def media_stream(websocket: WebSocket):
-    """Handle Twilio Media Stream and bridge audio to ElevenLabs."""
+    """Screen the first seconds of a call and hang up if a machine answered."""
     await websocket.accept()
 
     call_sid = "unknown"
-    stream_sid = ""
-    dynamic_variables: dict[str, str] = {}
+    screener = CallScreener()
 
     try:
-        # Twilio sends 'connected' then 'start' — read both before bridging
         while True:
             msg = await websocket.receive_text()
             data = json.loads(msg)
@@ -34,25 +37,32 @@ async def media_stream(websocket: WebSocket):
                 continue
 
             if event == "start":
-                start_info = data.get("start", {})
-                call_sid = start_info.get("callSid", "unknown")
-                stream_sid = start_info.get("streamSid", "")
-
-                # Decode dynamic variables from custom parameters
-                custom = start_info.get("customParameters", {})
-                dv_encoded = custom.get("dv", "")
-                if dv_encoded:
-                    try:
-                        dynamic_variables = json.loads(base64.b64decode(dv_encoded))
-                    except Exception:
-                        logger.warning("Failed to decode dynamic_variables")
-
-                logger.info("Stream started: call=%s stream=%s", call_sid, stream_sid)
+                call_sid = data.get("start", {}).get("callSid", "unknown")
+                logger.info("Screening stream started: call=%s", call_sid)
+                continue
+
+            if event == "stop":
                 break
 
-        # Now bridge the remaining audio between Twilio ↔ ElevenLabs
-        await bridge_call(websocket, call_sid, stream_sid, dynamic_variables)
+            if event != "media":
+                continue
+
+            payload = base64.b64decode(data.get("media", {}).get("payload", ""))
+            outcome = screener.feed(payload)
+            if outcome is None:
+                continue
+
+            logger.info(
+                "Call %s screened as %s after %.1fs",
+                call_sid, outcome, screener.seconds_analyzed,
+            )
+            record_outcome(call_sid, outcome)
+            if is_machine(outcome) and call_sid != "unknown":
+                await end_call(call_sid)
+            break
 
+    except WebSocketDisconnect:
+        pass
     except Exception:
         logger.exception("Media stream error: call=%s", call_sid)
     finally:
@@ -1,13 +1,19 @@
 """ElevenLabs voice agent server tool webhooks.
 
 Each endpoint is called mid-conversation by the Phone Agent.
-Responses must be fast (< 500ms) to maintain voice latency.
+Responses must be fast (< 500ms) to maintain voice latency, so state is
+updated inline and WhatsApp notifications go through the background outbox.
 """
 
+import json
 import logging
+import time
+from typing import Callable
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
+from fastapi.routing import APIRoute
 
+from app.config import settings
 from app.schemas.tools import (
     CheckPreferenceRequest,
     CheckPreferenceResponse,
@@ -15,18 +21,73 @@ from app.schemas.tools import (
     EndCallRequest,
     ReportSlotsRequest,
 )
+from app.services.bookings import add_booking, find_conflict
 from app.services.messages import (
     format_booking_confirmed,
     format_multi_call_update,
     format_no_availability,
     format_slots_available,
 )
-from app.services.state import ConversationStatus, MultiCallCampaign, MultiCallProvider, find_state_by_conversation_id
-from app.services.twilio import send_whatsapp_message
+from app.services.metrics import TOOL_OVER_BUDGET, TOOL_SECONDS
+from app.services.outbox import enqueue_whatsapp
+from app.services.persistence import record_appointment
+from app.services.preferences import check_proposal, parse_slot
+from app.services.state import (
+    ConversationState,
+    ConversationStatus,
+    MultiCallCampaign,
+    MultiCallProvider,
+    find_state_by_conversation_id,
+    get_preference_window,
+    get_tool_report,
+)
+from app.services.tracing import span_for
+from app.services.user_lock import best_effort_user_lock
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/tools", tags=["tools"])
+
+def _conversation_id(body: bytes) -> str | None:
+    try:
+        return json.loads(body).get("conversation_id")
+    except (ValueError, AttributeError):
+        return None
+
+
+class _LatencyBudgetRoute(APIRoute):
+    """Times and traces each tool response, flagging the ones over the voice latency budget."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            start = time.perf_counter()
+            tool = request.url.path.rsplit("/", 1)[-1]
+            # Starlette caches the body, so the handler doesn't read it twice
+            conversation_id = _conversation_id(await request.body())
+            found = find_state_by_conversation_id(conversation_id) if conversation_id else None
+            with span_for(conversation_id, f"tool.{tool}"):
+                # Serialized with the user's messages and callbacks, but never for longer
+                # than the live call can wait for an answer
+                async with best_effort_user_lock(
+                    found[0] if found else None, "tool", timeout=settings.user_lock_tool_timeout_seconds,
+                ):
+                    response = await handler(request)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            response.headers["X-Response-Time-Ms"] = f"{elapsed_ms:.1f}"
+            TOOL_SECONDS.observe(elapsed_ms / 1000, tool=tool)
+            if elapsed_ms > settings.tool_latency_budget_ms:
+                TOOL_OVER_BUDGET.inc(tool=tool)
+                logger.warning(
+                    "Tool %s took %.0fms (budget %.0fms)",
+                    request.url.path, elapsed_ms, settings.tool_latency_budget_ms,
+                )
+            return response
+
+        return timed_handler
+
+
+router = APIRouter(prefix="/api/tools", tags=["tools"], route_class=_LatencyBudgetRoute)
 
 
 def _find_campaign_provider_by_conv(campaign: MultiCallCampaign, conversation_id: str) -> MultiCallProvider | None:
@@ -37,6 +98,15 @@ def _find_campaign_provider_by_conv(campaign: MultiCallCampaign, conversation_id
     return None
 
 
+def _booking_key(state: ConversationState, conversation_id: str) -> str:
+    """The call a booking belongs to: its call_logs id, as used by app.services.bookings."""
+    call_log_id = state.call_log_id
+    if state.multi_call:
+        provider = _find_campaign_provider_by_conv(state.multi_call, conversation_id)
+        call_log_id = provider.call_log_id if provider else None
+    return str(call_log_id or conversation_id)
+
+
 @router.post("/report_available_slots")
 async def report_available_slots(req: ReportSlotsRequest):
     """Agent reports slots offered by the provider."""
@@ -46,13 +116,14 @@ async def report_available_slots(req: ReportSlotsRequest):
     if result:
         phone, state = result
         lang = state.language.value
+        get_tool_report(state, req.conversation_id).slots.extend(s.model_dump() for s in req.slots)
         if state.multi_call:
             provider = _find_campaign_provider_by_conv(state.multi_call, req.conversation_id)
             name = provider.name if provider else state.provider_name
             msg = format_multi_call_update(name, "has_slots", language=lang)
         else:
             msg = format_slots_available(state.provider_name, language=lang)
-        await send_whatsapp_message(phone, msg)
+        enqueue_whatsapp(phone, msg)
 
     return {"status": "ok", "slots_received": len(req.slots)}
 
@@ -66,22 +137,30 @@ async def check_user_preference(req: CheckPreferenceRequest):
     if not result:
         return CheckPreferenceResponse(accept=True, reason="No preference on file, accept any slot.")
 
-    _, state = result
-    entities = state.pending_entities
-    if not entities or not (entities.date_preference or entities.time_preference):
+    phone, state = result
+    start = parse_slot(req.proposed_date, req.proposed_time)
+    clash = find_conflict(phone, start, ignore_key=_booking_key(state, req.conversation_id)) if start else None
+    if clash:
+        logger.info("check_user_preference: conv=%s clashes with %s", req.conversation_id, clash.describe())
+        return CheckPreferenceResponse(
+            accept=False,
+            reason=f"User already has an appointment {clash.describe()}. Ask for a time that doesn't overlap.",
+        )
+
+    window = get_preference_window(state)
+    if window is None:
         return CheckPreferenceResponse(accept=True, reason="User has no specific time preference.")
 
-    pref_parts = []
-    if entities.date_preference:
-        pref_parts.append(entities.date_preference)
-    if entities.time_preference:
-        pref_parts.append(entities.time_preference)
-    pref = ", ".join(pref_parts)
+    if window.is_empty:
+        # Couldn't interpret the preference locally — leave the call to the agent
+        return CheckPreferenceResponse(
+            accept=True,
+            reason=f"User prefers: {window.describe()}. Proposed: {req.proposed_date} {req.proposed_time}. Please confirm with user if close match.",
+        )
 
-    return CheckPreferenceResponse(
-        accept=True,
-        reason=f"User prefers: {pref}. Proposed: {req.proposed_date} {req.proposed_time}. Please confirm with user if close match.",
-    )
+    accept, reason = check_proposal(window, req.proposed_date, req.proposed_time)
+    logger.info("check_user_preference: conv=%s accept=%s", req.conversation_id, accept)
+    return CheckPreferenceResponse(accept=accept, reason=reason)
 
 
 @router.post("/confirm_booking")
@@ -95,11 +174,38 @@ async def confirm_booking(req: ConfirmBookingRequest):
         phone, state = result
         lang = state.language.value
         provider = req.provider_name or state.provider_name
+        key = _booking_key(state, req.conversation_id)
+        start = parse_slot(req.date, req.time)
+        if start is not None:
+            clash = find_conflict(phone, start, ignore_key=key)
+            if clash:
+                logger.info("confirm_booking: conv=%s rejected, clashes with %s", req.conversation_id, clash.describe())
+                return {
+                    "status": "conflict",
+                    "booking_confirmed": False,
+                    "reason": f"User already has an appointment {clash.describe()}. Don't book this slot; ask for another time.",
+                }
+            add_booking(phone, key, start, provider_name=provider)
+        get_tool_report(state, req.conversation_id).booking = {
+            "provider_name": provider,
+            "date": req.date,
+            "time": req.time,
+            "notes": req.notes,
+        }
+
+        if state.multi_call:
+            campaign_provider = _find_campaign_provider_by_conv(state.multi_call, req.conversation_id)
+            if campaign_provider:
+                record_appointment(
+                    campaign_provider.call_log_id, provider or campaign_provider.name, req.date, req.time, notes=req.notes,
+                )
+        else:
+            record_appointment(state.call_log_id, provider, req.date, req.time, notes=req.notes)
 
         if state.multi_call:
             # Multi-call: brief update, don't mark COMPLETED
             msg = format_multi_call_update(provider, "booked", language=lang)
-            await send_whatsapp_message(phone, msg)
+            enqueue_whatsapp(phone, msg)
         else:
             msg = format_booking_confirmed(
                 provider_name=provider,
@@ -107,7 +213,7 @@ async def confirm_booking(req: ConfirmBookingRequest):
                 notes=req.notes,
                 language=lang,
             )
-            await send_whatsapp_message(phone, msg)
+            enqueue_whatsapp(phone, msg)
             state.status = ConversationStatus.COMPLETED
 
         state.call_results.append({
@@ -129,15 +235,16 @@ async def end_call_no_availability(req: EndCallRequest):
     if result:
         phone, state = result
         lang = state.language.value
+        get_tool_report(state, req.conversation_id).no_availability_reason = req.reason
 
         if state.multi_call:
             provider = _find_campaign_provider_by_conv(state.multi_call, req.conversation_id)
             name = provider.name if provider else state.provider_name
             msg = format_multi_call_update(name, "no_availability", language=lang)
-            await send_whatsapp_message(phone, msg)
+            enqueue_whatsapp(phone, msg)
         else:
             msg = format_no_availability(state.provider_name, language=lang)
-            await send_whatsapp_message(phone, msg)
+            enqueue_whatsapp(phone, msg)
             state.status = ConversationStatus.COMPLETED
 
         state.call_results.append({
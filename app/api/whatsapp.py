@@ -1,22 +1,35 @@
 import asyncio
 import logging
+import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException, Request, Response
 
+from app.api.callbacks import finish_campaign
 from app.config import settings
+from app.log_config import body as log_body
 from app.schemas.intent import IntentResult, IntentType, Language
+from app.services.call_scheduler import PendingCall, cancel_calls_for, schedule_call
 from app.services.elevenlabs_call import fetch_conversation_details, make_outbound_call
-from app.services.intent import extract_intent
+from app.services.intent import extract_intent, extract_intent_streaming
 from app.services.messages import (
     format_call_failed,
+    format_call_scheduled,
     format_calling_message,
+    format_invalid_number,
     format_multi_call_start,
+    format_scheduled_call_expired,
     format_search_results,
     format_transcript,
 )
+from app.services.metrics import MESSAGES, STAGE_ERRORS, STAGE_SECONDS, timed
+from app.services.numbering_plan import classify
+from app.services.opening_hours import OpeningHours
+from app.services.persistence import record_appointment_request, record_call, record_user, update_appointment_request
+from app.services.phone import canonical_phone
 from app.services.places import search_places
+from app.services.ranking import rank_candidates
 from app.services.state import (
     ConversationState,
     ConversationStatus,
@@ -24,19 +37,23 @@ from app.services.state import (
     MultiCallProvider,
     add_message,
     build_context,
+    end_request_trace,
     get_state,
+    has_state,
     merge_entities,
     reset_state,
 )
+from app.services.tracing import new_span, start_span, use_span
 from app.services.transcription import transcribe_audio
 from app.services.twilio import download_whatsapp_media, send_whatsapp_message
+from app.services.user_lock import UserLockTimeout, best_effort_user_lock, user_lock
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["whatsapp"])
 
-# Per-user lock to prevent concurrent message processing (avoids duplicate calls)
-_user_locks: dict[str, asyncio.Lock] = {}
+# active_call_ids placeholders while a call has no call IDs yet
+_IN_FLIGHT_MARKERS = ("pending", "scheduled")
 
 # Dedup: track recently processed message IDs (Meta can send duplicates)
 _seen_message_ids: set[str] = set()
@@ -48,8 +65,17 @@ class ParsedContact:
     phone: str | None
 
 
+def _call_in_flight(state: ConversationState) -> bool:
+    """A call is being dialed, or waits for its provider to open (see _trigger_call)."""
+    return any(x in _IN_FLIGHT_MARKERS for x in state.active_call_ids)
+
+
 def _prepare_for_new_call(state: ConversationState) -> None:
     """Reset call-related state so a new call can be triggered."""
+    if _call_in_flight(state):
+        # The marker is all that stops a second dial to the provider: keep it
+        logger.info("Not starting another call: one is still %s", state.active_call_ids[0])
+        return
     state.active_call_ids.clear()
     state.call_results.clear()
     state.status = ConversationStatus.CALLING
@@ -64,7 +90,8 @@ def _handle_intent(state: ConversationState, result: IntentResult) -> None:
     if result.intent == IntentType.CALL_NUMBER:
         state.pending_intent = IntentType.CALL_NUMBER
         if result.entities.phone_number:
-            state.provider_phone = result.entities.phone_number
+            state.provider_phone = canonical_phone(result.entities.phone_number)
+            state.provider_hours = None
         if result.entities.provider_name:
             state.provider_name = result.entities.provider_name
         # Only call immediately if we know what the user needs
@@ -91,6 +118,7 @@ def _handle_intent(state: ConversationState, result: IntentResult) -> None:
         state.pending_entities = None
         state.provider_phone = None
         state.provider_name = None
+        state.provider_hours = None
         state.search_results = None
         state.active_call_ids.clear()
 
@@ -106,44 +134,87 @@ async def _send_and_track(state: ConversationState, from_number: str, msg: str)
     add_message(state, "bot", msg)
 
 
+def _search_query(result: IntentResult) -> str | None:
+    """Places query for a confident search intent with an explicit location."""
+    if result.intent == IntentType.SEARCH_PROVIDERS and result.entities.location and result.confidence >= 0.8:
+        return f"{result.entities.service_type or ''} {result.entities.location}".strip() or None
+    return None
+
+
 async def _process_intent(
     state: ConversationState,
-    result: IntentResult,
+    text: str,
+    context: str | None,
     from_number: str,
+    started: float,
 ) -> None:
-    """Handle intent result: update state, send response via Meta API."""
-    old_status = state.status
-    _handle_intent(state, result)
-
-    # Don't send the LLM response if we're about to call — _trigger_call sends its own message
-    if state.status == ConversationStatus.CALLING and state.provider_phone:
-        state.last_bot_message = result.response_message
-    else:
-        await _send_and_track(state, from_number, result.response_message)
+    """Extract intent, update state, kick off downstream work and send the response.
 
-    if state.status != old_status:
+    With streaming enabled, state transitions, Places search and call dispatch
+    start as soon as intent/entities are parsed, while the response text is
+    still being generated.
+    """
+    old_status = state.status
+    search_task: asyncio.Task | None = None
+    call_task: asyncio.Task | None = None
+
+    async def act(head: IntentResult) -> None:
+        nonlocal search_task, call_task
+        _handle_intent(state, head)
+        if head.intent == IntentType.CANCEL:
+            cancel_calls_for(from_number)
         logger.info(
-            "State transition for %s: %s -> %s",
-            from_number, old_status, state.status,
+            "Time to first action: %.0fms (intent=%s streaming=%s)",
+            (time.perf_counter() - started) * 1000, head.intent, settings.intent_streaming_enabled,
         )
+        query = _search_query(head)
+        if query:
+            search_task = asyncio.create_task(
+                search_places(query, latitude=state.user_latitude, longitude=state.user_longitude)
+            )
+        if state.status == ConversationStatus.CALLING and state.provider_phone and not state.active_call_ids:
+            call_task = asyncio.create_task(_trigger_call(from_number, state))
 
+    try:
+        if settings.intent_streaming_enabled:
+            with timed(STAGE_SECONDS, STAGE_ERRORS, stage="intent"), start_span("intent"):
+                result = await extract_intent_streaming(text, context=context, on_head=act)
+        else:
+            with timed(STAGE_SECONDS, STAGE_ERRORS, stage="intent"), start_span("intent"):
+                result = await extract_intent(text, context=context)
+            await act(result)
 
-async def _trigger_call(from_number: str, state: ConversationState) -> None:
-    """Place outbound call. Updates state with call IDs."""
-    # Guard: only call if still in CALLING state with no active calls
-    if state.status != ConversationStatus.CALLING or state.active_call_ids:
-        return
-    # Immediately mark as having a pending call to prevent re-entry
-    state.active_call_ids.append("pending")
+        # Don't send the LLM response if we're about to call — _trigger_call sends its own message
+        if state.status == ConversationStatus.CALLING and state.provider_phone:
+            state.last_bot_message = result.response_message
+        else:
+            await _send_and_track(state, from_number, result.response_message)
 
-    lang = state.language.value
-    entities = state.pending_entities
+        if state.status != old_status:
+            logger.info(
+                "State transition for %s: %s -> %s",
+                from_number, old_status, state.status,
+            )
 
+        if search_task:
+            try:
+                results = await search_task
+                state.search_results = results
+                msg = format_search_results(results, language=state.language.value)
+                await _send_and_track(state, from_number, msg)
+            except Exception:
+                logger.exception("Places search failed")
+    finally:
+        if call_task:
+            await call_task
+
+
+def _dynamic_vars(state: ConversationState, lang: str) -> dict[str, str]:
+    """Variables handed to the voice agent for this user's request."""
+    entities = state.pending_entities
     dynamic_vars: dict[str, str] = {"language": lang}
     if state.user_name:
         dynamic_vars["user_name"] = state.user_name
-    if state.provider_name:
-        dynamic_vars["provider_name"] = state.provider_name
     if entities:
         if entities.service_type:
             dynamic_vars["service_type"] = entities.service_type
@@ -153,42 +224,119 @@ async def _trigger_call(from_number: str, state: ConversationState) -> None:
             dynamic_vars["preferred_time"] = entities.time_preference
         if entities.special_requests:
             dynamic_vars["special_requests"] = entities.special_requests
+    return dynamic_vars
+
+
+def _next_call_time(hours: OpeningHours | None) -> datetime | None:
+    """When to dial a provider with these hours (None = now)."""
+    if not settings.call_scheduling_enabled or hours is None:
+        return None
+    return hours.next_call_time()
+
+
+async def _trigger_call(from_number: str, state: ConversationState) -> None:
+    """Start the outbound call; the dial runs in the background and updates state with call IDs."""
+    # Guard: only call if still in CALLING state with no active calls
+    if state.status != ConversationStatus.CALLING or state.active_call_ids:
+        return
+    # Immediately mark as having a pending call to prevent re-entry
+    state.active_call_ids.append("pending")
+    state.trace = state.trace or new_span("request", kind="single")
+
+    lang = state.language.value
+    number = classify(state.provider_phone)
+    if not number.valid:
+        logger.info("Not calling %s: %s", number.phone, number.reason)
+        state.active_call_ids.clear()
+        state.provider_phone = None
+        state.status = ConversationStatus.AWAITING_PROVIDER
+        await _send_and_track(state, from_number, format_invalid_number(number.phone, language=lang))
+        end_request_trace(state)
+        return
+
+    dynamic_vars = _dynamic_vars(state, lang)
+    if state.provider_name:
+        dynamic_vars["provider_name"] = state.provider_name
+    state.appointment_request_id = record_appointment_request(from_number, state.pending_entities)
+
+    # Provider closed: dial at its next opening instead (see dispatch_scheduled_call)
+    due_at = _next_call_time(state.provider_hours)
+    if due_at:
+        state.active_call_ids = ["scheduled"]
+        schedule_call(from_number, state.provider_phone or "", state.provider_name, lang, dynamic_vars, due_at)
+        await _send_and_track(state, from_number, format_call_scheduled(state.provider_name, due_at, language=lang))
+        return
 
     msg = format_calling_message(state.provider_name, state.provider_phone or "", language=lang)
     await send_whatsapp_message(from_number, msg)
+    # Dial outside the user's lock: waiting for a busy provider line (up to
+    # provider_busy_wait_seconds) must not hold up the user's next messages.
+    # The "pending" marker keeps them from starting a second call meanwhile.
+    asyncio.create_task(_dial_and_end_trace(from_number, state, dynamic_vars, lang))
+
+
+async def _dial_and_end_trace(from_number: str, state: ConversationState, dynamic_vars: dict[str, str], lang: str) -> bool:
+    placed = await _dial_single(from_number, state, dynamic_vars, lang)
+    end_request_trace(state)
+    return placed
+
 
+async def _dial_single(from_number: str, state: ConversationState, dynamic_vars: dict[str, str], lang: str) -> bool:
+    """Dial state.provider_phone, replacing the pending/scheduled marker with the call IDs. True if placed."""
     try:
-        conversation_id, call_sid = await make_outbound_call(
-            to_number=state.provider_phone or "",
-            dynamic_variables=dynamic_vars,
-            language=lang,
-        )
+        with use_span(state.trace):
+            conversation_id, call_sid = await make_outbound_call(
+                to_number=state.provider_phone or "",
+                dynamic_variables=dynamic_vars,
+                language=lang,
+            )
         # Replace "pending" with actual IDs
-        state.active_call_ids = [x for x in state.active_call_ids if x != "pending"]
+        state.active_call_ids = [x for x in state.active_call_ids if x not in _IN_FLIGHT_MARKERS]
         if conversation_id:
             state.active_call_ids.append(conversation_id)
         if call_sid:
             state.active_call_ids.append(call_sid)
-        if not conversation_id and not call_sid:
+        placed = bool(conversation_id or call_sid)
+        state.call_log_id = record_call(
+            state.appointment_request_id, state.provider_phone or "", state.provider_name,
+            status="initiated" if placed else "failed",
+        )
+        if not placed:
+            update_appointment_request(state.appointment_request_id, "failed")
             state.active_call_ids.clear()
             fail_msg = format_call_failed(state.provider_name, language=lang)
             await send_whatsapp_message(from_number, fail_msg)
             state.status = ConversationStatus.IDLE
+        return placed
     except Exception:
         logger.exception("Failed to place outbound call to %s", state.provider_phone)
-        state.active_call_ids = [x for x in state.active_call_ids if x != "pending"]
+        state.call_log_id = record_call(
+            state.appointment_request_id, state.provider_phone or "", state.provider_name, status="failed",
+        )
+        update_appointment_request(state.appointment_request_id, "failed")
+        state.active_call_ids = [x for x in state.active_call_ids if x not in _IN_FLIGHT_MARKERS]
         fail_msg = format_call_failed(state.provider_name, language=lang)
         await send_whatsapp_message(from_number, fail_msg)
         state.status = ConversationStatus.IDLE
+        return False
 
 
 async def _trigger_multi_call(from_number: str, state: ConversationState) -> None:
-    """Place parallel outbound calls to multiple providers from search results."""
+    """Start parallel outbound calls to multiple providers from search results.
+
+    Sets the campaign up under the caller's user lock; the dials run in the
+    background, like _trigger_call's, so busy provider lines don't hold it.
+    """
     if not state.search_results:
         return
 
-    # Filter to providers with phone numbers, take first 3
-    candidates = [r for r in state.search_results if r.phone][:3]
+    # Call the 3 best-ranked results that have a phone number, open ones first
+    ranked = rank_candidates(
+        [r for r in state.search_results if r.phone and classify(r.phone).valid],
+        state.user_latitude, state.user_longitude,
+    )
+    due = {id(r): _next_call_time(r.opening_hours) for r in ranked}
+    candidates = sorted(ranked, key=lambda r: due[id(r)] is not None)[:3]
     if not candidates:
         lang = state.language.value
         msg = "Ninguno tiene telefono en Google." if lang == "es" else "None of them have a phone number on Google."
@@ -198,9 +346,13 @@ async def _trigger_multi_call(from_number: str, state: ConversationState) -> Non
     providers = [
         MultiCallProvider(
             name=r.name,
-            phone=r.phone,
+            phone=canonical_phone(r.phone),
             rating=r.rating,
             total_ratings=r.total_ratings,
+            latitude=r.latitude,
+            longitude=r.longitude,
+            place_id=r.place_id or None,
+            scheduled_for=due[id(r)],
         )
         for r in candidates
     ]
@@ -208,45 +360,159 @@ async def _trigger_multi_call(from_number: str, state: ConversationState) -> Non
     state.multi_call = campaign
     state.search_results = None
     state.status = ConversationStatus.CALLING
+    state.appointment_request_id = record_appointment_request(from_number, state.pending_entities)
+    state.trace = state.trace or new_span("request", kind="campaign", providers=len(providers))
 
     lang = state.language.value
     msg = format_multi_call_start(len(providers), language=lang)
     await send_whatsapp_message(from_number, msg)
 
-    entities = state.pending_entities
-    dynamic_vars: dict[str, str] = {"language": lang}
-    if state.user_name:
-        dynamic_vars["user_name"] = state.user_name
-    if entities:
-        if entities.service_type:
-            dynamic_vars["service_type"] = entities.service_type
-        if entities.date_preference:
-            dynamic_vars["preferred_date"] = entities.date_preference
-        if entities.time_preference:
-            dynamic_vars["preferred_time"] = entities.time_preference
-        if entities.special_requests:
-            dynamic_vars["special_requests"] = entities.special_requests
+    dynamic_vars = _dynamic_vars(state, lang)
+    now_due: list[MultiCallProvider] = []
+    for provider in providers:
+        if provider.scheduled_for:
+            call_vars = {**dynamic_vars, "provider_name": provider.name}
+            schedule_call(from_number, provider.phone, provider.name, lang, call_vars, provider.scheduled_for)
+            await send_whatsapp_message(
+                from_number, format_call_scheduled(provider.name, provider.scheduled_for, language=lang),
+            )
+        else:
+            now_due.append(provider)
+    if now_due:
+        asyncio.create_task(_dial_campaign(from_number, state, now_due, dynamic_vars, lang))
+
 
-    for i, provider in enumerate(providers):
-        if i > 0:
-            await asyncio.sleep(1.5)  # Stagger for Twilio CPS
+async def _dial_campaign(
+    from_number: str, state: ConversationState, now_due: list[MultiCallProvider], dynamic_vars: dict[str, str], lang: str,
+) -> None:
+    """Dial a new campaign's open providers, then close it if every dial failed at once."""
 
+    async def dial(i: int, provider: MultiCallProvider) -> None:
+        # Start times stay staggered for Twilio CPS, but a provider whose line is
+        # busy (see app.services.provider_lines) only holds up its own call
+        await asyncio.sleep(1.5 * i)
         call_vars = {**dynamic_vars, "provider_name": provider.name}
-        try:
+        await _dial_campaign_provider(state, provider, call_vars, lang)
+        logger.info("Multi-call %d/%d: %s sid=%s conv=%s", i + 1, len(now_due), provider.name, provider.call_sid, provider.conversation_id)
+
+    await asyncio.gather(*(dial(i, p) for i, p in enumerate(now_due)))
+    # Back under the lock: status and tool webhooks of the placed calls change the campaign too
+    async with best_effort_user_lock(from_number, "campaign"):
+        await _finish_campaign_if_done(from_number, state, lang)
+
+
+async def _dial_campaign_provider(
+    state: ConversationState, provider: MultiCallProvider, call_vars: dict[str, str], lang: str,
+) -> bool:
+    """Dial one campaign provider; a failed dial counts as a finished call. True if placed."""
+    campaign = state.multi_call
+    try:
+        with use_span(state.trace):
             conversation_id, call_sid = await make_outbound_call(
                 to_number=provider.phone,
                 dynamic_variables=call_vars,
                 language=lang,
             )
-            provider.conversation_id = conversation_id
-            provider.call_sid = call_sid
-            if conversation_id:
-                state.active_call_ids.append(conversation_id)
-            if call_sid:
-                state.active_call_ids.append(call_sid)
-            logger.info("Multi-call %d/%d: %s sid=%s conv=%s", i + 1, len(providers), provider.name, call_sid, conversation_id)
-        except Exception:
-            logger.exception("Failed to call %s", provider.name)
+        provider.conversation_id = conversation_id
+        provider.call_sid = call_sid
+        provider.call_log_id = record_call(state.appointment_request_id, provider.phone, provider.name)
+        if conversation_id:
+            state.active_call_ids.append(conversation_id)
+        if call_sid:
+            state.active_call_ids.append(call_sid)
+        return True
+    except Exception:
+        logger.exception("Failed to call %s", provider.name)
+        provider.call_log_id = record_call(
+            state.appointment_request_id, provider.phone, provider.name, status="failed",
+        )
+        campaign.pending_count -= 1
+        campaign.results.append({
+            "provider_name": provider.name,
+            "phone": provider.phone,
+            "rating": provider.rating,
+            "total_ratings": provider.total_ratings,
+            "summary": None,
+            "outcome": "failed",
+        })
+        return False
+
+
+async def _finish_campaign_if_done(from_number: str, state: ConversationState, lang: str) -> None:
+    """Close the campaign once no call is left (failed dials, expired or last deferred calls). Caller holds the lock."""
+    campaign = state.multi_call
+    if campaign is not None and campaign.pending_count <= 0:
+        await finish_campaign(from_number, state, lang)
+        end_request_trace(state)
+
+
+def _scheduled_campaign_provider(state: ConversationState, call: PendingCall) -> MultiCallProvider | None:
+    """The campaign provider still waiting on this deferred call, if any."""
+    if state.multi_call is None:
+        return None
+    return next(
+        (p for p in state.multi_call.providers if p.scheduled_for and p.phone == call.provider_phone),
+        None,
+    )
+
+
+async def dispatch_scheduled_call(call: PendingCall) -> str:
+    """Dial a deferred call once its provider is open (run by the call scheduler).
+
+    Returns the call's final status: "dialed", "failed" (the dial didn't go
+    through) or "dropped" (the user moved on).
+
+    The user's lock only covers checking and updating the state: the dial itself
+    may wait for a busy provider line, so it runs outside it, like _trigger_call.
+    """
+    async with user_lock(call.user_phone, "scheduler"):
+        state = get_state(call.user_phone)
+        lang = call.language
+
+        provider = _scheduled_campaign_provider(state, call)
+        if provider is not None:
+            provider.scheduled_for = None
+        elif call.restored and not has_state(call.user_phone):
+            # Scheduled before a restart and the user hasn't written since: rebuild the single-call state
+            state = get_state(call.user_phone)
+            state.language = Language(lang)
+            state.provider_phone = call.provider_phone
+            state.provider_name = call.provider_name
+            state.status = ConversationStatus.CALLING
+            state.active_call_ids = ["scheduled"]
+            state.appointment_request_id = record_appointment_request(call.user_phone, None)
+            state.trace = new_span("request", kind="single", scheduled=True)
+        elif not (
+            state.status == ConversationStatus.CALLING
+            and state.active_call_ids == ["scheduled"]
+            and state.provider_phone == call.provider_phone
+        ):
+            logger.info("Dropping scheduled call %s: user ...%s moved on", call.id, call.user_phone[-4:])
+            return "dropped"
+
+        if provider is None:
+            msg = format_calling_message(call.provider_name, call.provider_phone, language=lang)
+            await send_whatsapp_message(call.user_phone, msg)
+
+    if provider is not None:
+        placed = await _dial_campaign_provider(state, provider, call.dynamic_variables, lang)
+        # Back under the lock: the campaign's other calls report through webhooks meanwhile
+        async with best_effort_user_lock(call.user_phone, "scheduler"):
+            await _finish_campaign_if_done(call.user_phone, state, lang)
+    else:
+        placed = await _dial_and_end_trace(call.user_phone, state, call.dynamic_variables, lang)
+    return "dialed" if placed else "failed"
+
+
+async def notify_scheduled_call_expired(call: PendingCall) -> None:
+    """Tell the user a deferred call was dropped because it couldn't be placed on time."""
+    async with user_lock(call.user_phone, "scheduler"):
+        state = get_state(call.user_phone)
+        await send_whatsapp_message(call.user_phone, format_scheduled_call_expired(call.provider_name, language=call.language))
+        provider = _scheduled_campaign_provider(state, call)
+        campaign = state.multi_call
+        if provider is not None:
+            provider.scheduled_for = None
             campaign.pending_count -= 1
             campaign.results.append({
                 "provider_name": provider.name,
@@ -254,18 +520,14 @@ async def _trigger_multi_call(from_number: str, state: ConversationState) -> Non
                 "rating": provider.rating,
                 "total_ratings": provider.total_ratings,
                 "summary": None,
-                "outcome": "failed",
+                "outcome": "expired",
             })
-
-    # If all calls failed immediately, send result now
-    if campaign.pending_count <= 0:
-        from app.services.ranking import rank_results
-        from app.services.messages import format_ranked_results
-        ranked = rank_results(campaign.results)
-        msg = format_ranked_results(ranked, language=lang)
-        await send_whatsapp_message(from_number, msg)
-        state.status = ConversationStatus.COMPLETED
-        state.multi_call = None
+            await _finish_campaign_if_done(call.user_phone, state, call.language)
+        elif state.status == ConversationStatus.CALLING and state.active_call_ids == ["scheduled"]:
+            update_appointment_request(state.appointment_request_id, "failed")
+            state.active_call_ids.clear()
+            state.status = ConversationStatus.IDLE
+            end_request_trace(state)
 
 
 def _parse_meta_contact(message: dict) -> ParsedContact | None:
@@ -284,18 +546,37 @@ def _parse_meta_contact(message: dict) -> ParsedContact | None:
 
 async def _handle_message(from_number: str, profile_name: str, message: dict) -> None:
     """Process a single incoming WhatsApp message."""
-    # Per-user lock prevents concurrent processing (avoids duplicate calls)
-    if from_number not in _user_locks:
-        _user_locks[from_number] = asyncio.Lock()
-    async with _user_locks[from_number]:
-        await _handle_message_inner(from_number, profile_name, message)
+    # Per-user lock prevents concurrent processing, across workers too (avoids duplicate calls)
+    MESSAGES.inc(type=message.get("type", ""))
+    # Root span of the message's trace; calls it starts continue it (see app.services.tracing)
+    root = new_span("whatsapp.message", type=message.get("type", ""), user=from_number[-4:])
+    with use_span(root, end=True):
+        try:
+            async with user_lock(from_number, "message"):
+                with timed(STAGE_SECONDS, STAGE_ERRORS, stage="handle_message"):
+                    await _handle_message_inner(from_number, profile_name, message)
+                # e.g. a cancel: the request this message ended has nothing left in flight
+                end_request_trace(get_state(from_number))
+        except UserLockTimeout as exc:
+            if root is not None:
+                root.set(error="user_lock_timeout")
+            logger.error("Not handling message %s: %s", message.get("id", ""), exc)
+            # Don't drop it silently: the user can resend once the previous one is done
+            busy_msg = (
+                "Sigo con tu mensaje anterior. Mandame este de nuevo en un momento."
+                if get_state(from_number).language == Language.ES
+                else "Still working on your previous message. Please send this one again in a moment."
+            )
+            await send_whatsapp_message(from_number, busy_msg)
 
 
 async def _handle_message_inner(from_number: str, profile_name: str, message: dict) -> None:
     """Process a single incoming WhatsApp message (serialized per user)."""
+    started = time.perf_counter()
     msg_type = message.get("type", "")
 
     state = get_state(from_number)
+    record_user(from_number)
 
     # Handle transcript request BEFORE reset (so last_conversation_id is still available)
     if msg_type == "text" and state.last_conversation_id:
@@ -312,6 +593,7 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
 
     # Auto-reset completed conversations so user can start fresh
     if state.status == ConversationStatus.COMPLETED:
+        end_request_trace(state)
         reset_state(from_number)
         state = get_state(from_number)
 
@@ -333,7 +615,7 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
 
         # Check for "call all" trigger
         if body_lower in ("todos", "all", "llama a todos", "llamalos", "call all", "call them all"):
-            asyncio.create_task(_trigger_multi_call(from_number, state))
+            await _trigger_multi_call(from_number, state)
             return
 
         if body.isdigit():
@@ -341,7 +623,8 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
             if 0 <= idx < len(state.search_results):
                 selected = state.search_results[idx]
                 state.provider_name = selected.name
-                state.provider_phone = selected.phone
+                state.provider_phone = canonical_phone(selected.phone) or None
+                state.provider_hours = selected.opening_hours
                 state.search_results = None
                 state.updated_at = datetime.now(timezone.utc)
                 if selected.phone:
@@ -360,7 +643,9 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
                         msg = (f"Dale, ya llamo a *{selected.name}*!"
                                if lang == "es"
                                else f"Got it, calling *{selected.name}*!")
-                    await _send_and_track(state, from_number, msg)
+                    # If it's closed, _trigger_call tells the user when it will call instead
+                    if _next_call_time(selected.opening_hours) is None:
+                        await _send_and_track(state, from_number, msg)
                 else:
                     await send_whatsapp_message(
                         from_number,
@@ -382,8 +667,9 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
     if msg_type == "contacts":
         contact = _parse_meta_contact(message)
         if contact and contact.phone:
-            state.provider_phone = contact.phone
+            state.provider_phone = canonical_phone(contact.phone)
             state.provider_name = contact.name
+            state.provider_hours = None
             state.updated_at = datetime.now(timezone.utc)
 
             # Check if we already know what the user needs
@@ -454,25 +740,10 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
 
     elif msg_type == "text":
         body = message.get("text", {}).get("body", "")
-        logger.info("Text body: %s", body[:100] if body else "<empty>")
+        logger.info("Text body: %s", log_body(body))
         add_message(state, "user", body)
         try:
-            result = await extract_intent(body, context=context)
-            await _process_intent(state, result, from_number)
-            if result.intent == IntentType.SEARCH_PROVIDERS and result.entities.location and result.confidence >= 0.8:
-                query = f"{result.entities.service_type or ''} {result.entities.location}".strip()
-                if query:
-                    try:
-                        results = await search_places(
-                            query,
-                            latitude=state.user_latitude,
-                            longitude=state.user_longitude,
-                        )
-                        state.search_results = results
-                        msg = format_search_results(results, language=state.language.value)
-                        await _send_and_track(state, from_number, msg)
-                    except Exception:
-                        logger.exception("Places search failed")
+            await _process_intent(state, body, context, from_number, started)
         except Exception:
             logger.exception("Intent parsing failed")
             lang = state.language.value
@@ -488,22 +759,7 @@ async def _handle_message_inner(from_number: str, profile_name: str, message: di
                 audio_bytes = await download_whatsapp_media(media_id)
                 transcription = await transcribe_audio(audio_bytes)
                 add_message(state, "user", f"[audio] {transcription.text}")
-                result = await extract_intent(transcription.text, context=context)
-                await _process_intent(state, result, from_number)
-                if result.intent == IntentType.SEARCH_PROVIDERS and result.entities.location and result.confidence >= 0.8:
-                    query = f"{result.entities.service_type or ''} {result.entities.location}".strip()
-                    if query:
-                        try:
-                            results = await search_places(
-                                query,
-                                latitude=state.user_latitude,
-                                longitude=state.user_longitude,
-                            )
-                            state.search_results = results
-                            msg = format_search_results(results, language=state.language.value)
-                            await _send_and_track(state, from_number, msg)
-                        except Exception:
-                            logger.exception("Places search failed")
+                await _process_intent(state, transcription.text, context, from_number, started)
             except Exception:
                 logger.exception("Failed to process voice note")
                 lang = state.language.value
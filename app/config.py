@@ -9,21 +9,31 @@ class Settings(BaseSettings):
     twilio_account_sid: str = ""
     twilio_auth_token: str = ""
     twilio_phone_number: str = ""
+    twilio_base_url: str = "https://api.twilio.com/2010-04-01"
 
     # Meta WhatsApp Cloud API
     meta_phone_number_id: str = ""
     meta_waba_id: str = ""
     meta_access_token: str = ""
     meta_webhook_verify_token: str = "vocero_verify"
+    meta_graph_base_url: str = "https://graph.facebook.com/v21.0"
 
     # ElevenLabs
     elevenlabs_api_key: str = ""
     elevenlabs_agent_id: str = ""        # Spanish agent
     elevenlabs_agent_id_en: str = ""     # English agent
     elevenlabs_phone_number_id: str = ""
+    elevenlabs_base_url: str = "https://api.elevenlabs.io/v1"
 
     # OpenAI
     openai_api_key: str = ""
+    openai_base_url: str = "https://api.openai.com/v1"
+    summary_transcript_token_budget: int = 1500
+    intent_streaming_enabled: bool = True
+    intent_cache_enabled: bool = True
+    intent_cache_max_entries: int = 2048
+    intent_cache_ttl_seconds: float = 3600.0
+    intent_cache_min_confidence: float = 0.85
 
     # Resend
     resend_api_key: str = ""
@@ -31,11 +41,91 @@ class Settings(BaseSettings):
 
     # Google Places
     google_places_api_key: str = ""
+    google_places_base_url: str = "https://places.googleapis.com/v1"
 
     # Google Calendar
     google_service_account_file: str = ""
     google_calendar_id: str = "primary"
 
+    # Call screening (voicemail / IVR detection on the forked call audio)
+    call_screening_enabled: bool = True
+    call_screening_window_seconds: float = 8.0
+
+    # Latency-sensitive paths
+    tool_latency_budget_ms: float = 500.0
+    outbox_workers: int = 4
+    outbox_queue_size: int = 1000  # per worker; when full, messages go to the dead-letter log
+
+    # Write-behind persistence of users, requests, calls and appointments
+    persistence_enabled: bool = True
+    persistence_flush_interval_seconds: float = 1.0
+    persistence_batch_size: int = 500
+    persistence_max_pending: int = 50000
+    persistence_max_attempts: int = 5  # per row, then it goes to the dead-letter log
+
+    # Cold storage of old call transcripts (compressed, out of call_logs)
+    transcript_archive_enabled: bool = True
+    transcript_archive_after_days: int = 30
+    transcript_archive_batch_size: int = 500
+    transcript_archive_interval_seconds: float = 3600.0
+    transcript_archive_dir: str = ""  # empty = store blobs in the transcript_archive table
+
+    # Provider ranking (relative weights; see app/services/ranking.py for the factors)
+    ranking_candidate_weights: dict[str, float] = {"rating": 0.4, "distance": 0.3, "reputation": 0.3}
+    ranking_outcome_weights: dict[str, float] = {
+        "availability": 0.35,
+        "earliest_slot": 0.2,
+        "rating": 0.2,
+        "distance": 0.1,
+        "time_fit": 0.15,
+    }
+    ranking_distance_scale_km: float = 3.0
+
+    # Call scheduling (defer calls to closed providers until they open)
+    call_scheduling_enabled: bool = True
+    call_after_opening_minutes: int = 10
+    call_min_open_minutes: int = 15
+    call_schedule_max_lateness_minutes: int = 120
+
+    # Phone numbers and provider lines
+    default_phone_region: str = "AR"  # region for numbers written without a country code
+    provider_max_concurrent_calls: int = 1
+    provider_busy_wait_seconds: float = 45.0
+    provider_line_ttl_seconds: float = 1200.0  # free a line if its call never reports back
+    dial_blocked_number_kinds: list[str] = ["premium", "shared_cost"]  # see app/data/numbering_plan.csv
+
+    # Event-loop health (lag sampler + stack capture of callbacks blocking the loop; see /debug/loop)
+    loop_monitor_enabled: bool = True
+    loop_lag_sample_interval_seconds: float = 0.1
+    slow_callback_threshold_ms: float = 100.0
+
+    # Tracing (spans as JSON lines to a file and/or OTLP/HTTP JSON, e.g. http://localhost:4318/v1/traces)
+    tracing_enabled: bool = True
+    tracing_export_path: str = ""
+    tracing_otlp_endpoint: str = ""
+    tracing_flush_interval_seconds: float = 5.0
+    tracing_service_name: str = "vocero"
+
+    # Appointment conflict detection (length assumed until the call summary says otherwise)
+    booking_default_duration_minutes: int = 60
+
+    # Logging (queued and written off the event loop; see app/log_config.py)
+    log_level: str = "INFO"
+    log_json: bool = False
+    log_queue_enabled: bool = True
+    log_queue_size: int = 10000  # records beyond this are dropped, never waited on
+    log_sample_rates: dict[str, float] = {}  # logger name -> fraction of INFO/DEBUG records kept
+    log_redact: bool = False  # hide message bodies, mask phone numbers and emails
+    log_body_max_chars: int = 100
+    db_echo: bool = False  # log every SQL statement
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # Per-user serialization of messages, tool webhooks and callbacks (see app/services/user_lock.py)
+    user_lock_backend: str = "memory"  # "memory" (one worker) or "postgres" (advisory locks, several workers)
+    user_lock_timeout_seconds: float = 30.0
+    user_lock_tool_timeout_seconds: float = 0.25  # tool webhooks answer a live call; don't wait longer than this
+
     # App
     app_base_url: str = "http://localhost:8000"
     debug: bool = True
@@ -0,0 +1,192 @@
+"""Logging setup: records are queued on the event loop and written by a background thread.
+
+The loop thread only does the cheap part: level check, per-logger sampling
+(log_sample_rates; warnings and errors are always kept), merging the
+message arguments and tagging the current trace ID. Formatting (text or
+JSON lines), redaction and the write to stderr happen on the listener
+thread. When the queue is full, records are dropped and counted; they are
+never waited on.
+
+Message bodies (user text, transcriptions, vCards) go through body(),
+which truncates them to log_body_max_chars. With log_redact they are
+replaced by their length, and phone numbers and emails elsewhere in the
+messages are masked.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.services.metrics import Gauge
+from app.services.tracing import current_span
+
+_MAX_MESSAGE_CHARS = 4000
+# 8-15 digits, optionally separated by spaces, dots, dashes or parentheses
+# ("+54 9 11 4444-5555", "(011) 4444.5555"); ISO dates are left alone.
+# _mask_phone then keeps only the runs that look like a phone (see _is_phone)
+_PHONE_RE = re.compile(r"(?<![\w+])(?<!\d\.)(?!\d{4}-\d{2}-\d{2})\+?\(?\d(?:[\s.()-]{0,2}\d){7,14}(?!\w|\.\d)")
+_PHONE_SEPARATOR_RE = re.compile(r"[\s()-]")
+_BARE_PHONE_MIN_DIGITS = 10  # "5491144445555" from WhatsApp; counters and ids rarely get this long
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+_listener: logging.handlers.QueueListener | None = None
+_stats = {"dropped": 0, "sampled_out": 0}
+
+Gauge("vocero_log_dropped_records", "Log records dropped because the log queue was full.", lambda: _stats["dropped"])
+
+
+def body(text: str | None) -> str:
+    """A user-supplied body as it may appear in the logs."""
+    if not text:
+        return "<empty>"
+    if settings.log_redact:
+        return f"<{len(text)} chars>"
+    limit = settings.log_body_max_chars
+    return text if len(text) <= limit else f"{text[:limit]}...(+{len(text) - limit})"
+
+
+def _is_phone(text: str) -> bool:
+    """A leading "+", phone-style grouping (spaces, dashes, parentheses) or a long bare run.
+
+    Digits separated only by dots ("1234.5678 ms", IP addresses) are numbers, not phones.
+    """
+    if text.startswith("+") or _PHONE_SEPARATOR_RE.search(text):
+        return True
+    return "." not in text and len(text) >= _BARE_PHONE_MIN_DIGITS
+
+
+def _mask_phone(match: re.Match) -> str:
+    text = match.group()
+    if not _is_phone(text):
+        return text
+    return "***" + re.sub(r"\D", "", text)[-4:]
+
+
+def _redact(message: str) -> str:
+    return _EMAIL_RE.sub("<email>", _PHONE_RE.sub(_mask_phone, message))
+
+
+class _SamplingFilter(logging.Filter):
+    """Keeps a log_sample_rates fraction of a logger's INFO/DEBUG records (longest name prefix wins)."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self._rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            prefix = name
+            while prefix and prefix not in self._rates:
+                prefix = prefix.rpartition(".")[0]
+            rate = self._cache[name] = self._rates.get(prefix, 1.0)
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._rates:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        _stats["sampled_out"] += 1
+        return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: a full queue drops the record."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        span = current_span()
+        record.trace_id = span.trace_id if span else None
+        # Args and tracebacks may not survive the trip to the other thread
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+class _Formatter(logging.Formatter):
+    """Text or JSON lines, with messages truncated and (with log_redact) phone numbers/emails masked."""
+
+    def __init__(self, as_json: bool, redact: bool):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self._json = as_json
+        self._redact = redact
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if len(message) > _MAX_MESSAGE_CHARS:
+            message = f"{message[:_MAX_MESSAGE_CHARS]}...(+{len(message) - _MAX_MESSAGE_CHARS})"
+        if self._redact:
+            message = _redact(message)
+            if record.exc_info and not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            if record.exc_text:
+                # Tracebacks quote arguments and reprs too
+                record.exc_text = _redact(record.exc_text)
+        if not self._json:
+            record.msg, record.args = message, None
+            return super().format(record)
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": message,
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging() -> None:
+    """Route every logger (uvicorn's included) through the queue; idempotent."""
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(settings.log_level.upper())
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(_Formatter(settings.log_json, settings.log_redact))
+
+    if settings.log_queue_enabled:
+        if _listener is None:
+            records: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+            _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+            _listener.start()
+        handler: logging.Handler = _QueueHandler(_listener.queue)
+    else:
+        handler = stream
+    handler.addFilter(_SamplingFilter(settings.log_sample_rates))
+    root.handlers[:] = [handler]
+
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+        logger.propagate = True
+
+
+def stop_logging() -> None:
+    """Flush queued records (on shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger().handlers[:] = [logging.StreamHandler(sys.stderr)]
+
+
+def logging_stats() -> dict:
+    return {"queued": _listener.queue.qsize() if _listener else 0, **_stats}
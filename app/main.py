@@ -2,28 +2,68 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
-logging.basicConfig(level=logging.INFO)
+from app.log_config import configure_logging, logging_stats, stop_logging
+
+configure_logging()
 
 from app.api.callbacks import router as callbacks_router
+from app.api.media_stream import router as media_stream_router
 from app.api.tools import router as tools_router
+from app.api.whatsapp import dispatch_scheduled_call, notify_scheduled_call_expired
 from app.api.whatsapp import router as whatsapp_router
-from app.db.session import engine
-from app.models import Base
+from app.db.session import create_schema, engine
+from app.services.bookings import load_bookings
+from app.services.call_scheduler import load_scheduled_calls, start_call_scheduler, stop_call_scheduler
+from app.services.loop_monitor import loop_stats, start_loop_monitor, stop_loop_monitor
+from app.services.metrics import render as render_metrics
+from app.services.outbox import outbox_stats, start_outbox, stop_outbox
+from app.services.persistence import persistence_stats, start_persistence, stop_persistence
+from app.services.provider_lines import line_stats
+from app.services.reputation import load_reputations
+from app.services.tracing import start_tracing, stop_tracing
+from app.services.transcript_archive import start_transcript_archiver, stop_transcript_archiver
+from app.services.user_lock import user_lock_stats
+
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    db_available = True
     try:
         async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(create_schema)
     except Exception:
-        logging.getLogger(__name__).warning("DB not available — running without database")
+        db_available = False
+        logger.warning("DB not available — running without database")
+    if db_available:
+        # A loader that fails (bad row, missing column) only costs its own cache
+        for loader in (load_reputations, load_scheduled_calls, load_bookings):
+            try:
+                await loader()
+            except Exception:
+                logger.exception("Startup loader %s failed; continuing without its data", loader.__name__)
+    start_loop_monitor()
+    start_tracing()
+    start_outbox()
+    start_persistence(db_available)
+    start_transcript_archiver(db_available)
+    start_call_scheduler(dispatch_scheduled_call, notify_scheduled_call_expired)
     yield
+    stop_call_scheduler()
+    stop_transcript_archiver()
+    await stop_outbox()
+    await stop_persistence()
+    await stop_tracing()
+    stop_loop_monitor()
     try:
         await engine.dispose()
     except Exception:
         pass
+    stop_logging()
 
 
 app = FastAPI(title="Vocero", version="0.1.0", lifespan=lifespan)
@@ -31,8 +71,28 @@ app = FastAPI(title="Vocero", version="0.1.0", lifespan=lifespan)
 app.include_router(whatsapp_router)
 app.include_router(callbacks_router)
 app.include_router(tools_router)
+app.include_router(media_stream_router)
 
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "persistence": persistence_stats(),
+        "outbox": outbox_stats(),
+        "provider_lines": line_stats(),
+        "logging": logging_stats(),
+        "user_locks": user_lock_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/loop")
+async def debug_loop():
+    """Event-loop lag and the stacks of recent callbacks that blocked it."""
+    return loop_stats()
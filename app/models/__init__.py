@@ -3,5 +3,8 @@ from app.models.user import User
 from app.models.appointment_request import AppointmentRequest
 from app.models.call_log import CallLog
 from app.models.appointment import Appointment
+from app.models.transcript_archive import TranscriptArchive
+from app.models.provider_stats import ProviderStats
+from app.models.scheduled_call import ScheduledCall
 
-__all__ = ["Base", "User", "AppointmentRequest", "CallLog", "Appointment"]
+__all__ = ["Base", "User", "AppointmentRequest", "CallLog", "Appointment", "TranscriptArchive", "ProviderStats", "ScheduledCall"]
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -9,6 +9,10 @@ from app.models.base import Base
 
 class AppointmentRequest(Base):
     __tablename__ = "appointment_requests"
+    __table_args__ = (
+        # Keyset pagination of a user's history: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_appointment_requests_user_created", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"))
@@ -21,5 +25,5 @@ class AppointmentRequest(Base):
 
     user: Mapped["User"] = relationship(back_populates="appointment_requests")
     call_logs: Mapped[list["CallLog"]] = relationship(
-        back_populates="appointment_request", lazy="selectin"
+        back_populates="appointment_request", lazy="raise"
     )
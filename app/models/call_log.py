@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -9,6 +9,11 @@ from app.models.base import Base
 
 class CallLog(Base):
     __tablename__ = "call_logs"
+    __table_args__ = (
+        Index("ix_call_logs_request_created", "appointment_request_id", "created_at", "id"),
+        Index("ix_call_logs_status_created", "status", "created_at", "id"),
+        Index("ix_call_logs_created", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     appointment_request_id: Mapped[uuid.UUID] = mapped_column(
@@ -18,7 +23,8 @@ class CallLog(Base):
     provider_phone: Mapped[str] = mapped_column(String(20))
     status: Mapped[str] = mapped_column(String(20), default="initiated")
     duration_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    transcript: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Deferred: only loaded when explicitly requested (see app.services.history)
+    transcript: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
     outcome: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
@@ -26,5 +32,5 @@ class CallLog(Base):
         back_populates="call_logs"
     )
     appointment: Mapped["Appointment | None"] = relationship(
-        back_populates="call_log", lazy="selectin"
+        back_populates="call_log", lazy="raise"
     )
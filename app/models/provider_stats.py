@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import JSON, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ProviderStats(Base):
+    """Aggregated call outcomes per provider phone (see app.services.reputation)."""
+
+    __tablename__ = "provider_stats"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    phone: Mapped[str] = mapped_column(String(20), unique=True)
+    place_id: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    answered: Mapped[int] = mapped_column(Integer, default=0)
+    machine: Mapped[int] = mapped_column(Integer, default=0)
+    booked: Mapped[int] = mapped_column(Integer, default=0)
+    no_availability: Mapped[int] = mapped_column(Integer, default=0)
+    total_duration_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    # Most recent answer delays, for the median
+    answer_seconds: Mapped[list] = mapped_column(JSON, default=list)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
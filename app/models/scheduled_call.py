@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import JSON, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ScheduledCall(Base):
+    """Outbound call deferred until the provider is open (see app.services.call_scheduler)."""
+
+    __tablename__ = "scheduled_calls"
+    __table_args__ = (Index("ix_scheduled_calls_status_due", "status", "due_at"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    user_phone: Mapped[str] = mapped_column(String(20))
+    provider_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    provider_phone: Mapped[str] = mapped_column(String(20))
+    language: Mapped[str] = mapped_column(String(5), default="es")
+    dynamic_variables: Mapped[dict] = mapped_column(JSON, default=dict)
+    due_at: Mapped[datetime]
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
@@ -0,0 +1,21 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class TranscriptArchive(Base):
+    """Compressed transcript of an old call, moved out of the hot call_logs table."""
+
+    __tablename__ = "transcript_archive"
+
+    call_log_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("call_logs.id"), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(10))
+    original_size: Mapped[int] = mapped_column(Integer)
+    compressed_size: Mapped[int] = mapped_column(Integer)
+    # NULL when the blob lives on disk (TRANSCRIPT_ARCHIVE_DIR)
+    data: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
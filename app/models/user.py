@@ -14,5 +14,5 @@ class User(Base):
     email: Mapped[str | None] = mapped_column(String(255), nullable=True)
 
     appointment_requests: Mapped[list["AppointmentRequest"]] = relationship(
-        back_populates="user", lazy="selectin"
+        back_populates="user", lazy="raise"
     )
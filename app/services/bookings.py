@@ -0,0 +1,140 @@
+"""Per-user index of booked appointments, for conflict detection.
+
+Each user's bookings are a list of intervals sorted by start, plus a running
+maximum of their ends. "Does [start, end) overlap anything?" is then a bisect
+for the last booking starting before `end` and one comparison against the
+running max of ends up to it, O(log n) even if the user already has
+overlapping bookings. Inserts are O(n), but n is one user's upcoming
+appointments.
+
+Times are naive local datetimes, the same as Appointment.appointment_time.
+Bookings are keyed by call, so a call that re-reports its booking moves it
+instead of conflicting with itself.
+"""
+
+import bisect
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.session import async_session
+from app.models import Appointment, AppointmentRequest, CallLog, User
+from app.services.preferences import LOCAL_TZ
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Booking:
+    start: datetime
+    end: datetime
+    key: str
+    provider_name: str | None = None
+
+    def describe(self) -> str:
+        name = f" with {self.provider_name}" if self.provider_name else ""
+        return f"{self.start:%Y-%m-%d %H:%M}-{self.end:%H:%M}{name}"
+
+
+@dataclass
+class _UserBookings:
+    bookings: list[Booking] = field(default_factory=list)
+    starts: list[datetime] = field(default_factory=list)
+    max_ends: list[datetime] = field(default_factory=list)
+
+    def _reindex(self) -> None:
+        self.bookings.sort(key=lambda b: b.start)
+        self.starts = [b.start for b in self.bookings]
+        self.max_ends = []
+        for b in self.bookings:
+            self.max_ends.append(max(self.max_ends[-1], b.end) if self.max_ends else b.end)
+
+    def put(self, booking: Booking) -> None:
+        self.bookings = [b for b in self.bookings if b.key != booking.key]
+        self.bookings.append(booking)
+        self._reindex()
+
+    def overlapping(self, start: datetime, end: datetime, ignore_key: str | None = None) -> Booking | None:
+        i = bisect.bisect_left(self.starts, end)  # bookings[:i] start before `end`
+        if i == 0 or self.max_ends[i - 1] <= start:
+            return None
+        # Something overlaps; walk back to it (it is adjacent unless bookings overlap each other)
+        for booking in reversed(self.bookings[:i]):
+            if booking.end > start and booking.key != ignore_key:
+                return booking
+        return None
+
+    def prune(self, before: datetime) -> None:
+        if self.bookings and self.max_ends[-1] <= before:
+            self.bookings.clear()
+            self._reindex()
+        elif self.bookings and self.bookings[0].end <= before:
+            self.bookings = [b for b in self.bookings if b.end > before]
+            self._reindex()
+
+
+_index: dict[str, _UserBookings] = {}
+
+
+def _local_now() -> datetime:
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
+
+
+def _default_duration() -> timedelta:
+    return timedelta(minutes=settings.booking_default_duration_minutes)
+
+
+def find_conflict(
+    phone: str,
+    start: datetime,
+    duration_minutes: int | None = None,
+    ignore_key: str | None = None,
+) -> Booking | None:
+    """The user's booking overlapping [start, start + duration), if any."""
+    user = _index.get(phone)
+    if user is None:
+        return None
+    end = start + (timedelta(minutes=duration_minutes) if duration_minutes else _default_duration())
+    return user.overlapping(start, end, ignore_key)
+
+
+def add_booking(
+    phone: str,
+    key: str | uuid.UUID,
+    start: datetime,
+    duration_minutes: int | None = None,
+    provider_name: str | None = None,
+) -> Booking:
+    """Index (or move) the booking made on call `key`."""
+    end = start + (timedelta(minutes=duration_minutes) if duration_minutes else _default_duration())
+    booking = Booking(start=start, end=end, key=str(key), provider_name=provider_name)
+    user = _index.setdefault(phone, _UserBookings())
+    user.prune(_local_now() - timedelta(days=1))
+    user.put(booking)
+    return booking
+
+
+async def load_bookings() -> int:
+    """Index appointments that haven't ended yet (called once at startup)."""
+    since = _local_now() - timedelta(days=1)
+    async with async_session() as session:
+        rows = await session.execute(
+            select(
+                User.phone_number, Appointment.call_log_id, Appointment.appointment_time,
+                Appointment.duration_minutes, Appointment.provider_name,
+            )
+            .join(CallLog, Appointment.call_log_id == CallLog.id)
+            .join(AppointmentRequest, CallLog.appointment_request_id == AppointmentRequest.id)
+            .join(User, AppointmentRequest.user_id == User.id)
+            .where(Appointment.appointment_time >= since)
+        )
+        count = 0
+        for phone, call_log_id, start, duration, provider_name in rows:
+            add_booking(phone, call_log_id, start, duration, provider_name)
+            count += 1
+    logger.info("Indexed %d upcoming appointments", count)
+    return count
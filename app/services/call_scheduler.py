@@ -0,0 +1,187 @@
+"""Deferred outbound calls, dialed when the provider opens.
+
+Calls to closed providers are kept in a min-heap ordered by due time and
+persisted to scheduled_calls (through the write-behind queue), so they
+survive restarts: load_scheduled_calls() re-heaps the pending ones at
+startup. A single task sleeps until the earliest due call — or until an
+earlier one is scheduled — and hands it to the dispatcher registered by the
+WhatsApp flow. Cancelled calls are skipped lazily when they reach the top.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.session import async_session
+from app.models import ScheduledCall
+from app.services.metrics import Gauge
+from app.services.persistence import record_scheduled_call, update_scheduled_call
+
+logger = logging.getLogger(__name__)
+
+# Re-check the heap at least this often (guards against wall-clock jumps)
+_MAX_SLEEP_SECONDS = 300.0
+
+
+@dataclass
+class PendingCall:
+    user_phone: str
+    provider_phone: str
+    provider_name: str | None
+    language: str
+    dynamic_variables: dict[str, str]
+    due_at: datetime
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    cancelled: bool = False
+    restored: bool = False  # loaded from scheduled_calls at startup, not scheduled by this process
+
+
+Dispatcher = Callable[[PendingCall], Awaitable[str]]  # final status: "dialed", "failed" or "dropped"
+ExpiryHandler = Callable[[PendingCall], Awaitable[None]]
+
+_heap: list[tuple[float, int, PendingCall]] = []
+_calls: dict[uuid.UUID, PendingCall] = {}
+_sequence = itertools.count()
+_wake = asyncio.Event()
+_task: asyncio.Task | None = None
+_dispatch: Dispatcher | None = None
+_on_expired: ExpiryHandler | None = None
+
+Gauge("vocero_scheduled_calls_pending", "Deferred calls waiting for their provider to open.", lambda: len(_calls))
+
+
+def _push(call: PendingCall) -> None:
+    _calls[call.id] = call
+    heapq.heappush(_heap, (call.due_at.timestamp(), next(_sequence), call))
+    # Wake the runner if this call is now the earliest
+    if _heap[0][2] is call:
+        _wake.set()
+
+
+def schedule_call(
+    user_phone: str,
+    provider_phone: str,
+    provider_name: str | None,
+    language: str,
+    dynamic_variables: dict[str, str],
+    due_at: datetime,
+) -> PendingCall:
+    """Defer a call until due_at (aware datetime)."""
+    call = PendingCall(
+        user_phone=user_phone,
+        provider_phone=provider_phone,
+        provider_name=provider_name,
+        language=language,
+        dynamic_variables=dynamic_variables,
+        due_at=due_at,
+    )
+    _push(call)
+    record_scheduled_call(call.id, {
+        "user_phone": user_phone[:20],
+        "provider_name": provider_name[:255] if provider_name else None,
+        "provider_phone": provider_phone[:20],
+        "language": language,
+        "dynamic_variables": dynamic_variables,
+        "due_at": due_at.astimezone(timezone.utc).replace(tzinfo=None),
+        "status": "pending",
+        "created_at": datetime.utcnow(),
+    })
+    logger.info("Scheduled call to %s for %s (user ...%s)", provider_name or provider_phone, due_at.isoformat(), user_phone[-4:])
+    return call
+
+
+def cancel_calls_for(user_phone: str) -> int:
+    """Cancel every pending call of a user. Returns how many were cancelled."""
+    cancelled = [c for c in _calls.values() if c.user_phone == user_phone]
+    for call in cancelled:
+        call.cancelled = True
+        del _calls[call.id]
+        update_scheduled_call(call.id, "cancelled")
+    return len(cancelled)
+
+
+def pending_calls(user_phone: str | None = None) -> list[PendingCall]:
+    calls = sorted(_calls.values(), key=lambda c: c.due_at)
+    return [c for c in calls if user_phone is None or c.user_phone == user_phone]
+
+
+async def load_scheduled_calls() -> int:
+    """Re-heap persisted pending calls (called once at startup)."""
+    async with async_session() as session:
+        rows = await session.scalars(select(ScheduledCall).where(ScheduledCall.status == "pending"))
+        for row in rows:
+            if row.id in _calls:
+                continue
+            _push(PendingCall(
+                id=row.id,
+                user_phone=row.user_phone,
+                provider_phone=row.provider_phone,
+                provider_name=row.provider_name,
+                language=row.language,
+                dynamic_variables=dict(row.dynamic_variables or {}),
+                due_at=row.due_at.replace(tzinfo=timezone.utc),
+                restored=True,
+            ))
+    logger.info("Loaded %d scheduled calls", len(_calls))
+    return len(_calls)
+
+
+async def _fire(call: PendingCall) -> None:
+    late = datetime.now(timezone.utc) - call.due_at
+    try:
+        if late > timedelta(minutes=settings.call_schedule_max_lateness_minutes):
+            update_scheduled_call(call.id, "expired")
+            logger.warning("Scheduled call %s expired (%.0f min late)", call.id, late.total_seconds() / 60)
+            if _on_expired:
+                await _on_expired(call)
+            return
+        # Not "pending" any more, so a restart mid-dispatch doesn't dial it twice
+        update_scheduled_call(call.id, "dialing")
+        update_scheduled_call(call.id, await _dispatch(call))
+    except Exception:
+        update_scheduled_call(call.id, "failed")
+        logger.exception("Scheduled call %s failed", call.id)
+
+
+async def _run() -> None:
+    while True:
+        _wake.clear()
+        while _heap and _heap[0][2].cancelled:
+            heapq.heappop(_heap)
+        if _heap:
+            delay = _heap[0][0] - datetime.now(timezone.utc).timestamp()
+            if delay <= 0:
+                _, _, call = heapq.heappop(_heap)
+                _calls.pop(call.id, None)
+                asyncio.create_task(_fire(call))
+                continue
+        else:
+            delay = _MAX_SLEEP_SECONDS
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=min(delay, _MAX_SLEEP_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_call_scheduler(dispatch: Dispatcher, on_expired: ExpiryHandler | None = None) -> None:
+    """Start dialing due calls through `dispatch` (idempotent)."""
+    global _task, _dispatch, _on_expired
+    _dispatch = dispatch
+    _on_expired = on_expired
+    if _task is None:
+        _task = asyncio.create_task(_run())
+
+
+def stop_call_scheduler() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
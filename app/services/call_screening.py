@@ -0,0 +1,194 @@
+"""Early voicemail / IVR / hold-music screening of outbound calls.
+
+Twilio forks the provider's side of the call (8kHz μ-law, 20ms frames) to our
+media stream while ElevenLabs runs the conversation. We classify the first
+seconds of audio so calls that hit a machine can be hung up right away
+instead of burning minutes until the agent gives up.
+
+Heuristics (classic answering-machine detection):
+- Human: a short greeting ("Hola?") followed by silence.
+- Voicemail: a beep (pure tone), or talking for 7s without a pause for an answer.
+- IVR / hold music: long continuous audio with a steady energy envelope.
+
+A longer spoken greeting that pauses ("Buenos dias, consultorio X, le habla Y,
+en que puedo ayudarle?") is how receptionists answer too: the screener keeps
+listening for a beep and, if none comes, leaves the call up.
+"""
+
+import logging
+import time
+from enum import StrEnum
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000
+FRAME_SAMPLES = 160  # 20ms at 8kHz
+FRAMES_PER_SECOND = SAMPLE_RATE // FRAME_SAMPLES
+
+_SILENCE_DB = -45.0          # Frame energy below this is silence
+_END_OF_GREETING_FRAMES = 40  # 800ms of silence ends an utterance
+_HUMAN_MAX_FRAMES = 90       # Greeting shorter than 1.8s → human
+_MACHINE_MIN_FRAMES = 175    # Steady continuous audio longer than 3.5s → IVR / music
+_VOICEMAIL_MIN_FRAMES = 350  # Talking 7s without pausing for an answer → recorded greeting
+_STEADY_ENERGY_STD_DB = 4.0  # Music / tones have a flat envelope; speech doesn't
+_CONTINUOUS_VOICED_SHARE = 0.9
+_BEEP_MIN_FRAMES = 8         # 160ms of pure tone
+_BEEP_PEAK_RATIO = 0.6       # Share of spectral power in the strongest bin
+_BEEP_MIN_HZ = 300.0
+_BEEP_MAX_HZ = 2500.0
+
+
+class CallScreeningOutcome(StrEnum):
+    HUMAN = "human"
+    VOICEMAIL = "voicemail"
+    IVR = "ivr"
+    UNKNOWN = "unknown"
+
+
+def _build_ulaw_table() -> np.ndarray:
+    """G.711 μ-law → linear PCM lookup for all 256 codes."""
+    codes = ~np.arange(256, dtype=np.uint8)
+    mantissa = (codes & 0x0F).astype(np.int32)
+    exponent = ((codes >> 4) & 0x07).astype(np.int32)
+    magnitude = ((mantissa << 3) + 0x84) << exponent
+    pcm = np.where(codes & 0x80, 0x84 - magnitude, magnitude - 0x84)
+    return (pcm / 32768.0).astype(np.float32)
+
+
+_ULAW_TABLE = _build_ulaw_table()
+_FREQS = np.fft.rfftfreq(FRAME_SAMPLES, d=1.0 / SAMPLE_RATE)
+_BEEP_BAND = (_FREQS >= _BEEP_MIN_HZ) & (_FREQS <= _BEEP_MAX_HZ)
+
+
+def decode_ulaw(payload: bytes) -> np.ndarray:
+    """Decode μ-law bytes to float32 samples in [-1, 1]."""
+    return _ULAW_TABLE[np.frombuffer(payload, dtype=np.uint8)]
+
+
+def _longest_run(mask: np.ndarray) -> int:
+    """Length of the longest run of True values."""
+    if not mask.any():
+        return 0
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+class CallScreener:
+    """Incremental classifier fed with raw μ-law audio from the media stream."""
+
+    def __init__(self, window_seconds: float | None = None) -> None:
+        window = window_seconds or settings.call_screening_window_seconds
+        self._max_frames = int(window * FRAMES_PER_SECOND)
+        self._pending = b""
+        self._energy_db = np.empty(0, dtype=np.float32)
+        self._beep = np.empty(0, dtype=bool)
+        self.outcome: CallScreeningOutcome | None = None
+
+    @property
+    def seconds_analyzed(self) -> float:
+        return len(self._energy_db) / FRAMES_PER_SECOND
+
+    def feed(self, payload: bytes) -> CallScreeningOutcome | None:
+        """Add audio and return the outcome once it has been decided."""
+        if self.outcome is not None:
+            return self.outcome
+
+        data = self._pending + payload
+        n_frames = len(data) // FRAME_SAMPLES
+        self._pending = data[n_frames * FRAME_SAMPLES:]
+        if n_frames == 0:
+            return None
+
+        frames = decode_ulaw(data[: n_frames * FRAME_SAMPLES]).reshape(n_frames, FRAME_SAMPLES)
+        energy_db = 10.0 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        total = power.sum(axis=1) + 1e-12
+        peak_bin = power.argmax(axis=1)
+        peak_ratio = power[np.arange(n_frames), peak_bin] / total
+        beep = (peak_ratio >= _BEEP_PEAK_RATIO) & _BEEP_BAND[peak_bin] & (energy_db > _SILENCE_DB)
+
+        self._energy_db = np.concatenate((self._energy_db, energy_db.astype(np.float32)))
+        self._beep = np.concatenate((self._beep, beep))
+
+        self.outcome = self._classify()
+        return self.outcome
+
+    def _classify(self) -> CallScreeningOutcome | None:
+        voiced = self._energy_db > _SILENCE_DB
+        n = len(voiced)
+
+        if _longest_run(self._beep) >= _BEEP_MIN_FRAMES:
+            return CallScreeningOutcome.VOICEMAIL
+
+        voiced_idx = np.flatnonzero(voiced)
+        if len(voiced_idx):
+            start = voiced_idx[0]
+            # Greeting = voiced frames until the first long enough silence gap
+            silent_after = ~voiced[start:]
+            padded = np.concatenate(([0], silent_after.astype(np.int8), [0]))
+            edges = np.flatnonzero(np.diff(padded))
+            gap_starts, gap_ends = edges[::2], edges[1::2]
+            long_gaps = np.flatnonzero(gap_ends - gap_starts >= _END_OF_GREETING_FRAMES)
+            if len(long_gaps):
+                greeting_frames = int(gap_starts[long_gaps[0]])
+                if greeting_frames <= _HUMAN_MAX_FRAMES:
+                    return CallScreeningOutcome.HUMAN
+            else:
+                greeting_frames = n - start
+
+            if greeting_frames >= _MACHINE_MIN_FRAMES:
+                greeting_voiced = voiced[start:start + greeting_frames]
+                greeting_db = self._energy_db[start:start + greeting_frames][greeting_voiced]
+                # Speech pauses between words; music and tones don't
+                continuous = greeting_voiced.mean() >= _CONTINUOUS_VOICED_SHARE
+                if continuous and float(np.std(greeting_db)) < _STEADY_ENERGY_STD_DB:
+                    return CallScreeningOutcome.IVR
+                if not len(long_gaps) and greeting_frames >= _VOICEMAIL_MIN_FRAMES:
+                    return CallScreeningOutcome.VOICEMAIL
+                # Long but paused for an answer: wait for a beep before calling it a machine
+
+        if n >= self._max_frames:
+            if not len(voiced_idx):
+                return CallScreeningOutcome.UNKNOWN
+            if greeting_frames >= _MACHINE_MIN_FRAMES:
+                logger.info("Long greeting (%.1fs) without a beep: leaving the call up", greeting_frames / FRAMES_PER_SECOND)
+            return CallScreeningOutcome.HUMAN
+        return None
+
+
+# Screening outcomes waiting for the call-status callback: call_sid -> (outcome, recorded at)
+_outcomes: dict[str, tuple[CallScreeningOutcome, float]] = {}
+_OUTCOME_TTL_SECONDS = 2 * 3600  # Calls whose status callback never arrives
+
+
+def _expire_outcomes() -> None:
+    cutoff = time.monotonic() - _OUTCOME_TTL_SECONDS
+    # Insertion order is recording order: stop at the first fresh entry
+    for call_sid, (_, recorded) in list(_outcomes.items()):
+        if recorded >= cutoff:
+            break
+        del _outcomes[call_sid]
+
+
+def record_outcome(call_sid: str, outcome: CallScreeningOutcome) -> None:
+    """Remember how a call was classified until its status callback arrives."""
+    _expire_outcomes()
+    _outcomes.pop(call_sid, None)
+    _outcomes[call_sid] = (outcome, time.monotonic())
+
+
+def pop_outcome(call_sid: str) -> CallScreeningOutcome | None:
+    """Remove and return the screening outcome for a finished call."""
+    entry = _outcomes.pop(call_sid, None)
+    return entry[0] if entry else None
+
+
+def is_machine(outcome: CallScreeningOutcome | None) -> bool:
+    """True when nobody is on the line and the call should be dropped."""
+    return outcome in (CallScreeningOutcome.VOICEMAIL, CallScreeningOutcome.IVR)
@@ -5,6 +5,8 @@ from dataclasses import dataclass
 import httpx
 
 from app.config import settings
+from app.log_config import body as log_body
+from app.services.phone import canonical_phone
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +22,6 @@ class ParsedContact:
     phone: str
 
 
-def _normalize_phone(raw: str) -> str:
-    """Strip everything except digits and leading +."""
-    digits = re.sub(r"[^\d+]", "", raw)
-    if not digits.startswith("+"):
-        digits = "+" + digits
-    return digits
-
-
 def parse_vcard(vcard_text: str) -> ParsedContact | None:
     """Extract name and phone from a vCard string."""
     name = None
@@ -43,7 +37,7 @@ def parse_vcard(vcard_text: str) -> ParsedContact | None:
     if not phone:
         return None
 
-    return ParsedContact(name=name, phone=_normalize_phone(phone))
+    return ParsedContact(name=name, phone=canonical_phone(phone))
 
 
 async def download_and_parse_vcard(media_url: str) -> ParsedContact | None:
@@ -58,7 +52,7 @@ async def download_and_parse_vcard(media_url: str) -> ParsedContact | None:
             return None
         vcard_text = resp.text
 
-    logger.info("Downloaded vCard: %s", vcard_text[:200])
+    logger.info("Downloaded vCard: %s", log_body(vcard_text))
     return parse_vcard(vcard_text)
 
 
@@ -67,4 +61,4 @@ def extract_phone_from_text(text: str) -> str | None:
     match = _PHONE_RE.search(text)
     if not match:
         return None
-    return _normalize_phone(match.group())
+    return canonical_phone(match.group())
@@ -6,10 +6,17 @@ Twilio directly to ElevenLabs WebSocket (no manual audio bridge).
 
 import json
 import logging
+import re
+import time
 
 import httpx
 
 from app.config import settings
+from app.services.metrics import CALL_PHASE_SECONDS, CALLS, timed
+from app.services.numbering_plan import InvalidNumberError, validate_for_dial
+from app.services.provider_lines import ProviderBusyError, bind_call, provider_line
+from app.services.reputation import mark_dialed
+from app.services.tracing import bind, new_span, start_span, use_span
 
 logger = logging.getLogger(__name__)
 
@@ -27,69 +34,132 @@ async def make_outbound_call(
     1. Register call with ElevenLabs → get TwiML (points to ElevenLabs WS)
     2. Create Twilio call with that TwiML
     3. Twilio connects directly to ElevenLabs (handles audio natively)
+
+    The call's trace span stays open (bound to its call_sid and conversation_id)
+    until the status callback reports the call finished.
     """
+    call = new_span("call", to=to_number, language=language)
+    call_sid = ""
+    try:
+        with use_span(call), start_span("call.dial"):
+            conversation_id, call_sid = await _place_call(to_number, dynamic_variables, language)
+    except InvalidNumberError:
+        CALLS.inc(result="invalid")
+        raise
+    except ProviderBusyError:
+        CALLS.inc(result="busy")
+        raise
+    except Exception:
+        CALLS.inc(result="error")
+        raise
+    finally:
+        if call is not None and not call_sid:
+            call.end()  # Never placed: no status callback will close it
+    CALLS.inc(result="placed" if call_sid else "error")
+    bind(call_sid, call)
+    bind(conversation_id, call)
+    return conversation_id, call_sid
+
+
+async def _place_call(to_number: str, dynamic_variables: dict[str, str] | None, language: str) -> tuple[str, str]:
+    # Raises InvalidNumberError before anything is spent on a number we can't dial
+    with timed(CALL_PHASE_SECONDS, phase="validate"):
+        to_number = validate_for_dial(to_number).phone
+
     # Pick agent based on language
     agent_id = settings.elevenlabs_agent_id_en if language == "en" else settings.elevenlabs_agent_id
     logger.info("Using %s agent: %s", language, agent_id)
 
-    # Step 1: Register call with ElevenLabs
-    register_body: dict = {
-        "agent_id": agent_id,
-        "from_number": settings.twilio_phone_number,
-        "to_number": to_number,
-        "direction": "outbound",
-    }
-    if dynamic_variables:
-        register_body["conversation_initiation_client_data"] = {
-            "dynamic_variables": dynamic_variables,
+    # Wait if another of our calls holds this provider's line (see app.services.provider_lines)
+    waiting = time.perf_counter()
+    async with provider_line(to_number) as line:
+        CALL_PHASE_SECONDS.observe(time.perf_counter() - waiting, phase="line_wait")
+        # Step 1: Register call with ElevenLabs
+        register_body: dict = {
+            "agent_id": agent_id,
+            "from_number": settings.twilio_phone_number,
+            "to_number": to_number,
+            "direction": "outbound",
         }
+        if dynamic_variables:
+            register_body["conversation_initiation_client_data"] = {
+                "dynamic_variables": dynamic_variables,
+            }
+
+        with timed(CALL_PHASE_SECONDS, phase="register"):
+            async with httpx.AsyncClient() as client:
+                reg_resp = await client.post(
+                    f"{settings.elevenlabs_base_url}/convai/twilio/register-call",
+                    headers={
+                        "xi-api-key": settings.elevenlabs_api_key,
+                        "Content-Type": "application/json",
+                    },
+                    json=register_body,
+                )
+                reg_resp.raise_for_status()
+                twiml = reg_resp.text
+
+        logger.info("ElevenLabs register-call OK, got TwiML (%d bytes)", len(twiml))
+
+        # Extract conversation_id from TwiML parameter if present
+        conversation_id = ""
+        if 'name="conversation_id"' in twiml:
+            match = re.search(r'name="conversation_id"\s+value="([^"]+)"', twiml)
+            if match:
+                conversation_id = match.group(1)
+                logger.info("Conversation ID from TwiML: %s", conversation_id)
+
+        if settings.call_screening_enabled:
+            twiml = _add_screening_stream(twiml)
+
+        # Step 2: Create Twilio call with ElevenLabs TwiML
+        callback_url = f"{settings.app_base_url}/api/call-status"
+        with timed(CALL_PHASE_SECONDS, phase="dial"):
+            async with httpx.AsyncClient() as client:
+                resp = await client.post(
+                    f"{settings.twilio_base_url}/Accounts/{settings.twilio_account_sid}/Calls.json",
+                    auth=(settings.twilio_account_sid, settings.twilio_auth_token),
+                    data={
+                        "To": to_number,
+                        "From": settings.twilio_phone_number,
+                        "Twiml": twiml,
+                        "StatusCallback": callback_url,
+                        "StatusCallbackEvent": ["answered", "completed"],
+                    },
+                )
+                resp.raise_for_status()
+                call_data = resp.json()
+                call_sid = call_data.get("sid", "")
+
+        if conversation_id and call_sid:
+            _active_calls[call_sid] = conversation_id
+        mark_dialed(call_sid)
+        bind_call(line, call_sid)
 
-    async with httpx.AsyncClient() as client:
-        reg_resp = await client.post(
-            "https://api.elevenlabs.io/v1/convai/twilio/register-call",
-            headers={
-                "xi-api-key": settings.elevenlabs_api_key,
-                "Content-Type": "application/json",
-            },
-            json=register_body,
-        )
-        reg_resp.raise_for_status()
-        twiml = reg_resp.text
-
-    logger.info("ElevenLabs register-call OK, got TwiML (%d bytes)", len(twiml))
-
-    # Extract conversation_id from TwiML parameter if present
-    conversation_id = ""
-    if 'name="conversation_id"' in twiml:
-        import re
-        match = re.search(r'name="conversation_id"\s+value="([^"]+)"', twiml)
-        if match:
-            conversation_id = match.group(1)
-            logger.info("Conversation ID from TwiML: %s", conversation_id)
-
-    # Step 2: Create Twilio call with ElevenLabs TwiML
-    callback_url = f"{settings.app_base_url}/api/call-status"
+    logger.info("Outbound call: sid=%s conv=%s to=%s", call_sid, conversation_id, to_number)
+    return conversation_id, call_sid
+
+
+def _add_screening_stream(twiml: str) -> str:
+    """Fork the provider's audio to our media stream for voicemail/IVR screening.
+
+    <Start><Stream> is unidirectional and runs alongside ElevenLabs' <Connect>.
+    """
+    ws_base = re.sub(r"^http", "ws", settings.app_base_url)
+    fork = f'<Start><Stream url="{ws_base}/api/media-stream" track="inbound_track"/></Start>'
+    return re.sub(r"<Response>", "<Response>" + fork, twiml, count=1)
+
+
+async def end_call(call_sid: str) -> None:
+    """Hang up an in-progress Twilio call."""
     async with httpx.AsyncClient() as client:
         resp = await client.post(
-            f"https://api.twilio.com/2010-04-01/Accounts/{settings.twilio_account_sid}/Calls.json",
+            f"{settings.twilio_base_url}/Accounts/{settings.twilio_account_sid}/Calls/{call_sid}.json",
             auth=(settings.twilio_account_sid, settings.twilio_auth_token),
-            data={
-                "To": to_number,
-                "From": settings.twilio_phone_number,
-                "Twiml": twiml,
-                "StatusCallback": callback_url,
-                "StatusCallbackEvent": "completed",
-            },
+            data={"Status": "completed"},
         )
         resp.raise_for_status()
-        call_data = resp.json()
-        call_sid = call_data.get("sid", "")
-
-    if conversation_id and call_sid:
-        _active_calls[call_sid] = conversation_id
-
-    logger.info("Outbound call: sid=%s conv=%s to=%s", call_sid, conversation_id, to_number)
-    return conversation_id, call_sid
+    logger.info("Hung up call %s", call_sid)
 
 
 def get_conversation_id(call_sid: str) -> str | None:
@@ -106,7 +176,7 @@ async def fetch_conversation_details(conversation_id: str) -> dict | None:
     """Fetch conversation transcript and analysis from ElevenLabs."""
     async with httpx.AsyncClient() as client:
         resp = await client.get(
-            f"https://api.elevenlabs.io/v1/convai/conversations/{conversation_id}",
+            f"{settings.elevenlabs_base_url}/convai/conversations/{conversation_id}",
             headers={"xi-api-key": settings.elevenlabs_api_key},
             timeout=15.0,
         )
@@ -0,0 +1,159 @@
+"""Paginated read access to a user's request and call history.
+
+Pages use keyset pagination on (created_at, id) — each query is an index
+range scan regardless of how deep the user pages — and project only the
+columns needed for a listing. Transcripts are excluded unless asked for, and
+come from cold storage once archived (see app.services.transcript_archive).
+"""
+
+import base64
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, TypeVar
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Appointment, AppointmentRequest, CallLog
+from app.services.transcript_archive import load_transcript, load_transcripts
+
+MAX_PAGE_SIZE = 100
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class Cursor:
+    """Position after the last row of a page: (created_at, id) of that row."""
+    created_at: datetime
+    id: uuid.UUID
+
+    def encode(self) -> str:
+        raw = f"{self.created_at.isoformat()}|{self.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        try:
+            created_at, row_id = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+            return cls(created_at=datetime.fromisoformat(created_at), id=uuid.UUID(row_id))
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ValueError(f"Invalid history cursor: {token!r}") from exc
+
+
+@dataclass(slots=True)
+class RequestItem:
+    id: uuid.UUID
+    service_type: str
+    time_preference: str | None
+    location_preference: str | None
+    status: str
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class CallItem:
+    id: uuid.UUID
+    appointment_request_id: uuid.UUID
+    service_type: str
+    provider_name: str | None
+    provider_phone: str
+    status: str
+    duration_seconds: int | None
+    outcome: str | None
+    created_at: datetime
+    appointment_time: datetime | None
+    transcript: str | None = None
+
+
+@dataclass(slots=True)
+class Page(Generic[T]):
+    items: list[T]
+    next_cursor: str | None
+
+
+def _paginate(stmt: Select, model, limit: int, cursor: str | None) -> Select:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        after = Cursor.decode(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(after.created_at, after.id))
+    # One extra row tells us whether there is a next page
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def _page(items: list, limit: int) -> Page:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if len(items) <= limit:
+        return Page(items=items, next_cursor=None)
+    items = items[:limit]
+    last = items[-1]
+    return Page(items=items, next_cursor=Cursor(last.created_at, last.id).encode())
+
+
+async def list_requests(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> Page[RequestItem]:
+    """Newest-first appointment requests of a user."""
+    stmt = select(
+        AppointmentRequest.id,
+        AppointmentRequest.service_type,
+        AppointmentRequest.time_preference,
+        AppointmentRequest.location_preference,
+        AppointmentRequest.status,
+        AppointmentRequest.created_at,
+    ).where(AppointmentRequest.user_id == user_id)
+    rows = await session.execute(_paginate(stmt, AppointmentRequest, limit, cursor))
+    return _page([RequestItem(*row) for row in rows], limit)
+
+
+async def list_calls(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    limit: int = 20,
+    cursor: str | None = None,
+    status: str | None = None,
+    request_id: uuid.UUID | None = None,
+    include_transcript: bool = False,
+) -> Page[CallItem]:
+    """Newest-first calls of a user, optionally for one request or with one status."""
+    columns = [
+        CallLog.id,
+        CallLog.appointment_request_id,
+        AppointmentRequest.service_type,
+        CallLog.provider_name,
+        CallLog.provider_phone,
+        CallLog.status,
+        CallLog.duration_seconds,
+        CallLog.outcome,
+        CallLog.created_at,
+        Appointment.appointment_time,
+    ]
+    if include_transcript:
+        columns.append(CallLog.transcript)
+    stmt = (
+        select(*columns)
+        .join(AppointmentRequest, CallLog.appointment_request_id == AppointmentRequest.id)
+        .outerjoin(Appointment, Appointment.call_log_id == CallLog.id)
+        .where(AppointmentRequest.user_id == user_id)
+    )
+    if request_id is not None:
+        stmt = stmt.where(CallLog.appointment_request_id == request_id)
+    if status is not None:
+        stmt = stmt.where(CallLog.status == status)
+    rows = await session.execute(_paginate(stmt, CallLog, limit, cursor))
+    page = _page([CallItem(*row) for row in rows], limit)
+    if include_transcript:
+        archived = await load_transcripts(session, [c.id for c in page.items if c.transcript is None])
+        for item in page.items:
+            item.transcript = item.transcript or archived.get(item.id)
+    return page
+
+
+async def get_transcript(session: AsyncSession, call_log_id: uuid.UUID) -> str | None:
+    """Transcript of a single call (the only place listings pay for it)."""
+    transcript = await session.scalar(select(CallLog.transcript).where(CallLog.id == call_log_id))
+    return transcript if transcript is not None else await load_transcript(session, call_log_id)
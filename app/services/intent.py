@@ -1,14 +1,33 @@
+import asyncio
+import hashlib
+import json
 import logging
+from functools import lru_cache
+from typing import Awaitable, Callable
 
 import httpx
 
 from app.config import settings
 from app.schemas.intent import IntentResult
+from app.services.intent_cache import IntentCache, IntentCacheStats
+from app.services.json_stream import IncrementalObjectParser
 
 logger = logging.getLogger(__name__)
 
 _client: httpx.AsyncClient | None = None
 
+_MODEL = "gpt-5.2"
+
+_cache = IntentCache(
+    max_entries=settings.intent_cache_max_entries,
+    ttl_seconds=settings.intent_cache_ttl_seconds,
+    min_confidence=settings.intent_cache_min_confidence,
+)
+_CACHE_LOG_EVERY = 100
+
+# Fields the structured output emits before response_message (schema order)
+_HEAD_FIELDS = {"intent", "entities", "language", "confidence"}
+
 SYSTEM_PROMPT = """\
 You are Vocero, a friendly WhatsApp assistant that makes phone calls on behalf of users. You speak naturally, like a helpful friend — never robotic.
 
@@ -124,7 +143,7 @@ def _get_client() -> httpx.AsyncClient:
     global _client
     if _client is None:
         _client = httpx.AsyncClient(
-            base_url="https://api.openai.com/v1",
+            base_url=settings.openai_base_url,
             headers={
                 "Authorization": f"Bearer {settings.openai_api_key}",
                 "Content-Type": "application/json",
@@ -134,38 +153,136 @@ def _get_client() -> httpx.AsyncClient:
     return _client
 
 
-async def extract_intent(message: str, context: str | None = None) -> IntentResult:
-    """Extract intent and entities from a user message using GPT-5 mini."""
-    client = _get_client()
+@lru_cache(maxsize=8)
+def _prompt_version(system_prompt: str, model: str) -> str:
+    """Fingerprint of everything that shapes the output; part of every cache key."""
+    schema = json.dumps(_JSON_SCHEMA, sort_keys=True)
+    return hashlib.sha256(f"{model}\n{schema}\n{system_prompt}".encode()).hexdigest()[:16]
+
+
+def intent_cache_stats() -> IntentCacheStats:
+    return _cache.stats
+
+
+def _log_cache_stats() -> None:
+    stats = _cache.stats
+    if (stats.hits + stats.misses) % _CACHE_LOG_EVERY == 0:
+        logger.info(
+            "Intent cache: hit_rate=%.2f hits=%d misses=%d size=%d evictions=%d",
+            stats.hit_rate, stats.hits, stats.misses, len(_cache), stats.evictions,
+        )
 
+
+def _lookup_cache(message: str, context: str | None) -> tuple[tuple | None, IntentResult | None]:
+    if not settings.intent_cache_enabled:
+        return None, None
+    cache_key = IntentCache.make_key(_prompt_version(SYSTEM_PROMPT, _MODEL), message, context)
+    cached = _cache.get(cache_key)
+    _log_cache_stats()
+    if cached is not None:
+        logger.info("Intent cache hit: %s (%.2f)", cached.intent, cached.confidence)
+    return cache_key, cached
+
+
+def _request_body(message: str, context: str | None, stream: bool = False) -> dict:
     user_content = message
     if context:
         user_content = f"[Conversation context: {context}]\n\nUser message: {message}"
 
-    resp = await client.post(
-        "/chat/completions",
-        json={
-            "model": "gpt-5.2",
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_content},
-            ],
-            "response_format": {
-                "type": "json_schema",
-                "json_schema": _JSON_SCHEMA,
-            },
+    body = {
+        "model": _MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content},
+        ],
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": _JSON_SCHEMA,
         },
-    )
-    resp.raise_for_status()
+    }
+    if stream:
+        body["stream"] = True
+    return body
 
-    data = resp.json()
-    content = data["choices"][0]["message"]["content"]
-    result = IntentResult.model_validate_json(content)
 
+def _finish(result: IntentResult, cache_key: tuple | None) -> IntentResult:
     logger.info(
         "Intent: %s (%.2f) lang=%s entities=%s",
         result.intent, result.confidence, result.language,
         result.entities.model_dump(exclude_none=True),
     )
-
+    if cache_key is not None:
+        _cache.put(cache_key, result)
     return result
+
+
+async def extract_intent(message: str, context: str | None = None) -> IntentResult:
+    """Extract intent and entities from a user message using GPT-5 mini.
+
+    Confident results are cached by (prompt version, context hash, normalized text).
+    """
+    cache_key, cached = _lookup_cache(message, context)
+    if cached is not None:
+        return cached
+
+    client = _get_client()
+    resp = await client.post("/chat/completions", json=_request_body(message, context))
+    resp.raise_for_status()
+
+    data = resp.json()
+    content = data["choices"][0]["message"]["content"]
+    return _finish(IntentResult.model_validate_json(content), cache_key)
+
+
+async def extract_intent_streaming(
+    message: str,
+    context: str | None = None,
+    on_head: Callable[[IntentResult], Awaitable[None]] | None = None,
+) -> IntentResult:
+    """Like extract_intent, but streams the completion.
+
+    As soon as intent, entities, language and confidence are parsed, `on_head`
+    runs with a partial result (empty response_message) while the message text
+    is still being generated. Returns the full result once the stream ends.
+    """
+    cache_key, cached = _lookup_cache(message, context)
+    if cached is not None:
+        if on_head:
+            await on_head(cached)
+        return cached
+
+    client = _get_client()
+    parser = IncrementalObjectParser()
+    head_task: asyncio.Task | None = None
+
+    try:
+        async with client.stream(
+            "POST", "/chat/completions", json=_request_body(message, context, stream=True)
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if not delta:
+                    continue
+                parser.feed(delta)
+                if on_head and head_task is None and _HEAD_FIELDS <= parser.fields.keys():
+                    head = IntentResult.model_validate({**parser.fields, "response_message": ""})
+                    head_task = asyncio.create_task(on_head(head))
+
+        if not parser.done:
+            raise ValueError("Intent stream ended before the JSON object was complete")
+        result = IntentResult.model_validate(parser.fields)
+    finally:
+        # Whatever the head already started must settle before we return or raise
+        if head_task is not None:
+            await head_task
+
+    if on_head and head_task is None:
+        await on_head(result)
+    return _finish(result, cache_key)
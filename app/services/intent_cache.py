@@ -0,0 +1,92 @@
+"""In-memory cache for context-free, high-frequency intent extractions.
+
+"hola", "gracias" or "quiero turno" without context always parse the same way,
+so confident results are reused instead of paying for another GPT call.
+Keys include a hash of the prompt/schema/model, so editing SYSTEM_PROMPT
+invalidates every entry automatically.
+"""
+
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.schemas.intent import IntentResult
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s+]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop accents/punctuation and collapse whitespace ("¡Gracias!" == "gracias")."""
+    text = unicodedata.normalize("NFKD", message.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+@dataclass
+class IntentCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class IntentCache:
+    """LRU + TTL cache of IntentResult keyed by (prompt version, context, message)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, min_confidence: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_confidence = min_confidence
+        self.stats = IntentCacheStats()
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, IntentResult]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(prompt_version: str, message: str, context: str | None) -> tuple[str, str, str]:
+        return prompt_version, _digest(context) if context else "", normalize_message(message)
+
+    def get(self, key: tuple[str, str, str]) -> IntentResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        # Callers own the returned object; never hand out the cached instance
+        return result.model_copy(deep=True)
+
+    def put(self, key: tuple[str, str, str], result: IntentResult) -> None:
+        if result.confidence < self.min_confidence or not key[2]:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        self.stats.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
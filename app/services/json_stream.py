@@ -0,0 +1,69 @@
+"""Incremental JSON object parser for streamed LLM completions.
+
+Structured outputs arrive token by token. This parser exposes each top-level
+field of the object as soon as its value is complete, so callers can act on
+early fields (intent, entities) while later ones (response_message) are
+still being generated.
+"""
+
+import json
+
+
+class IncrementalObjectParser:
+    """Feed chunks of a JSON object; completed top-level fields land in `fields`."""
+
+    def __init__(self) -> None:
+        self.fields: dict = {}
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: str | None = None
+        self._key_start: int | None = None
+        self._value_start: int | None = None
+        self.done = False
+
+    def feed(self, chunk: str) -> list[str]:
+        """Consume a chunk. Returns the names of fields completed by it."""
+        self._text += chunk
+        completed: list[str] = []
+        text = self._text
+
+        while self._pos < len(text):
+            c = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None and self._key_start is not None:
+                        self._key = json.loads(text[self._key_start:self._pos + 1])
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = self._pos
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_field(completed)
+                    self.done = True
+            elif c == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = self._pos + 1
+            elif c == "," and self._depth == 1:
+                self._finish_field(completed)
+            self._pos += 1
+
+        return completed
+
+    def _finish_field(self, completed: list[str]) -> None:
+        if self._key is not None and self._value_start is not None:
+            self.fields[self._key] = json.loads(self._text[self._value_start:self._pos])
+            completed.append(self._key)
+        self._key = None
+        self._key_start = None
+        self._value_start = None
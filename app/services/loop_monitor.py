@@ -0,0 +1,134 @@
+"""Event-loop lag sampler and slow-callback detector.
+
+Everything (WhatsApp webhooks, voice tool calls, status callbacks) shares
+one asyncio loop, so any callback that blocks it delays every user. A
+sampler task sleeps loop_lag_sample_interval_seconds at a time and records
+how late it wakes up. A watchdog thread watches the sampler's heartbeat:
+when the loop hasn't come back for slow_callback_threshold_ms, it grabs the
+loop thread's stack while the blocking code is still on it. The sampler
+pairs that stack with the stall's total duration once the loop is free.
+
+Overhead is one timer wakeup per interval on the loop and a few Python
+bytecodes per check in the watchdog. Unlike loop.set_debug(), nothing is
+added to every callback.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.services.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+_STACK_FRAMES = 25
+
+LOOP_LAG_SECONDS = Histogram(
+    "vocero_event_loop_lag_seconds", "How late the loop lag sampler woke up.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = Counter(
+    "vocero_event_loop_stalls_total", "Times the event loop was blocked longer than slow_callback_threshold_ms.",
+)
+
+
+@dataclass
+class Stall:
+    at: str
+    duration_ms: float
+    stack: list[str] | None  # None if the watchdog didn't catch it in the act
+
+
+_stalls: deque[Stall] = deque(maxlen=20)
+_stats = {"samples": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0}
+_beat = 0.0  # monotonic time the sampler last ran on the loop
+_caught: tuple[float, list[str]] | None = None  # (heartbeat, stack) the watchdog captured during a stall
+_loop_thread_id: int | None = None
+_task: asyncio.Task | None = None
+_stop = threading.Event()
+
+Gauge("vocero_event_loop_max_lag_seconds", "Worst loop lag seen since start.", lambda: _stats["max_lag_ms"] / 1000)
+
+
+def _threshold() -> float:
+    return settings.slow_callback_threshold_ms / 1000
+
+
+def _watchdog() -> None:
+    """Thread: snapshot the loop thread's stack while it is stalled."""
+    global _caught
+    interval = settings.loop_lag_sample_interval_seconds
+    check_every = max(_threshold() / 2, 0.01)
+    while not _stop.wait(check_every):
+        beat = _beat
+        if not beat or (_caught and _caught[0] == beat) or time.monotonic() - beat < interval + _threshold():
+            continue
+        frame = sys._current_frames().get(_loop_thread_id)
+        if frame is not None:
+            _caught = (beat, traceback.format_stack(frame)[-_STACK_FRAMES:])
+
+
+def _record(lag: float, beat: float) -> None:
+    global _caught
+    _stats["samples"] += 1
+    _stats["last_lag_ms"] = round(lag * 1000, 1)
+    _stats["max_lag_ms"] = max(_stats["max_lag_ms"], _stats["last_lag_ms"])
+    LOOP_LAG_SECONDS.observe(lag)
+    if lag >= _threshold():
+        LOOP_STALLS.inc()
+        stack = _caught[1] if _caught and _caught[0] == beat else None
+        stall = Stall(datetime.now(timezone.utc).isoformat(), round(lag * 1000, 1), stack)
+        _stalls.append(stall)
+        logger.warning(
+            "Event loop blocked for %.0fms%s", stall.duration_ms,
+            ":\n" + "".join(stall.stack) if stall.stack else " (no stack captured)",
+        )
+    _caught = None
+
+
+async def _sample() -> None:
+    global _beat
+    interval = settings.loop_lag_sample_interval_seconds
+    while True:
+        beat = _beat = time.monotonic()
+        await asyncio.sleep(interval)
+        _record(max(time.monotonic() - beat - interval, 0.0), beat)
+
+
+def start_loop_monitor() -> None:
+    """Start sampling the running loop (idempotent; off unless loop_monitor_enabled)."""
+    global _task, _loop_thread_id
+    if not settings.loop_monitor_enabled or _task is not None:
+        return
+    _loop_thread_id = threading.get_ident()
+    _stop.clear()
+    _task = asyncio.create_task(_sample())
+    threading.Thread(target=_watchdog, name="loop-watchdog", daemon=True).start()
+
+
+def stop_loop_monitor() -> None:
+    global _task, _beat
+    _stop.set()
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    _beat = 0.0
+
+
+def loop_stats() -> dict:
+    """Lag figures plus the most recent stalls (newest first), for /debug/loop."""
+    return {
+        "enabled": _task is not None,
+        "sample_interval_seconds": settings.loop_lag_sample_interval_seconds,
+        "slow_callback_threshold_ms": settings.slow_callback_threshold_ms,
+        "stalls": int(LOOP_STALLS.value()),
+        **_stats,
+        "recent_stalls": [asdict(s) for s in reversed(_stalls)],
+    }
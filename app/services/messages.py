@@ -4,11 +4,15 @@ import json
 import logging
 import re
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime
 
 import httpx
 
 from app.config import settings
+from app.services.call_screening import CallScreeningOutcome
+from app.services.preferences import LOCAL_TZ
+from app.services.state import CallToolReport
+from app.services.transcript_compaction import compact_transcript
 
 logger = logging.getLogger(__name__)
 
@@ -36,8 +40,15 @@ Rules for booking fields:
 - duration_minutes: estimate based on the service type if not explicitly stated (default 60).
 - service_description: short label of what was booked, e.g. "Corte de pelo con Juan", "Consulta médica", "Revisión del auto". Do NOT include date/time here.
 - notes: any extra useful info for the user (cost, what to bring, instructions). Keep it factual and short. Do NOT include internal reasoning or analysis.
+
+Rules for call fields:
+- reached: "person" if someone at the provider talked with the agent, "voicemail" for an answering machine or phone menu, "nobody" if no one answered.
+- no_availability: true ONLY if a person at the provider said they have no slot for the request.
 """
 
+# Summary "reached" -> reputation outcome (see app.services.reputation)
+_REACHED_OUTCOMES = {"person": "answered", "voicemail": "voicemail", "nobody": "no-answer"}
+
 _SUMMARY_SCHEMA = {
     "type": "object",
     "properties": {
@@ -50,8 +61,13 @@ _SUMMARY_SCHEMA = {
         "address": {"anyOf": [{"type": "string"}, {"type": "null"}]},
         "service_description": {"anyOf": [{"type": "string"}, {"type": "null"}], "description": "Short label: Corte de pelo con Juan"},
         "notes": {"anyOf": [{"type": "string"}, {"type": "null"}], "description": "Extra info: cost, what to bring, etc."},
+        "reached": {"type": "string", "enum": ["person", "voicemail", "nobody"]},
+        "no_availability": {"type": "boolean"},
     },
-    "required": ["summary_text", "booking_confirmed", "date", "time", "duration_minutes", "provider_name", "address", "service_description", "notes"],
+    "required": [
+        "summary_text", "booking_confirmed", "date", "time", "duration_minutes", "provider_name", "address",
+        "service_description", "notes", "reached", "no_availability",
+    ],
     "additionalProperties": False,
 }
 
@@ -68,13 +84,17 @@ class SmartSummaryResult:
     address: str | None = None
     service_description: str | None = None
     notes: str | None = None
+    # For provider reputation: who picked up (answered, voicemail, no-answer or unknown),
+    # and whether a person there said they had no slot
+    outcome: str = "answered"
+    no_availability: bool = False
 
 
 def _get_client() -> httpx.AsyncClient:
     global _client
     if _client is None:
         _client = httpx.AsyncClient(
-            base_url="https://api.openai.com/v1",
+            base_url=settings.openai_base_url,
             headers={
                 "Authorization": f"Bearer {settings.openai_api_key}",
                 "Content-Type": "application/json",
@@ -85,9 +105,9 @@ def _get_client() -> httpx.AsyncClient:
 
 
 def _build_transcript_text(conversation_data: dict, provider_name: str) -> str:
-    """Build a plain-text transcript for LLM analysis."""
+    """Build a compacted plain-text transcript for LLM analysis."""
     transcript = conversation_data.get("transcript", [])
-    lines = []
+    turns: list[tuple[str, str]] = []
     for entry in transcript:
         role = entry.get("role", "")
         message = entry.get("message") or ""
@@ -95,10 +115,118 @@ def _build_transcript_text(conversation_data: dict, provider_name: str) -> str:
         if not message:
             continue
         if role == "agent":
-            lines.append(f"Vocero: {message}")
+            turns.append(("Vocero", message))
         elif role == "user":
-            lines.append(f"{provider_name}: {message}")
-    return "\n".join(lines)
+            turns.append((provider_name, message))
+
+    compacted = compact_transcript(turns, token_budget=settings.summary_transcript_token_budget)
+    logger.info(
+        "Transcript compacted: %d/%d turns, ~%d -> ~%d tokens (ratio %.2f)",
+        compacted.turns_kept, compacted.turns_total,
+        compacted.original_tokens, compacted.compacted_tokens, compacted.compression_ratio,
+    )
+    return compacted.text
+
+
+def _normalize_booking_datetime(raw_date: str, raw_time: str) -> tuple[str, str] | None:
+    """Return (YYYY-MM-DD, HH:MM) if the tool payload is already machine-readable."""
+    try:
+        day = datetime.strptime(raw_date.strip(), "%Y-%m-%d")
+        clock = datetime.strptime(raw_time.strip(), "%H:%M")
+    except (ValueError, AttributeError):
+        return None
+    return day.strftime("%Y-%m-%d"), clock.strftime("%H:%M")
+
+
+def _summary_from_tool_report(
+    report: CallToolReport | None, name: str, language: str
+) -> SmartSummaryResult | None:
+    """Build the summary from what the agent reported mid-call, if that's enough."""
+    if report is None:
+        return None
+
+    if report.booking:
+        when = _normalize_booking_datetime(report.booking.get("date", ""), report.booking.get("time", ""))
+        if not when:
+            return None
+        day, clock = when
+        notes = report.booking.get("notes")
+        if language == "es":
+            text = f"Turno confirmado para el *{day}* a las *{clock}*."
+            if notes:
+                text += f" Notas: {notes}"
+        else:
+            text = f"Appointment confirmed for *{day}* at *{clock}*."
+            if notes:
+                text += f" Notes: {notes}"
+        return SmartSummaryResult(
+            summary_text=text,
+            booking_confirmed=True,
+            date=day,
+            time=clock,
+            provider_name=report.booking.get("provider_name") or name,
+            notes=notes,
+        )
+
+    if report.no_availability_reason and not report.slots:
+        text = (
+            "No tienen turnos disponibles por ahora."
+            if language == "es"
+            else "They have no available slots right now."
+        )
+        return SmartSummaryResult(summary_text=text, booking_confirmed=False, provider_name=name, no_availability=True)
+
+    return None
+
+
+_VOICEMAIL_RE = re.compile(
+    r"deje su mensaje|dejá tu mensaje|deja tu mensaje|despu[eé]s del tono|buz[oó]n de voz|contestador"
+    r"|leave a message|after the (tone|beep)|voicemail|mailbox|not available to take your call",
+    re.IGNORECASE,
+)
+# Explicit phrases only: "equivocado" or "no existe" alone also show up in ordinary answers
+_WRONG_NUMBER_RE = re.compile(
+    r"n[uú]mero equivocado|equivoc[oó] de n[uú]mero|equivocado de n[uú]mero"
+    r"|n[uú]mero (que (usted )?(marc[oó]|disc[oó]) )?(no existe|es inexistente)|n[uú]mero inexistente"
+    r"|fuera de servicio|no corresponde a un abonado"
+    r"|wrong number|no longer in service|not in service|number (you (have )?dialed )?does not exist",
+    re.IGNORECASE,
+)
+_TRIVIAL_MAX_PROVIDER_WORDS = 25
+
+
+def _classify_trivial_transcript(
+    conversation_data: dict, name: str, language: str
+) -> SmartSummaryResult | None:
+    """Cheap local read of short calls (no answer, voicemail, wrong number)."""
+    transcript = conversation_data.get("transcript", [])
+    if not transcript:
+        return None
+    provider_lines = [
+        _clean_agent_text(entry.get("message") or "")
+        for entry in transcript
+        if entry.get("role") == "user"
+    ]
+    provider_text = " ".join(line for line in provider_lines if line)
+    if len(provider_text.split()) > _TRIVIAL_MAX_PROVIDER_WORDS:
+        return None
+
+    outcome = "answered"
+    if not provider_text:
+        text = "No atendio nadie." if language == "es" else "Nobody picked up."
+        outcome = "no-answer"
+    elif _VOICEMAIL_RE.search(provider_text):
+        text = "Salto el contestador, no pude hablar con nadie." if language == "es" else "It went to voicemail, I couldn't talk to anyone."
+        outcome = "voicemail"
+    elif _WRONG_NUMBER_RE.search(provider_text):
+        text = (
+            f"Parece que el numero de *{name}* es incorrecto."
+            if language == "es"
+            else f"Looks like the number for *{name}* is wrong."
+        )
+    else:
+        return None
+    return SmartSummaryResult(summary_text=text, booking_confirmed=False, provider_name=name, outcome=outcome)
 
 
 async def generate_smart_summary(
@@ -106,9 +234,22 @@ async def generate_smart_summary(
     provider_phone: str | None,
     conversation_data: dict,
     language: str = "es",
+    tool_report: CallToolReport | None = None,
 ) -> SmartSummaryResult:
-    """Use OpenAI to analyze the full transcript and return structured summary + booking data."""
+    """Return structured summary + booking data for a finished call.
+
+    Uses the tool data reported mid-call or a local read of trivial transcripts
+    when they already answer the question; only ambiguous calls go to OpenAI.
+    """
     name = provider_name or provider_phone or "?"
+
+    shortcut = _summary_from_tool_report(tool_report, name, language) or _classify_trivial_transcript(
+        conversation_data, name, language
+    )
+    if shortcut:
+        logger.info("Summary for %s built locally (booking=%s)", name, shortcut.booking_confirmed)
+        return shortcut
+
     transcript_text = _build_transcript_text(conversation_data, name)
 
     if not transcript_text:
@@ -117,7 +258,7 @@ async def generate_smart_summary(
             if language == "es"
             else f"Call with *{name}* finished. Couldn't get conversation details."
         )
-        return SmartSummaryResult(summary_text=fallback, booking_confirmed=False)
+        return SmartSummaryResult(summary_text=fallback, booking_confirmed=False, outcome="unknown")
 
     language_name = "Spanish" if language == "es" else "English"
     system_prompt = _SUMMARY_PROMPT.format(language_name=language_name, language_code=language)
@@ -167,6 +308,8 @@ async def generate_smart_summary(
             address=raw.get("address"),
             service_description=raw.get("service_description"),
             notes=raw.get("notes"),
+            outcome=_REACHED_OUTCOMES.get(raw.get("reached"), "unknown"),
+            no_availability=bool(raw.get("no_availability")) and raw.get("reached") == "person",
         )
 
     # Last resort: clean message, never garbage
@@ -174,7 +317,7 @@ async def generate_smart_summary(
         fallback = "La llamada termino. Pedime *\"transcript\"* para ver que se hablo."
     else:
         fallback = "The call ended. Send *\"transcript\"* to see what was discussed."
-    return SmartSummaryResult(summary_text=fallback, booking_confirmed=False)
+    return SmartSummaryResult(summary_text=fallback, booking_confirmed=False, outcome="unknown")
 
 
 def format_summary_message(result: SmartSummaryResult, provider_name: str, language: str = "es") -> str:
@@ -259,6 +402,50 @@ def format_call_failed(provider_name: str | None, language: str = "es") -> str:
     return f"Couldn't complete the call to *{name}*. Want me to try again?"
 
 
+def format_call_screened(
+    provider_name: str | None, outcome: CallScreeningOutcome = CallScreeningOutcome.VOICEMAIL, language: str = "es",
+) -> str:
+    """Single call hung up early because a voicemail / IVR answered."""
+    name = provider_name or ("el lugar" if language == "es" else "the provider")
+    if outcome == CallScreeningOutcome.IVR:
+        if language == "es":
+            return f"En *{name}* atendio un menu automatico, no una persona. Corte para no gastar minutos. Queres que intente de nuevo mas tarde?"
+        return f"*{name}* answered with an automated menu, not a person. I hung up to save minutes. Want me to try again later?"
+    if language == "es":
+        return f"*{name}* no atendio, salto el contestador. Corte para no gastar minutos. Queres que intente de nuevo mas tarde?"
+    return f"*{name}* didn't pick up, it went to voicemail. I hung up to save minutes. Want me to try again later?"
+
+
+_WEEKDAYS_ES = ("lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo")
+_WEEKDAYS_EN = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def format_call_scheduled(provider_name: str | None, due_at: datetime, language: str = "es") -> str:
+    """Provider is closed now; the call was deferred to its next opening."""
+    name = provider_name or ("el lugar" if language == "es" else "the provider")
+    local = due_at.astimezone(LOCAL_TZ)
+    if language == "es":
+        when = f"el {_WEEKDAYS_ES[local.weekday()]} {local:%d/%m} a las {local:%H:%M}"
+        return f"*{name}* esta cerrado ahora. Lo llamo {when}, cuando abre, y te aviso."
+    when = f"on {_WEEKDAYS_EN[local.weekday()]} {local:%m/%d} at {local:%H:%M}"
+    return f"*{name}* is closed right now. I'll call {when}, when they open, and let you know."
+
+
+def format_invalid_number(phone: str | None, language: str = "es") -> str:
+    """The number failed pre-dial validation (too short, bad prefix, premium...)."""
+    if language == "es":
+        return f"El numero {phone or ''} no parece valido para llamar. Pasame el numero completo, con codigo de area."
+    return f"The number {phone or ''} doesn't look callable. Send me the full number, including the area code."
+
+
+def format_scheduled_call_expired(provider_name: str | None, language: str = "es") -> str:
+    """A deferred call couldn't be placed on time (e.g. the service was down)."""
+    name = provider_name or ("el lugar" if language == "es" else "the provider")
+    if language == "es":
+        return f"No pude llamar a *{name}* a la hora programada. Si queres, pedimelo de nuevo."
+    return f"I couldn't call *{name}* at the scheduled time. Ask me again if you still need it."
+
+
 def _clean_agent_text(text: str) -> str:
     """Remove XML-like language tags from agent responses."""
     return re.sub(r"</?[A-Za-z]+>", "", text).strip()
@@ -314,6 +501,10 @@ def format_multi_call_update(provider_name: str, outcome: str, language: str = "
         if language == "es":
             return f"*{name}* no tiene turnos."
         return f"*{name}* has no slots."
+    elif outcome in ("voicemail", "ivr"):
+        if language == "es":
+            return f"*{name}* no atendio (contestador). Corte la llamada."
+        return f"*{name}* didn't pick up (answering machine). Hung up."
     else:  # failed, busy, no-answer
         if language == "es":
             return f"No pude comunicarme con *{name}*."
@@ -345,7 +536,7 @@ def format_ranked_results(ranked_results: list[dict], language: str = "es") -> s
                 status = "Tiene disponibilidad"
             else:
                 status = "Has availability"
-        elif r.get("outcome") in ("failed", "busy", "no-answer"):
+        elif r.get("outcome") in ("failed", "busy", "no-answer", "voicemail", "ivr", "expired"):
             if language == "es":
                 status = "No se pudo comunicar"
             else:
@@ -0,0 +1,195 @@
+"""In-process counters and histograms, rendered in Prometheus text format at /metrics.
+
+Kept dependency-free and cheap enough to leave on: an observation is a
+dict lookup, a bisect over ~14 bucket bounds and a few additions, with no
+locks (everything runs on the event loop). Series are keyed by their label
+values, in the order the metric declares its label names.
+
+    with timed(STAGE_SECONDS, STAGE_ERRORS, stage="intent"):
+        result = await extract_intent(text)
+"""
+
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_num(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class Gauge(_Metric):
+    """Read at scrape time from a callback returning {label values tuple: value}, or a number."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_: str, read: Callable[[], float | dict], labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_, labelnames)
+        self._read = read
+
+    def samples(self) -> Iterator[str]:
+        value = self._read()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for key, v in items:
+            if v is not None:
+                yield f"{self.name}{_labels(self.labelnames, key)} {_num(v)}"
+
+
+@contextmanager
+def timed(histogram: Histogram, errors: Counter | None = None, **labels: str) -> Iterator[None]:
+    """Observe the block's wall time; count it in `errors` too if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if errors is not None:
+            errors.inc(**labels)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def instrument(
+    histogram: Histogram, errors: Counter | None = None, **labels: str,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator form of timed() for async functions."""
+    def decorate(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> T:
+            with timed(histogram, errors, **labels):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text exposition format."""
+    return "\n".join(m.render() for m in _registry) + "\n"
+
+
+# --- Pipeline metrics ---
+
+STAGE_SECONDS = Histogram(
+    "vocero_stage_seconds", "Time spent in each WhatsApp message pipeline stage.", ("stage",),
+)
+STAGE_ERRORS = Counter(
+    "vocero_stage_errors_total", "Pipeline stages that raised.", ("stage",),
+)
+MESSAGES = Counter(
+    "vocero_whatsapp_messages_total", "Incoming WhatsApp messages by type.", ("type",),
+)
+CALL_PHASE_SECONDS = Histogram(
+    "vocero_outbound_call_phase_seconds",
+    "make_outbound_call phases: validate, line_wait, register (ElevenLabs), dial (Twilio).",
+    ("phase",),
+)
+CALLS = Counter(
+    "vocero_outbound_calls_total", "Outbound call attempts by result.", ("result",),
+)
+TOOL_SECONDS = Histogram(
+    "vocero_tool_seconds", "Voice agent server tool handling time.", ("tool",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+TOOL_OVER_BUDGET = Counter(
+    "vocero_tool_over_budget_total", "Tool responses slower than tool_latency_budget_ms.", ("tool",),
+)
+SUMMARY_SECONDS = Histogram(
+    "vocero_summary_seconds", "Post-call smart summary generation time.", ("flow",),
+)
+SUMMARY_ERRORS = Counter(
+    "vocero_summary_errors_total", "Post-call summaries that raised.", ("flow",),
+)
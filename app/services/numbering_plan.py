@@ -0,0 +1,129 @@
+"""Pre-dial validation against a local numbering plan.
+
+app/data/numbering_plan.csv lists E.164 prefixes with their country, kind
+(mobile / landline / fixed_or_mobile / toll_free / premium / shared_cost /
+invalid), valid total lengths and, for area codes, a name. It is loaded on
+first use into a digit trie; classifying a number is a walk of at most
+len(number) nodes keeping the deepest match, so it costs microseconds and
+catches malformed numbers before an ElevenLabs registration and a Twilio
+attempt are spent on them. Countries not in the file only get the generic
+E.164 length check.
+"""
+
+import csv
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.config import settings
+from app.services.phone import canonical_phone
+
+logger = logging.getLogger(__name__)
+
+_PLAN_FILE = Path(__file__).resolve().parent.parent / "data" / "numbering_plan.csv"
+_E164_MIN_DIGITS = 8
+_E164_MAX_DIGITS = 15
+
+
+@dataclass(frozen=True, slots=True)
+class PlanEntry:
+    country: str
+    kind: str
+    min_len: int
+    max_len: int
+    area: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class NumberInfo:
+    phone: str
+    valid: bool
+    country: str | None = None
+    kind: str | None = None
+    area: str | None = None
+    reason: str | None = None
+
+
+class _Node:
+    __slots__ = ("children", "entry")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.entry: PlanEntry | None = None
+
+
+_root: _Node | None = None
+
+
+def _load(path: Path = _PLAN_FILE) -> _Node:
+    started = time.perf_counter()
+    root = _Node()
+    count = 0
+    with path.open(newline="") as f:
+        for row in csv.reader(line for line in f if line.strip() and not line.startswith("#")):
+            prefix, country, kind, min_len, max_len, area = (row + [""] * 6)[:6]
+            node = root
+            for digit in prefix.strip():
+                node = node.children.setdefault(digit, _Node())
+            node.entry = PlanEntry(country, kind, int(min_len), int(max_len), area or None)
+            count += 1
+    logger.info("Loaded %d numbering-plan prefixes in %.1fms", count, (time.perf_counter() - started) * 1000)
+    return root
+
+
+def _plan() -> _Node:
+    global _root
+    if _root is None:
+        _root = _load()
+    return _root
+
+
+def _longest_match(digits: str) -> PlanEntry | None:
+    node = _plan()
+    found = None
+    for digit in digits:
+        node = node.children.get(digit)
+        if node is None:
+            break
+        if node.entry is not None:
+            found = node.entry
+    return found
+
+
+def classify(phone: str | None) -> NumberInfo:
+    """Canonicalize and classify a number; valid=False says why it can't be dialed as-is."""
+    canonical = canonical_phone(phone)
+    digits = canonical[1:]
+    if not digits:
+        return NumberInfo(phone=canonical, valid=False, reason="empty")
+    if not _E164_MIN_DIGITS <= len(digits) <= _E164_MAX_DIGITS:
+        return NumberInfo(phone=canonical, valid=False, reason="length")
+
+    entry = _longest_match(digits)
+    if entry is None:
+        return NumberInfo(phone=canonical, valid=True)
+    info = dict(phone=canonical, country=entry.country, kind=entry.kind, area=entry.area)
+    if entry.kind == "invalid":
+        return NumberInfo(valid=False, reason="prefix", **info)
+    if not entry.min_len <= len(digits) <= entry.max_len:
+        return NumberInfo(valid=False, reason="length", **info)
+    if entry.kind in settings.dial_blocked_number_kinds:
+        return NumberInfo(valid=False, reason=entry.kind, **info)
+    return NumberInfo(valid=True, **info)
+
+
+class InvalidNumberError(ValueError):
+    """The number failed pre-dial validation."""
+
+    def __init__(self, info: NumberInfo):
+        super().__init__(f"Not dialing {info.phone or '<empty>'}: {info.reason}")
+        self.info = info
+
+
+def validate_for_dial(phone: str | None) -> NumberInfo:
+    """classify(), raising InvalidNumberError for numbers we shouldn't dial."""
+    info = classify(phone)
+    if not info.valid:
+        raise InvalidNumberError(info)
+    return info
@@ -0,0 +1,78 @@
+"""Provider opening hours (Google Places regularOpeningHours) and when to call.
+
+Periods are kept as minutes since Sunday 00:00 in the provider's local time,
+matching Places' day numbering (0 = Sunday). A period closing after midnight
+or after Saturday simply extends past the day / week boundary.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.services.preferences import LOCAL_TZ
+
+_DAY = 24 * 60
+_WEEK = 7 * _DAY
+
+
+@dataclass(frozen=True)
+class OpeningHours:
+    periods: tuple[tuple[int, int], ...]
+    utc_offset_minutes: int | None = None
+    always_open: bool = False
+
+    @classmethod
+    def from_places(cls, data: dict | None, utc_offset_minutes: int | None = None) -> "OpeningHours | None":
+        """Parse a Places API (New) regularOpeningHours object. None if there's nothing usable."""
+        if not data or not data.get("periods"):
+            return None
+        periods = []
+        for period in data["periods"]:
+            start = period.get("open")
+            if not start:
+                continue
+            end = period.get("close")
+            if end is None:
+                # Open 24/7 is a single period with no close
+                return cls(periods=(), utc_offset_minutes=utc_offset_minutes, always_open=True)
+            open_at = start.get("day", 0) * _DAY + start.get("hour", 0) * 60 + start.get("minute", 0)
+            close_at = end.get("day", 0) * _DAY + end.get("hour", 0) * 60 + end.get("minute", 0)
+            if close_at <= open_at:
+                close_at += _WEEK
+            periods.append((open_at, close_at))
+        if not periods:
+            return None
+        return cls(periods=tuple(sorted(periods)), utc_offset_minutes=utc_offset_minutes)
+
+    def _tz(self):
+        if self.utc_offset_minutes is None:
+            return LOCAL_TZ
+        return timezone(timedelta(minutes=self.utc_offset_minutes))
+
+    def next_call_time(self, now: datetime | None = None) -> datetime | None:
+        """When to dial: None if now is fine, else the next moment the provider is open.
+
+        Skips the first call_after_opening_minutes of each window and windows
+        with less than call_min_open_minutes left, so the call lands while
+        someone can take it.
+        """
+        if self.always_open:
+            return None
+        now = (now or datetime.now(timezone.utc)).astimezone(self._tz())
+        minute = ((now.weekday() + 1) % 7) * _DAY + now.hour * 60 + now.minute
+        lead = settings.call_after_opening_minutes
+        tail = settings.call_min_open_minutes
+
+        best: int | None = None
+        for open_at, close_at in self.periods:
+            for shift in (-_WEEK, 0, _WEEK):
+                start, end = open_at + shift, close_at + shift - tail
+                if start + lead <= minute <= end:
+                    return None
+                earliest = start + lead
+                if earliest > minute and earliest <= end and (best is None or earliest < best):
+                    best = earliest
+        if best is None:
+            return None
+        due = now.replace(second=0, microsecond=0) + timedelta(minutes=best - minute)
+        return due.astimezone(timezone.utc)
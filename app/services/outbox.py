@@ -0,0 +1,112 @@
+"""Background outbox for WhatsApp notifications.
+
+Latency-sensitive handlers (ElevenLabs tool webhooks) enqueue messages here
+instead of awaiting the Graph API. Messages are sharded by recipient so each
+user still receives them in order, while different users don't block each other.
+
+Each shard holds at most outbox_queue_size messages, so a Graph API outage
+can't pile retries up in memory. Messages that don't fit, or that still fail
+after the last retry, are counted and written to the dead-letter log
+(app.services.outbox.dead_letter, one JSON line per message).
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+
+from app.config import settings
+from app.services.metrics import Gauge
+from app.services.twilio import send_whatsapp_message
+
+logger = logging.getLogger(__name__)
+dead_letter_logger = logging.getLogger(f"{__name__}.dead_letter")
+
+_RETRY_DELAYS = (0.5, 2.0)
+
+
+@dataclass
+class _OutboxMessage:
+    to: str
+    body: str
+
+
+_queues: list[asyncio.Queue[_OutboxMessage]] = []
+_workers: list[asyncio.Task] = []
+_stats = {"dropped": 0, "failed": 0}
+
+Gauge("vocero_outbox_pending_messages", "WhatsApp messages waiting in the outbox.", lambda: pending_count())
+Gauge("vocero_outbox_dropped_messages", "Messages dead-lettered because their outbox shard was full.", lambda: _stats["dropped"])
+Gauge("vocero_outbox_failed_messages", "Messages dead-lettered after their last send attempt failed.", lambda: _stats["failed"])
+
+
+def _dead_letter(message: _OutboxMessage, reason: str) -> None:
+    _stats[reason] += 1
+    dead_letter_logger.error(json.dumps({"reason": reason, "to": message.to, "body": message.body}, ensure_ascii=False))
+
+
+async def _send_with_retry(message: _OutboxMessage) -> None:
+    for attempt, delay in enumerate((*_RETRY_DELAYS, None), 1):
+        try:
+            await send_whatsapp_message(message.to, message.body)
+            return
+        except Exception:
+            if delay is None:
+                logger.exception("Outbox gave up sending to %s after %d attempts", message.to[-4:], attempt)
+                _dead_letter(message, "failed")
+                return
+            logger.warning("Outbox send to %s failed (attempt %d), retrying", message.to[-4:], attempt)
+            await asyncio.sleep(delay)
+
+
+async def _worker(queue: asyncio.Queue[_OutboxMessage]) -> None:
+    while True:
+        message = await queue.get()
+        try:
+            await _send_with_retry(message)
+        finally:
+            queue.task_done()
+
+
+def start_outbox() -> None:
+    """Start the outbox workers on the running loop (idempotent)."""
+    if _workers:
+        return
+    for _ in range(max(1, settings.outbox_workers)):
+        queue: asyncio.Queue[_OutboxMessage] = asyncio.Queue(maxsize=max(1, settings.outbox_queue_size))
+        _queues.append(queue)
+        _workers.append(asyncio.create_task(_worker(queue)))
+
+
+async def stop_outbox(timeout: float = 10.0) -> None:
+    """Drain pending messages (bounded by timeout) and stop the workers."""
+    if not _workers:
+        return
+    try:
+        await asyncio.wait_for(asyncio.gather(*(q.join() for q in _queues)), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Outbox stopped with %d unsent messages", pending_count())
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+    _queues.clear()
+
+
+def enqueue_whatsapp(to: str, body: str) -> None:
+    """Queue a WhatsApp message for background delivery. Never blocks."""
+    start_outbox()
+    message = _OutboxMessage(to=to, body=body)
+    try:
+        _queues[hash(to) % len(_queues)].put_nowait(message)
+    except asyncio.QueueFull:
+        logger.error("Outbox shard for %s is full; dead-lettering the message", to[-4:])
+        _dead_letter(message, "dropped")
+
+
+def outbox_stats() -> dict:
+    """Snapshot for /health."""
+    return {"pending": pending_count(), "dropped": _stats["dropped"], "failed": _stats["failed"]}
+
+
+def pending_count() -> int:
+    return sum(q.qsize() for q in _queues)
@@ -0,0 +1,416 @@
+"""Write-behind persistence of users, appointment requests, calls and appointments.
+
+Handlers call the record_* / update_* helpers, which only merge a row into an
+in-memory pending map and return immediately — hot paths never await Postgres.
+A background task flushes the map in one transaction per batch (bulk upserts
+per table, parents before children) every persistence_flush_interval_seconds,
+as soon as persistence_batch_size rows are pending, and on shutdown.
+
+IDs are generated here, up front, so callers can link rows (request → call →
+appointment) before anything has been written. Repeated writes to the same row
+coalesce into a single statement.
+
+If a batch is rejected because of its data (constraint violation, a foreign key
+to a row that was dropped, a bad value), it is retried table by table and then
+row by row, so one bad row can't hold back the rest. A row that fails
+persistence_max_attempts flushes is written to the dead-letter log
+(app.services.persistence.dead_letter, one JSON row per record) and dropped.
+Other errors (database down) put the whole batch back unchanged.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.db.session import async_session
+from app.models import Appointment, AppointmentRequest, CallLog, ProviderStats, ScheduledCall, User
+from app.schemas.intent import Entities
+from app.services.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+dead_letter_logger = logging.getLogger(f"{__name__}.dead_letter")
+
+# Parents first, so foreign keys are satisfied within a batch
+_FLUSH_ORDER = (User, AppointmentRequest, CallLog, Appointment, ProviderStats, ScheduledCall)
+_STATEMENT_ROWS = 1000
+_ID_NAMESPACE = uuid.UUID("5b0f6a52-6c1e-4f0b-9a53-7a1d2a0c9e11")
+# The rows themselves are at fault: retrying the same batch can never succeed
+_ROW_ERRORS = (IntegrityError, DataError)
+
+
+@dataclass
+class _PendingRow:
+    values: dict
+    insert: bool
+    attempts: int = 0  # flushes this row has failed on its own
+
+
+@dataclass
+class PersistenceStats:
+    recorded: int = 0
+    flushed_rows: int = 0
+    flushes: int = 0
+    failed_flushes: int = 0
+    dropped: int = 0
+    dead_lettered: int = 0
+    flush_ms: deque = field(default_factory=lambda: deque(maxlen=256))
+
+
+_pending: dict[tuple[type, uuid.UUID], _PendingRow] = {}
+_known_users: set[str] = set()
+_stats = PersistenceStats()
+_enabled = False
+_flush_lock = asyncio.Lock()
+_wake = asyncio.Event()
+_task: asyncio.Task | None = None
+
+Gauge("vocero_persistence_queue_depth", "Rows waiting in the write-behind queue.", lambda: len(_pending))
+Gauge("vocero_persistence_dropped_rows", "Rows dropped so far because the queue was full.", lambda: _stats.dropped)
+Gauge(
+    "vocero_persistence_dead_letter_rows", "Rows given up on after failing persistence_max_attempts flushes.",
+    lambda: _stats.dead_lettered,
+)
+
+
+def _clip(value: str | None, length: int) -> str | None:
+    return value[:length] if value else value
+
+
+def _put(model: type, row_id: uuid.UUID, values: dict, insert: bool) -> None:
+    if not _enabled:
+        return
+    key = (model, row_id)
+    existing = _pending.get(key)
+    if existing is not None:
+        existing.values.update(values)
+        existing.insert = existing.insert or insert
+    elif len(_pending) >= settings.persistence_max_pending:
+        _stats.dropped += 1
+        return
+    else:
+        _pending[key] = _PendingRow(values={"id": row_id, **values}, insert=insert)
+    _stats.recorded += 1
+    if len(_pending) >= settings.persistence_batch_size:
+        _wake.set()
+
+
+# --- Recording API (sync, never blocks) ---
+
+
+def user_id_for(phone: str) -> uuid.UUID:
+    """Stable user id derived from the WhatsApp number (no lookup needed)."""
+    return uuid.uuid5(_ID_NAMESPACE, f"user:{phone}")
+
+
+def record_user(phone: str) -> uuid.UUID:
+    """Ensure a users row exists for this number. Returns its id."""
+    user_id = user_id_for(phone)
+    if phone not in _known_users and _enabled:
+        _known_users.add(phone)
+        _put(User, user_id, {"phone_number": _clip(phone, 20)}, insert=True)
+    return user_id
+
+
+def record_appointment_request(phone: str, entities: Entities | None) -> uuid.UUID:
+    """Record what the user asked for when calls are about to be placed."""
+    request_id = uuid.uuid4()
+    entities = entities or Entities()
+    when = " ".join(p for p in (entities.date_preference, entities.time_preference) if p)
+    _put(AppointmentRequest, request_id, {
+        "user_id": record_user(phone),
+        "service_type": _clip(entities.service_type, 100) or "",
+        "time_preference": _clip(when, 255) or None,
+        "location_preference": _clip(entities.location, 255),
+        "notes": entities.special_requests,
+        "status": "calling",
+        "created_at": datetime.utcnow(),
+    }, insert=True)
+    return request_id
+
+
+def update_appointment_request(request_id: uuid.UUID | None, status: str) -> None:
+    if request_id:
+        _put(AppointmentRequest, request_id, {"status": status}, insert=False)
+
+
+def record_call(
+    request_id: uuid.UUID | None,
+    provider_phone: str,
+    provider_name: str | None,
+    status: str = "initiated",
+) -> uuid.UUID | None:
+    """Record an outbound call attempt. Returns the call_log id (None without a request)."""
+    if request_id is None:
+        return None
+    call_log_id = uuid.uuid4()
+    _put(CallLog, call_log_id, {
+        "appointment_request_id": request_id,
+        "provider_name": _clip(provider_name, 255),
+        "provider_phone": _clip(provider_phone, 20) or "",
+        "status": status,
+        "created_at": datetime.utcnow(),
+    }, insert=True)
+    return call_log_id
+
+
+def update_call(
+    call_log_id: uuid.UUID | None,
+    *,
+    status: str | None = None,
+    duration_seconds: int | None = None,
+    transcript: str | None = None,
+    outcome: str | None = None,
+) -> None:
+    if call_log_id is None:
+        return
+    values = {
+        "status": status,
+        "duration_seconds": duration_seconds,
+        "transcript": transcript,
+        "outcome": outcome,
+    }
+    values = {k: v for k, v in values.items() if v is not None}
+    if values:
+        _put(CallLog, call_log_id, values, insert=False)
+
+
+def _parse_appointment_time(date: str | None, time_: str | None) -> datetime | None:
+    if not date:
+        return None
+    try:
+        return datetime.strptime(f"{date.strip()} {(time_ or '00:00').strip()}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def record_appointment(
+    call_log_id: uuid.UUID | None,
+    provider_name: str | None,
+    date: str | None,
+    time_: str | None,
+    address: str | None = None,
+    notes: str | None = None,
+    duration_minutes: int | None = None,
+) -> None:
+    """Record a booked appointment. One per call; later reports update the same row."""
+    if call_log_id is None:
+        return
+    values = {
+        "call_log_id": call_log_id,
+        "provider_name": _clip(provider_name, 255) or "?",
+        "appointment_time": _parse_appointment_time(date, time_),
+        "address": _clip(address, 500),
+        "notes": notes,
+        "duration_minutes": duration_minutes,
+    }
+    values = {k: v for k, v in values.items() if v is not None}
+    values.setdefault("created_at", datetime.utcnow())
+    _put(Appointment, uuid.uuid5(_ID_NAMESPACE, f"appointment:{call_log_id}"), values, insert=True)
+
+
+def upsert_provider_stats(row_id: uuid.UUID, values: dict) -> None:
+    """Queue the full aggregate row for a provider (see app.services.reputation)."""
+    _put(ProviderStats, row_id, values, insert=True)
+
+
+def record_scheduled_call(row_id: uuid.UUID, values: dict) -> None:
+    """Queue a new scheduled call row (see app.services.call_scheduler)."""
+    _put(ScheduledCall, row_id, values, insert=True)
+
+
+def update_scheduled_call(row_id: uuid.UUID, status: str) -> None:
+    _put(ScheduledCall, row_id, {"status": status}, insert=False)
+
+
+def transcript_text(conversation_data: dict) -> str | None:
+    """Plain-text transcript ("role: message" per line) of an ElevenLabs conversation."""
+    lines = [
+        f"{turn.get('role', '')}: {turn['message']}"
+        for turn in conversation_data.get("transcript") or []
+        if turn.get("message")
+    ]
+    return "\n".join(lines) or None
+
+
+def call_duration(conversation_data: dict) -> int | None:
+    duration = (conversation_data.get("metadata") or {}).get("call_duration_secs")
+    return int(duration) if duration is not None else None
+
+
+# --- Flushing ---
+
+
+def _chunks_by_columns(rows: list[dict]):
+    """Group rows with identical column sets (required for one multi-row statement)."""
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for columns, group in groups.items():
+        for i in range(0, len(group), _STATEMENT_ROWS):
+            yield columns, group[i:i + _STATEMENT_ROWS]
+
+
+async def _write(batch: dict[tuple[type, uuid.UUID], _PendingRow]) -> None:
+    async with async_session() as session, session.begin():
+        for model in _FLUSH_ORDER:
+            rows = [row for (m, _), row in batch.items() if m is model]
+            for columns, chunk in _chunks_by_columns([r.values for r in rows if r.insert]):
+                stmt = insert(model).values(chunk)
+                if model is User:
+                    stmt = stmt.on_conflict_do_nothing()
+                else:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["id"],
+                        set_={c: stmt.excluded[c] for c in columns if c not in ("id", "created_at")},
+                    )
+                await session.execute(stmt)
+            for _, chunk in _chunks_by_columns([r.values for r in rows if not r.insert]):
+                await session.execute(update(model), chunk)
+
+
+def _requeue(batch: dict[tuple[type, uuid.UUID], _PendingRow]) -> None:
+    """Put a failed batch back; anything recorded since then takes precedence."""
+    for key, row in batch.items():
+        newer = _pending.get(key)
+        if newer is None:
+            _pending[key] = row
+        else:
+            _pending[key] = _PendingRow(
+                values={**row.values, **newer.values}, insert=row.insert or newer.insert, attempts=row.attempts,
+            )
+
+
+def _row_failed(key: tuple[type, uuid.UUID], row: _PendingRow, exc: Exception) -> None:
+    """Count a failed attempt; retry on the next flush or give up on the row."""
+    model, row_id = key
+    row.attempts += 1
+    if row.attempts < settings.persistence_max_attempts:
+        logger.warning("%s %s failed (attempt %d): %s", model.__tablename__, row_id, row.attempts, exc.__class__.__name__)
+        _requeue({key: row})
+        return
+    _stats.dead_lettered += 1
+    logger.error(
+        "Giving up on %s %s after %d attempts: %s", model.__tablename__, row_id, row.attempts, getattr(exc, "orig", exc),
+    )
+    dead_letter_logger.error(json.dumps(
+        {"table": model.__tablename__, "insert": row.insert, "values": row.values}, default=str, ensure_ascii=False,
+    ))
+
+
+async def _write_isolated(batch: dict[tuple[type, uuid.UUID], _PendingRow]) -> int:
+    """Write a rejected batch table by table, then row by row. Returns the rows written."""
+    written = 0
+    done: set[tuple[type, uuid.UUID]] = set()  # written, or requeued/dead-lettered on their own
+    for index, model in enumerate(_FLUSH_ORDER):
+        rows = {key: row for key, row in batch.items() if key[0] is model}
+        try:
+            if rows:
+                try:
+                    await _write(rows)
+                    written += len(rows)
+                except _ROW_ERRORS:
+                    for key, row in rows.items():
+                        try:
+                            await _write({key: row})
+                            written += 1
+                        except _ROW_ERRORS as exc:
+                            _row_failed(key, row, exc)
+                        done.add(key)
+        except Exception:
+            # Not the data's fault (connection lost...): the rest waits for the next flush
+            logger.exception("Persistence flush failed, will retry")
+            _requeue({k: r for k, r in batch.items() if k[0] in _FLUSH_ORDER[index:] and k not in done})
+            return written
+    return written
+
+
+async def flush() -> int:
+    """Write everything pending. Returns the number of rows written."""
+    global _pending
+    async with _flush_lock:
+        if not _pending:
+            return 0
+        batch, _pending = _pending, {}
+        started = time.perf_counter()
+        try:
+            await _write(batch)
+            written = len(batch)
+        except _ROW_ERRORS:
+            _stats.failed_flushes += 1
+            logger.warning("Persistence flush of %d rows rejected; retrying rows one table at a time", len(batch))
+            written = await _write_isolated(batch)
+        except Exception:
+            _stats.failed_flushes += 1
+            logger.exception("Persistence flush of %d rows failed, will retry", len(batch))
+            _requeue(batch)
+            return 0
+        _stats.flush_ms.append((time.perf_counter() - started) * 1000)
+        _stats.flushes += 1
+        _stats.flushed_rows += written
+        return written
+
+
+async def _flush_loop() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wake.wait(), settings.persistence_flush_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        await flush()
+
+
+def start_persistence(db_available: bool) -> None:
+    """Enable recording and start the flusher. Without a database, recording is a no-op."""
+    global _enabled, _task
+    _enabled = db_available and settings.persistence_enabled
+    if _enabled and _task is None:
+        _task = asyncio.create_task(_flush_loop())
+
+
+async def stop_persistence(timeout: float = 10.0) -> None:
+    """Stop the flusher and write what's left (bounded by timeout)."""
+    global _enabled, _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    if _enabled:
+        try:
+            await asyncio.wait_for(flush(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if _pending:
+            logger.warning("Persistence stopped with %d unwritten rows", len(_pending))
+    _enabled = False
+
+
+def persistence_stats() -> dict:
+    """Queue depth and flush latency, for health checks and benchmarks."""
+    latencies = sorted(_stats.flush_ms)
+
+    def pct(p: float) -> float | None:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2) if latencies else None
+
+    return {
+        "enabled": _enabled,
+        "queue_depth": len(_pending),
+        "recorded": _stats.recorded,
+        "flushed_rows": _stats.flushed_rows,
+        "flushes": _stats.flushes,
+        "failed_flushes": _stats.failed_flushes,
+        "dropped": _stats.dropped,
+        "dead_lettered": _stats.dead_lettered,
+        "flush_ms_last": round(_stats.flush_ms[-1], 2) if _stats.flush_ms else None,
+        "flush_ms_p50": pct(0.5),
+        "flush_ms_p95": pct(0.95),
+    }
@@ -0,0 +1,99 @@
+"""Canonical phone keys (E.164) for every index keyed by a phone number.
+
+The same provider shows up as "+54 11 4444-5555" (Places), "011 15-4444-5555"
+(a contact card), "5491144445555" (Meta) or "+54 9 11 4444 5555" (typed by
+the user). canonical_phone() turns all of them into one "+<cc><number>"
+string. Numbers without a country code are read in settings.default_phone_region.
+
+Region rules beyond "strip the trunk prefix":
+  AR  mobiles are +54 9 <area> <number>; the local "15" after the area code
+      is dropped and marks the number as a mobile
+  MX  the legacy "1" after +52 is dropped
+"""
+
+import re
+from dataclasses import dataclass
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class _Region:
+    country_code: str
+    trunk_prefix: str
+    national_lengths: tuple[int, ...]
+
+
+_REGIONS = {
+    "AR": _Region("54", "0", (10,)),
+    "BR": _Region("55", "0", (10, 11)),
+    "CL": _Region("56", "", (9,)),
+    "CO": _Region("57", "", (10,)),
+    "ES": _Region("34", "", (9,)),
+    "MX": _Region("52", "", (10,)),
+    "PE": _Region("51", "0", (9,)),
+    "US": _Region("1", "1", (10,)),
+    "UY": _Region("598", "0", (8,)),
+}
+
+
+def _strip_ar_mobile_prefix(national: str) -> str | None:
+    """<area 2-4 digits> 15 <number> -> <area><number>, or None if it isn't that shape."""
+    if len(national) != 12:
+        return None
+    for p in (2, 3, 4):
+        if national[p:p + 2] == "15":
+            return national[:p] + national[p + 2:]
+    return None
+
+
+def _national_ar(national: str, mobile: bool = False) -> str:
+    national = national.removeprefix("0")
+    if national.startswith("9") and len(national) == 11:
+        national, mobile = national[1:], True
+    if (stripped := _strip_ar_mobile_prefix(national)) is not None:
+        national, mobile = stripped, True
+    return f"9{national}" if mobile else national
+
+
+def _fixup(digits: str) -> str:
+    """Country-specific rewrites of an international number (digits incl. country code)."""
+    if digits.startswith("54"):
+        return "54" + _national_ar(digits[2:])
+    if digits.startswith("52") and len(digits) == 13 and digits[2] == "1":
+        return "52" + digits[3:]
+    return digits
+
+
+def _as_national(digits: str, region: _Region) -> str | None:
+    """The national number if `digits` is written in national format for the region."""
+    candidates = [digits]
+    if region.trunk_prefix and digits.startswith(region.trunk_prefix):
+        candidates.insert(0, digits[len(region.trunk_prefix):])
+    for candidate in candidates:
+        if len(candidate) in region.national_lengths:
+            return candidate
+        if region.country_code == "54" and _strip_ar_mobile_prefix(candidate) is not None:
+            return candidate
+    return None
+
+
+def canonical_phone(raw: str | None, region: str | None = None) -> str:
+    """E.164 key for a phone number as written anywhere ("" if there are no digits)."""
+    if not raw:
+        return ""
+    text = raw.strip()
+    digits = re.sub(r"\D", "", text)
+    if not digits:
+        return ""
+    if text.startswith("+"):
+        return "+" + _fixup(digits)
+    if digits.startswith("00"):
+        return "+" + _fixup(digits[2:])
+    rules = _REGIONS.get((region or settings.default_phone_region).upper())
+    if rules is not None:
+        national = _as_national(digits, rules)
+        if national is not None:
+            return "+" + _fixup(rules.country_code + national)
+    # Already international, just without the "+" (e.g. Meta's wa_id)
+    return "+" + _fixup(digits)
@@ -6,6 +6,9 @@ from dataclasses import dataclass
 import httpx
 
 from app.config import settings
+from app.services.metrics import STAGE_ERRORS, STAGE_SECONDS, instrument
+from app.services.opening_hours import OpeningHours
+from app.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +21,13 @@ class PlaceResult:
     rating: float | None
     total_ratings: int
     place_id: str
+    latitude: float | None = None
+    longitude: float | None = None
+    opening_hours: OpeningHours | None = None
 
 
+@instrument(STAGE_SECONDS, STAGE_ERRORS, stage="places_search")
+@traced("places.search")
 async def search_places(
     query: str,
     latitude: float | None = None,
@@ -43,11 +51,11 @@ async def search_places(
 
     async with httpx.AsyncClient() as client:
         resp = await client.post(
-            "https://places.googleapis.com/v1/places:searchText",
+            f"{settings.google_places_base_url}/places:searchText",
             headers={
                 "Content-Type": "application/json",
                 "X-Goog-Api-Key": settings.google_places_api_key,
-                "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.nationalPhoneNumber,places.internationalPhoneNumber,places.rating,places.userRatingCount,places.id",
+                "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.nationalPhoneNumber,places.internationalPhoneNumber,places.rating,places.userRatingCount,places.id,places.location,places.regularOpeningHours,places.utcOffsetMinutes",
             },
             json=request_body,
             timeout=10.0,
@@ -65,6 +73,9 @@ async def search_places(
             rating=place.get("rating"),
             total_ratings=place.get("userRatingCount", 0),
             place_id=place.get("id", ""),
+            latitude=place.get("location", {}).get("latitude"),
+            longitude=place.get("location", {}).get("longitude"),
+            opening_hours=OpeningHours.from_places(place.get("regularOpeningHours"), place.get("utcOffsetMinutes")),
         ))
 
     logger.info("Places search '%s' returned %d results", query, len(results))
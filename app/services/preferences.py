@@ -0,0 +1,276 @@
+"""Local parser for the user's date/time preference (Spanish and English).
+
+Turns free-text entities like "mañana a la tarde", "entre 2 y 4" or
+"next Tuesday morning" into concrete dates and time windows so
+check_user_preference can accept/decline a proposed slot without an LLM.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+LOCAL_TZ = ZoneInfo("America/Argentina/Buenos_Aires")
+
+_WEEKDAYS = {
+    "lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3, "viernes": 4, "sabado": 5, "domingo": 6,
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+}
+_MONTHS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+
+# Day periods as (start, end) minutes since midnight
+_PERIODS = [
+    (re.compile(r"\b(a|por|de|en) la manana\b|\bmorning\b"), (8 * 60, 12 * 60)),
+    (re.compile(r"\bmediodia\b|\bnoon\b|\blunch\b"), (12 * 60, 14 * 60)),
+    (re.compile(r"\btarde\b|\bafternoon\b"), (12 * 60, 19 * 60)),
+    (re.compile(r"\bnoche\b|\bevening\b|\bnight\b|\btonight\b"), (19 * 60, 23 * 60)),
+]
+
+_CLOCK = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|hs|h)?"
+_RANGE_RE = re.compile(
+    rf"(?:entre|between|de|from|desde)\s+(?:las\s+)?{_CLOCK}\s*(?:y|a|and|to|-|hasta)\s*(?:las\s+)?{_CLOCK}"
+    rf"|\b{_CLOCK}\s*-\s*{_CLOCK}"
+)
+_AFTER_RE = re.compile(rf"(?:despues de|desde|after|from)\s+(?:las\s+)?{_CLOCK}")
+_BEFORE_RE = re.compile(rf"(?:antes de|hasta|before|until|by)\s+(?:las\s+)?{_CLOCK}")
+_AT_RE = re.compile(rf"(?:a las|a la|at|tipo|around)\s+{_CLOCK}|\b(\d{{1,2}})[:.](\d{{2}})\s*(am|pm|hs|h)?|\b(\d{{1,2}})\s*(am|pm|hs)\b")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_DAY_MONTH_RE = re.compile(r"\b(\d{1,2})\s+(?:de\s+)?([a-z]+)\b")
+_MONTH_DAY_RE = re.compile(r"\b([a-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?\b")
+
+_AT_TOLERANCE_MINUTES = 30
+_DAY_START = 6 * 60
+_DAY_END = 23 * 60
+
+
+@dataclass
+class PreferenceWindow:
+    """Normalized preference: allowed dates (None = any) and time ranges (empty = any)."""
+    source: tuple[str | None, str | None]
+    dates: frozenset[date] | None = None
+    times: list[tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.dates is None and not self.times
+
+    def describe(self) -> str:
+        return ", ".join(part for part in self.source if part)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _to_minutes(hour: str, minute: str | None, suffix: str | None, afternoon: bool) -> int | None:
+    h = int(hour)
+    m = int(minute) if minute else 0
+    if h > 24 or m > 59:
+        return None
+    if suffix == "pm" and h < 12:
+        h += 12
+    elif suffix == "am" and h == 12:
+        h = 0
+    elif suffix not in ("am", "hs", "h") and h < 12 and (afternoon or 1 <= h <= 7):
+        # "entre 2 y 4" means 14-16; nobody books at 2am
+        h += 12
+    return h * 60 + m
+
+
+def parse_clock(text: str) -> int | None:
+    """Parse a single time like "14:30", "2pm", "10hs" into minutes since midnight."""
+    norm = _normalize(text).strip()
+    match = re.search(_CLOCK, norm)
+    if not match:
+        return None
+    return _to_minutes(*match.groups(), afternoon=bool(re.search(r"\b(tarde|noche|afternoon|evening)\b", norm)))
+
+
+def _parse_times(text: str) -> list[tuple[int, int]]:
+    # Dates would otherwise read as clock times ("20/10", "2026-10-20")
+    text = _NUMERIC_DATE_RE.sub(" ", _ISO_DATE_RE.sub(" ", text))
+    text = _DAY_MONTH_RE.sub(lambda m: " " if m.group(2) in _MONTHS else m.group(0), text)
+    afternoon = bool(re.search(r"\b(tarde|noche|afternoon|evening|night)\b", text))
+    windows: list[tuple[int, int]] = []
+
+    for match in _RANGE_RE.finditer(text):
+        groups = match.groups()
+        if groups[0] is None:
+            groups = groups[6:]
+        start = _to_minutes(*groups[:3], afternoon=afternoon)
+        end = _to_minutes(*groups[3:6], afternoon=afternoon)
+        if start is not None and end is not None and start < end:
+            windows.append((start, end))
+    if windows:
+        return windows
+
+    for regex, make in (
+        (_AFTER_RE, lambda t: (t, _DAY_END)),
+        (_BEFORE_RE, lambda t: (_DAY_START, t)),
+    ):
+        match = regex.search(text)
+        if match:
+            t = _to_minutes(*match.groups(), afternoon=afternoon)
+            if t is not None:
+                return [make(t)]
+
+    for match in _AT_RE.finditer(text):
+        groups = match.groups()
+        if groups[0] is not None:
+            t = _to_minutes(*groups[0:3], afternoon=afternoon)
+        elif groups[3] is not None:
+            t = _to_minutes(*groups[3:6], afternoon=afternoon)
+        else:
+            t = _to_minutes(groups[6], None, groups[7], afternoon=afternoon)
+        if t is not None:
+            windows.append((t - _AT_TOLERANCE_MINUTES, t + _AT_TOLERANCE_MINUTES))
+    if windows:
+        return windows
+
+    return [span for regex, span in _PERIODS if regex.search(text)]
+
+
+def _next_weekday(today: date, weekday: int) -> date:
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+def _safe_date(year: int, month: int, day: int) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _upcoming(today: date, month: int, day: int) -> date | None:
+    """Month/day without a year: this year, or next year if already past."""
+    candidate = _safe_date(today.year, month, day)
+    if candidate and candidate < today:
+        candidate = _safe_date(today.year + 1, month, day)
+    return candidate
+
+
+def _parse_dates(text: str, today: date) -> set[date]:
+    dates: set[date] = set()
+
+    for y, m, d in _ISO_DATE_RE.findall(text):
+        if parsed := _safe_date(int(y), int(m), int(d)):
+            dates.add(parsed)
+    text = _ISO_DATE_RE.sub(" ", text)
+
+    for d, m, y in _NUMERIC_DATE_RE.findall(text):
+        if y:
+            year = int(y) + (2000 if len(y) == 2 else 0)
+            parsed = _safe_date(year, int(m), int(d))
+        else:
+            parsed = _upcoming(today, int(m), int(d))
+        if parsed:
+            dates.add(parsed)
+
+    for d, month_name in _DAY_MONTH_RE.findall(text):
+        if month_name in _MONTHS and (parsed := _upcoming(today, _MONTHS[month_name], int(d))):
+            dates.add(parsed)
+    for month_name, d in _MONTH_DAY_RE.findall(text):
+        if month_name in _MONTHS and (parsed := _upcoming(today, _MONTHS[month_name], int(d))):
+            dates.add(parsed)
+
+    # "a la mañana" is a time of day, not tomorrow
+    text = re.sub(r"\b(a|por|de|en) la manana\b", " ", text)
+    if re.search(r"\bpasado manana\b|\bday after tomorrow\b", text):
+        dates.add(today + timedelta(days=2))
+        text = re.sub(r"\bpasado manana\b|\bday after tomorrow\b", " ", text)
+    if re.search(r"\bmanana\b|\btomorrow\b", text):
+        dates.add(today + timedelta(days=1))
+    if re.search(r"\bhoy\b|\btoday\b|\btonight\b|\besta (tarde|noche)\b", text):
+        dates.add(today)
+
+    for name, weekday in _WEEKDAYS.items():
+        if re.search(rf"\b{name}\b", text):
+            dates.add(_next_weekday(today, weekday))
+
+    if re.search(r"\b(fin de semana|finde|weekend)\b", text):
+        if today.weekday() == 6:
+            dates.add(today)
+        else:
+            saturday = today if today.weekday() == 5 else _next_weekday(today, 5)
+            dates.update({saturday, saturday + timedelta(days=1)})
+    if re.search(r"\b(semana que viene|proxima semana|next week)\b", text):
+        monday = _next_weekday(today, 0)
+        dates.update(monday + timedelta(days=i) for i in range(7))
+    elif re.search(r"\b(esta semana|this week)\b", text):
+        dates.update(today + timedelta(days=i) for i in range(7 - today.weekday()))
+
+    return dates
+
+
+def local_today() -> date:
+    return datetime.now(LOCAL_TZ).date()
+
+
+def parse_preference(
+    date_preference: str | None,
+    time_preference: str | None,
+    today: date | None = None,
+) -> PreferenceWindow:
+    """Parse the user's date/time preference strings into a PreferenceWindow."""
+    today = today or local_today()
+    time_text = _normalize(time_preference or "")
+    # In the time field, a bare "mañana" is the morning, not tomorrow
+    time_text = re.sub(r"(?<!la )(?<!pasado )\bmanana\b", "en la manana", time_text)
+    text = f"{_normalize(date_preference or '')} {time_text}"
+    dates = _parse_dates(text, today)
+    return PreferenceWindow(
+        source=(date_preference, time_preference),
+        dates=frozenset(dates) if dates else None,
+        times=_parse_times(text),
+    )
+
+
+def parse_slot(proposed_date: str, proposed_time: str, today: date | None = None) -> datetime | None:
+    """A proposed slot as a naive local datetime, or None if either part is ambiguous."""
+    dates = _parse_dates(_normalize(proposed_date), today or local_today())
+    minutes = parse_clock(proposed_time)
+    if len(dates) != 1 or minutes is None:
+        return None
+    return datetime.combine(next(iter(dates)), datetime.min.time()) + timedelta(minutes=minutes)
+
+
+def _fmt_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def check_proposal(
+    window: PreferenceWindow,
+    proposed_date: str,
+    proposed_time: str,
+    today: date | None = None,
+) -> tuple[bool, str]:
+    """Decide whether a proposed slot fits the preference. Returns (accept, reason)."""
+    pref = window.describe()
+    today = today or local_today()
+
+    if window.dates is not None:
+        proposed_dates = _parse_dates(_normalize(proposed_date), today)
+        if len(proposed_dates) != 1:
+            return True, f"Couldn't read the proposed date. User prefers: {pref}. Confirm it's a close match."
+        day = next(iter(proposed_dates))
+        if day not in window.dates:
+            allowed = ", ".join(d.isoformat() for d in sorted(window.dates))
+            return False, f"User prefers {pref} ({allowed}); {day.isoformat()} doesn't fit. Ask for another day."
+
+    if window.times:
+        minutes = parse_clock(proposed_time)
+        if minutes is None:
+            return True, f"Couldn't read the proposed time. User prefers: {pref}. Confirm it's a close match."
+        if not any(start <= minutes <= end for start, end in window.times):
+            allowed = " or ".join(f"{_fmt_minutes(s)}-{_fmt_minutes(e)}" for s, e in window.times)
+            return False, f"User prefers {pref} ({allowed}); {_fmt_minutes(minutes)} doesn't fit. Ask for another time."
+
+    return True, f"Matches the user's preference ({pref})."
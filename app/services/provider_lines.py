@@ -0,0 +1,156 @@
+"""Per-provider call concurrency: don't ring a line that one of our calls already holds.
+
+Several users' campaigns often pick the same provider. A line is held from
+dialing until Twilio reports the call as finished. A second dial to the
+same canonical number waits (FIFO, up to provider_busy_wait_seconds) for
+the line instead of getting a busy signal. Lines whose call never reports
+back are freed after provider_line_ttl_seconds.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.config import settings
+from app.services.metrics import Gauge
+from app.services.phone import canonical_phone
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderBusyError(Exception):
+    """The provider's line stayed taken by our other calls for too long."""
+
+
+@dataclass
+class _Line:
+    held: dict[str, float] = field(default_factory=dict)  # token -> acquired at (monotonic)
+    waiters: deque[asyncio.Future] = field(default_factory=deque)
+
+
+_lines: dict[str, _Line] = {}
+_token_key: dict[str, str] = {}
+_call_token: dict[str, str] = {}
+_bound: dict[str, str] = {}  # token -> call_sid
+_stats = {"waits": 0, "timeouts": 0, "wait_seconds": 0.0}
+
+Gauge("vocero_provider_lines_busy", "Providers with one of our calls in progress.", lambda: line_stats()["busy_providers"])
+Gauge("vocero_provider_line_waiters", "Dials waiting for a provider's line.", lambda: line_stats()["waiting_calls"])
+
+
+def _expire(line: _Line) -> None:
+    cutoff = time.monotonic() - settings.provider_line_ttl_seconds
+    for token, acquired in list(line.held.items()):
+        if acquired < cutoff:
+            logger.warning("Freeing provider line held by %s: no status callback", token)
+            _drop(token)
+
+
+def _has_room(line: _Line) -> bool:
+    return len(line.held) < max(1, settings.provider_max_concurrent_calls)
+
+
+def _wake_next(line: _Line) -> None:
+    while line.waiters and _has_room(line):
+        waiter = line.waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+
+
+def _drop(token: str) -> None:
+    _call_token.pop(_bound.pop(token, ""), None)
+    key = _token_key.pop(token, None)
+    line = _lines.get(key) if key else None
+    if line is None:
+        return
+    line.held.pop(token, None)
+    _wake_next(line)
+    if not line.held and not line.waiters:
+        del _lines[key]
+
+
+def _take(key: str, line: _Line) -> str:
+    token = uuid.uuid4().hex
+    line.held[token] = time.monotonic()
+    _token_key[token] = key
+    return token
+
+
+async def acquire_line(phone: str, timeout: float | None = None) -> str:
+    """Hold the provider's line, waiting for our other calls to it. Returns a release token."""
+    key = canonical_phone(phone)
+    line = _lines.setdefault(key, _Line())
+    _expire(line)
+    if _has_room(line) and not line.waiters:
+        return _take(key, line)
+
+    timeout = settings.provider_busy_wait_seconds if timeout is None else timeout
+    logger.info("Provider %s busy with %d of our calls; waiting up to %.0fs", key, len(line.held), timeout)
+    _stats["waits"] += 1
+    started = time.monotonic()
+    deadline = started + timeout
+    try:
+        while True:
+            waiter = asyncio.get_running_loop().create_future()
+            line.waiters.append(waiter)
+            remaining = deadline - time.monotonic()
+            try:
+                await asyncio.wait_for(waiter, timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                line = _lines.setdefault(key, line)
+                _expire(line)
+                if _has_room(line):
+                    return _take(key, line)
+                _stats["timeouts"] += 1
+                raise ProviderBusyError(f"Provider {key} still busy after {timeout:.0f}s") from None
+            # The line may have been dropped while idle between release and wake-up
+            line = _lines.setdefault(key, line)
+            if _has_room(line):
+                return _take(key, line)
+    finally:
+        _stats["wait_seconds"] += time.monotonic() - started
+        # Pass the turn on if we leave with room (timed out, cancelled) so others don't stall
+        _wake_next(line)
+
+
+def bind_call(token: str, call_sid: str) -> None:
+    """Tie a held line to the Twilio call, so its status callback can free it."""
+    if call_sid and token in _token_key:
+        _call_token[call_sid] = token
+        _bound[token] = call_sid
+
+
+def release_line(token: str) -> None:
+    _drop(token)
+
+
+def release_call(call_sid: str) -> None:
+    """The call finished (Twilio terminal status): free its provider's line."""
+    token = _call_token.pop(call_sid, None)
+    if token:
+        _drop(token)
+
+
+@asynccontextmanager
+async def provider_line(phone: str) -> AsyncIterator[str]:
+    """Hold the line while dialing; on success bind_call() keeps it held after exit."""
+    token = await acquire_line(phone)
+    try:
+        yield token
+    finally:
+        if token not in _bound:
+            release_line(token)
+
+
+def line_stats() -> dict:
+    return {
+        "busy_providers": sum(1 for line in _lines.values() if line.held),
+        "waiting_calls": sum(1 for line in _lines.values() for w in line.waiters if not w.done()),
+        **_stats,
+    }
@@ -1,60 +1,185 @@
-"""Ranking logic for multi-provider call results.
+"""Ranking of providers, before dialing (candidates) and after calls (outcomes).
 
-Scoring: availability (40%) + earliest slot (30%) + Google rating (30%)
+Each factor is scored in [0, 1] for all rows at once with NumPy, stacked into
+a (rows x factors) matrix and combined with configurable weights
+(settings.ranking_candidate_weights / ranking_outcome_weights):
+
+  availability   1.0 booked, 0.6 slots offered, 0.0 otherwise
+  earliest_slot  1.0 today, linearly down to 0.0 at 7+ days
+  rating         Google rating shrunk towards a prior by review count
+                 (a 5.0 with 3 reviews doesn't beat a 4.7 with 900)
+  distance       exp(-km / ranking_distance_scale_km) from the user's location
+  time_fit       1.0 if the slot fits the user's date/time preference
+  reputation     (candidates) past answer/booking rate and pick-up speed,
+                 see app.services.reputation
+Unknown inputs score a neutral 0.5, so they neither help nor hurt.
 """
 
 import logging
-from datetime import datetime, timezone
+from datetime import date, datetime
+
+import numpy as np
+
+from app.config import settings
+from app.services.places import PlaceResult
+from app.services.preferences import PreferenceWindow, check_proposal, local_today
+from app.services.reputation import reputation_scores
+from app.services.state import ConversationState, get_preference_window
 
 logger = logging.getLogger(__name__)
 
+_EARTH_RADIUS_KM = 6371.0
+_RATING_PRIOR_MEAN = 4.0  # Google ratings skew high
+_RATING_PRIOR_COUNT = 20.0
+_NEUTRAL = 0.5
 
-def rank_results(results: list[dict]) -> list[dict]:
-    """Score and rank multi-call results. Returns sorted list (best first)."""
-    for r in results:
-        summary = r.get("summary")
-        avail_score = _score_availability(summary)
-        slot_score = _score_earliest_slot(summary)
-        rating_score = _score_rating(r.get("rating"))
 
-        r["score"] = round(avail_score * 0.4 + slot_score * 0.3 + rating_score * 0.3, 3)
-        r["avail_score"] = avail_score
-        r["slot_score"] = slot_score
-        r["rating_score"] = rating_score
+def _weight_vector(weights: dict[str, float], factors: tuple[str, ...]) -> np.ndarray:
+    unknown = set(weights) - set(factors)
+    if unknown:
+        logger.warning("Ignoring unknown ranking factors: %s", ", ".join(sorted(unknown)))
+    w = np.array([max(0.0, weights.get(f, 0.0)) for f in factors])
+    total = w.sum()
+    return w / total if total > 0 else np.full(len(factors), 1.0 / len(factors))
 
-    results.sort(key=lambda r: r["score"], reverse=True)
-    return results
+
+def haversine_km(lat: np.ndarray, lng: np.ndarray, origin_lat: float, origin_lng: float) -> np.ndarray:
+    """Great-circle distance from the origin to every (lat, lng), in km (NaN stays NaN)."""
+    lat1, lng1 = np.radians(origin_lat), np.radians(origin_lng)
+    lat2, lng2 = np.radians(lat), np.radians(lng)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def score_rating(rating: np.ndarray, total_ratings: np.ndarray) -> np.ndarray:
+    """Bayesian-average rating normalized to 0-1; NaN ratings score neutral."""
+    count = np.nan_to_num(total_ratings, nan=0.0)
+    shrunk = (np.nan_to_num(rating, nan=_RATING_PRIOR_MEAN) * count + _RATING_PRIOR_MEAN * _RATING_PRIOR_COUNT) / (
+        count + _RATING_PRIOR_COUNT
+    )
+    return np.where(np.isnan(rating), _NEUTRAL, np.clip(shrunk / 5.0, 0.0, 1.0))
+
+
+def score_distance(
+    lat: np.ndarray, lng: np.ndarray, origin_lat: float | None, origin_lng: float | None
+) -> np.ndarray:
+    if origin_lat is None or origin_lng is None:
+        return np.full(len(lat), _NEUTRAL)
+    km = haversine_km(lat, lng, origin_lat, origin_lng)
+    scores = np.exp(-km / settings.ranking_distance_scale_km)
+    return np.where(np.isnan(km), _NEUTRAL, scores)
+
+
+def _combine(factors: dict[str, np.ndarray], weights: dict[str, float]) -> np.ndarray:
+    names = tuple(factors)
+    matrix = np.column_stack([factors[name] for name in names])
+    return matrix @ _weight_vector(weights, names)
+
+
+def _order(scores: np.ndarray) -> np.ndarray:
+    """Best first; ties keep input order."""
+    return np.argsort(-scores, kind="stable")
+
+
+def rank_candidates(
+    places: list[PlaceResult],
+    latitude: float | None = None,
+    longitude: float | None = None,
+) -> list[PlaceResult]:
+    """Order search results by who is most worth calling (best first)."""
+    if not places:
+        return []
+    rating = np.array([p.rating if p.rating is not None else np.nan for p in places], dtype=float)
+    total = np.array([p.total_ratings or 0 for p in places], dtype=float)
+    lat = np.array([p.latitude if p.latitude is not None else np.nan for p in places], dtype=float)
+    lng = np.array([p.longitude if p.longitude is not None else np.nan for p in places], dtype=float)
+
+    factors = {
+        "rating": score_rating(rating, total),
+        "distance": score_distance(lat, lng, latitude, longitude),
+        "reputation": reputation_scores([p.phone for p in places], [p.place_id for p in places]),
+    }
+    scores = _combine(factors, settings.ranking_candidate_weights)
+    return [places[i] for i in _order(scores)]
 
 
-def _score_availability(summary) -> float:
-    """1.0 if booked, 0.6 if slots mentioned, 0.0 if no availability."""
+def _slot(summary) -> tuple[str | None, str | None]:
     if summary is None:
-        return 0.0
-    if summary.booking_confirmed:
-        return 1.0
-    # If there's a date/time mentioned, slots were available
-    if summary.date or summary.time:
-        return 0.6
-    return 0.0
-
-
-def _score_earliest_slot(summary) -> float:
-    """Score based on how soon the slot is. 0 days = 1.0, 7+ days = 0.0."""
-    if summary is None or not summary.date:
-        return 0.0
+        return None, None
+    return summary.date, summary.time
+
+
+def _parse_day(value: str | None) -> date | None:
     try:
-        slot_date = datetime.strptime(summary.date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        now = datetime.now(timezone.utc)
-        days_away = (slot_date - now).days
-        if days_away < 0:
-            days_away = 0
-        return max(0.0, 1.0 - days_away / 7.0)
-    except (ValueError, TypeError):
-        return 0.0
-
-
-def _score_rating(rating: float | None) -> float:
-    """Normalize Google 5-star rating to 0-1. No rating = 0.5 (neutral)."""
-    if rating is None:
-        return 0.5
-    return min(rating / 5.0, 1.0)
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
+
+
+def rank_results(
+    results: list[dict],
+    window: PreferenceWindow | None = None,
+    origin: tuple[float, float] | None = None,
+    today: date | None = None,
+) -> list[dict]:
+    """Score and rank multi-call results in place. Returns the sorted list (best first).
+
+    Rows may carry "latitude"/"longitude" for the distance factor.
+    """
+    if not results:
+        return results
+    today = today or local_today()
+    summaries = [r.get("summary") for r in results]
+    slots = [_slot(s) for s in summaries]
+
+    booked = np.array([bool(s and s.booking_confirmed) for s in summaries])
+    offered = np.array([bool(d or t) for d, t in slots])
+    availability = np.where(booked, 1.0, np.where(offered, 0.6, 0.0))
+
+    days = np.array([(_parse_day(d) - today).days if _parse_day(d) else np.nan for d, _ in slots], dtype=float)
+    earliest_slot = np.where(np.isnan(days), 0.0, np.clip(1.0 - np.maximum(days, 0.0) / 7.0, 0.0, 1.0))
+
+    if window is None or window.is_empty:
+        time_fit = np.where(offered, _NEUTRAL, 0.0)
+    else:
+        time_fit = np.array([
+            float(check_proposal(window, d or "", t or "", today=today)[0]) if (d or t) else 0.0
+            for d, t in slots
+        ])
+
+    rating = np.array([r["rating"] if r.get("rating") is not None else np.nan for r in results], dtype=float)
+    total = np.array([r.get("total_ratings") or 0 for r in results], dtype=float)
+    lat = np.array([r["latitude"] if r.get("latitude") is not None else np.nan for r in results], dtype=float)
+    lng = np.array([r["longitude"] if r.get("longitude") is not None else np.nan for r in results], dtype=float)
+
+    factors = {
+        "availability": availability,
+        "earliest_slot": earliest_slot,
+        "rating": score_rating(rating, total),
+        "distance": score_distance(lat, lng, *(origin or (None, None))),
+        "time_fit": time_fit,
+    }
+    scores = _combine(factors, settings.ranking_outcome_weights)
+
+    for i, r in enumerate(results):
+        r["score"] = round(float(scores[i]), 3)
+        for name, values in factors.items():
+            r[f"{name}_score"] = round(float(values[i]), 3)
+
+    results[:] = [results[i] for i in _order(scores)]
+    return results
+
+
+def rank_campaign(state: ConversationState) -> list[dict]:
+    """Rank a finished campaign's results with the user's preference and location."""
+    campaign = state.multi_call
+    located = {p.phone: p for p in campaign.providers}
+    for r in campaign.results:
+        provider = located.get(r.get("phone"))
+        if provider is not None:
+            r.setdefault("latitude", provider.latitude)
+            r.setdefault("longitude", provider.longitude)
+    origin = None
+    if state.user_latitude is not None and state.user_longitude is not None:
+        origin = (state.user_latitude, state.user_longitude)
+    return rank_results(campaign.results, window=get_preference_window(state), origin=origin)
@@ -0,0 +1,172 @@
+"""Per-provider reputation built from past call outcomes.
+
+Every finished call updates the aggregates for the provider's phone number
+(answered / machine / booked / no availability, talk time and how long it
+took to pick up). Rows are persisted through the write-behind queue and
+loaded at startup. Candidate ranking uses reputation_scores() so call slots
+and minutes go to providers that actually answer and book.
+"""
+
+import logging
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from app.db.session import async_session
+from app.models import ProviderStats
+from app.services.persistence import upsert_provider_stats
+from app.services.phone import canonical_phone
+
+logger = logging.getLogger(__name__)
+
+_ANSWER_SAMPLES = 25
+_ANSWER_SPEED_SCALE_S = 20.0
+_ID_NAMESPACE = uuid.UUID("0f3c2b8e-4d1a-4a57-9c55-2a6f1d3e8b70")
+
+# Twilio/screening outcomes that mean nobody picked up
+_UNANSWERED = {"failed", "busy", "no-answer", "canceled"}
+_MACHINE = {"voicemail", "ivr"}
+_UNKNOWN = "unknown"  # completed, but nothing tells who picked up: not counted either way
+
+
+@dataclass
+class ProviderReputation:
+    phone: str
+    place_id: str | None = None
+    attempts: int = 0
+    answered: int = 0
+    machine: int = 0
+    booked: int = 0
+    no_availability: int = 0
+    total_duration_seconds: float = 0.0
+    answer_seconds: list[float] = field(default_factory=list)
+
+    @property
+    def answer_rate(self) -> float:
+        """Share of attempts a human answered, Laplace-smoothed (0.5 with no history)."""
+        return (self.answered + 1) / (self.attempts + 2)
+
+    @property
+    def booking_rate(self) -> float:
+        """Share of answered calls that ended in a booking, Laplace-smoothed."""
+        return (self.booked + 1) / (self.answered + 2)
+
+    @property
+    def median_answer_seconds(self) -> float | None:
+        return statistics.median(self.answer_seconds) if self.answer_seconds else None
+
+    def score(self) -> float:
+        """0-1 worth-calling score; 0.5 for an unknown provider."""
+        median = self.median_answer_seconds
+        speed = 0.5 if median is None else float(np.exp(-median / _ANSWER_SPEED_SCALE_S))
+        return 0.5 * self.answer_rate + 0.35 * self.booking_rate + 0.15 * speed
+
+
+_reputations: dict[str, ProviderReputation] = {}
+_by_place_id: dict[str, str] = {}
+# call_sid -> seconds from dialing to answer, until the call's outcome is recorded
+_answer_delays: dict[str, float] = {}
+_dialed_at: dict[str, float] = {}
+
+
+def get_reputation(phone: str | None, place_id: str | None = None) -> ProviderReputation | None:
+    key = canonical_phone(phone) if phone else _by_place_id.get(place_id or "")
+    return _reputations.get(key) if key else None
+
+
+def reputation_scores(phones: list[str | None], place_ids: list[str | None]) -> np.ndarray:
+    """Vector of reputation scores for ranking (0.5 where there's no history)."""
+    scores = []
+    for phone, place_id in zip(phones, place_ids):
+        rep = get_reputation(phone, place_id)
+        scores.append(rep.score() if rep else 0.5)
+    return np.array(scores, dtype=float)
+
+
+def mark_dialed(call_sid: str) -> None:
+    if call_sid:
+        _dialed_at[call_sid] = time.monotonic()
+
+
+def mark_answered(call_sid: str) -> None:
+    """Twilio reported the call as answered (in-progress)."""
+    dialed = _dialed_at.pop(call_sid, None)
+    if dialed is not None:
+        _answer_delays[call_sid] = time.monotonic() - dialed
+
+
+def record_outcome(
+    phone: str | None,
+    outcome: str,
+    call_sid: str | None = None,
+    place_id: str | None = None,
+    booked: bool = False,
+    no_availability: bool = False,
+    duration_seconds: float | None = None,
+) -> None:
+    """Fold one finished call into the provider's aggregates and queue them for persistence."""
+    answer_delay = _answer_delays.pop(call_sid, None) if call_sid else None
+    if call_sid:
+        _dialed_at.pop(call_sid, None)
+    if not phone or outcome == _UNKNOWN:
+        return
+    key = canonical_phone(phone)
+    rep = _reputations.get(key)
+    if rep is None:
+        rep = _reputations[key] = ProviderReputation(phone=key)
+    if place_id:
+        rep.place_id = place_id
+        _by_place_id[place_id] = key
+
+    rep.attempts += 1
+    if outcome in _MACHINE:
+        rep.machine += 1
+    elif outcome not in _UNANSWERED:
+        rep.answered += 1
+        rep.booked += booked
+        rep.no_availability += no_availability
+        if answer_delay is not None:
+            rep.answer_seconds = [*rep.answer_seconds, round(answer_delay, 1)][-_ANSWER_SAMPLES:]
+    if duration_seconds:
+        rep.total_duration_seconds += duration_seconds
+
+    upsert_provider_stats(uuid.uuid5(_ID_NAMESPACE, key), {
+        "phone": key[:20],
+        "place_id": rep.place_id,
+        "attempts": rep.attempts,
+        "answered": rep.answered,
+        "machine": rep.machine,
+        "booked": rep.booked,
+        "no_availability": rep.no_availability,
+        "total_duration_seconds": rep.total_duration_seconds,
+        "answer_seconds": rep.answer_seconds,
+        "updated_at": datetime.utcnow(),
+    })
+
+
+async def load_reputations() -> int:
+    """Load persisted aggregates into memory (called once at startup)."""
+    async with async_session() as session:
+        rows = await session.scalars(select(ProviderStats))
+        for row in rows:
+            key = canonical_phone(row.phone)
+            _reputations[key] = ProviderReputation(
+                phone=key,
+                place_id=row.place_id,
+                attempts=row.attempts,
+                answered=row.answered,
+                machine=row.machine,
+                booked=row.booked,
+                no_availability=row.no_availability,
+                total_duration_seconds=row.total_duration_seconds,
+                answer_seconds=list(row.answer_seconds or []),
+            )
+            if row.place_id:
+                _by_place_id[row.place_id] = key
+    logger.info("Loaded reputation for %d providers", len(_reputations))
+    return len(_reputations)
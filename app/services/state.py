@@ -1,9 +1,13 @@
 import logging
+import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import StrEnum
 
 from app.schemas.intent import Entities, IntentType, Language
+from app.services.opening_hours import OpeningHours
+from app.services.preferences import LOCAL_TZ, PreferenceWindow, parse_preference
+from app.services.tracing import Span
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +25,13 @@ class MultiCallProvider:
     phone: str
     rating: float | None = None
     total_ratings: int = 0
+    latitude: float | None = None
+    longitude: float | None = None
+    place_id: str | None = None
     call_sid: str | None = None
     conversation_id: str | None = None
+    call_log_id: uuid.UUID | None = None
+    scheduled_for: datetime | None = None
 
 
 @dataclass
@@ -32,6 +41,14 @@ class MultiCallCampaign:
     results: list[dict] = field(default_factory=list)
 
 
+@dataclass
+class CallToolReport:
+    """What the voice agent reported through server tools during one call."""
+    slots: list[dict] = field(default_factory=list)
+    booking: dict | None = None
+    no_availability_reason: str | None = None
+
+
 @dataclass
 class ConversationState:
     status: ConversationStatus = ConversationStatus.IDLE
@@ -41,6 +58,7 @@ class ConversationState:
     user_name: str | None = None
     provider_phone: str | None = None
     provider_name: str | None = None
+    provider_hours: OpeningHours | None = None
     active_call_ids: list[str] = field(default_factory=list)
     call_results: list[dict] = field(default_factory=list)
     last_bot_message: str | None = None
@@ -50,6 +68,11 @@ class ConversationState:
     user_longitude: float | None = None
     last_conversation_id: str | None = None
     multi_call: MultiCallCampaign | None = None
+    tool_reports: dict[str, CallToolReport] = field(default_factory=dict)
+    preference_window: PreferenceWindow | None = None
+    appointment_request_id: uuid.UUID | None = None
+    call_log_id: uuid.UUID | None = None
+    trace: Span | None = None  # the in-flight request's span (see app.services.tracing)
     updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -64,11 +87,24 @@ def get_state(phone: str) -> ConversationState:
     return _conversations[phone]
 
 
+def has_state(phone: str) -> bool:
+    """Whether this worker has seen the user since it started."""
+    return phone in _conversations
+
+
 def reset_state(phone: str) -> None:
     """Reset conversation to idle, clearing all fields."""
     _conversations[phone] = ConversationState()
 
 
+def end_request_trace(state: ConversationState) -> None:
+    """Close the request's trace span once it no longer has calls in flight."""
+    if state.trace is not None and state.status != ConversationStatus.CALLING:
+        state.trace.set(outcome=state.status.value)
+        state.trace.end()
+        state.trace = None
+
+
 def find_state_by_conversation_id(conversation_id: str) -> tuple[str, ConversationState] | None:
     """Find the user phone and state that owns a given ElevenLabs conversation_id."""
     for phone, state in _conversations.items():
@@ -82,6 +118,26 @@ def find_state_by_conversation_id(conversation_id: str) -> tuple[str, Conversati
     return None
 
 
+def get_tool_report(state: ConversationState, conversation_id: str) -> CallToolReport:
+    """Return the tool report for a call, creating an empty one on first use."""
+    if conversation_id not in state.tool_reports:
+        state.tool_reports[conversation_id] = CallToolReport()
+    return state.tool_reports[conversation_id]
+
+
+def get_preference_window(state: ConversationState) -> PreferenceWindow | None:
+    """Parsed date/time preference for the pending entities, cached on the state."""
+    entities = state.pending_entities
+    if not entities or not (entities.date_preference or entities.time_preference):
+        return None
+    source = (entities.date_preference, entities.time_preference)
+    if state.preference_window is None or state.preference_window.source != source:
+        # Relative expressions ("mañana") are relative to when the user said them
+        today = state.updated_at.astimezone(LOCAL_TZ).date()
+        state.preference_window = parse_preference(*source, today=today)
+    return state.preference_window
+
+
 def merge_entities(existing: Entities | None, new: Entities) -> Entities:
     """Merge new entities into existing ones. New non-None values override."""
     if existing is None:
@@ -0,0 +1,262 @@
+"""Request tracing from the WhatsApp message to the post-call summary.
+
+Each incoming WhatsApp message opens a trace. When it starts calls, a
+"request" span is kept on ConversationState.trace until the request
+completes, so every call, tool webhook, status callback and summary lands
+in the same trace. They are linked by the IDs we already have:
+
+  whatsapp.message (root)
+    intent, places.search, ...
+    request (until the ranked result / summary; ConversationState.trace)
+      call (one per dial, until Twilio's final status; bound to call_sid and conversation_id)
+        call.dial
+        tool.check_user_preference, tool.confirm_booking, ...  (via conversation_id)
+        twilio.call_status                                     (via call_sid)
+          summary
+
+The current span lives in a ContextVar, so tasks spawned with
+asyncio.create_task inherit it. Webhooks re-enter a trace with
+span_for(<call_sid or conversation_id>, ...). Finished spans are buffered
+and exported in the background as JSON lines (tracing_export_path) and/or
+OTLP/HTTP JSON to a collector (tracing_otlp_endpoint).
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_MAX_BUFFERED = 10000
+_MAX_BOUND_KEYS = 20000
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _export(self)
+
+    @property
+    def duration_ms(self) -> float | None:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+# call_sid / conversation_id -> the span their webhooks should attach to
+_bound: dict[str, Span] = {}
+_buffer: deque[Span] = deque(maxlen=_MAX_BUFFERED)
+_task: asyncio.Task | None = None
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def new_span(name: str, parent: Span | None = None, **attributes) -> Span | None:
+    """Start a span (child of `parent`, else of the current span, else a new trace). Caller ends it.
+
+    None when tracing is off; every helper here accepts None as a no-op span.
+    """
+    if not settings.tracing_enabled:
+        return None
+    parent = parent or _current.get()
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+    )
+    span.set(**attributes)
+    return span
+
+
+@contextmanager
+def use_span(span: Span | None, end: bool = False) -> Iterator[Span | None]:
+    """Make `span` current for the block (optionally ending it on exit)."""
+    if span is None:
+        yield None
+        return
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = span.error or f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current.reset(token)
+        if end:
+            span.end()
+
+
+@contextmanager
+def start_span(name: str, parent: Span | None = None, **attributes) -> Iterator[Span | None]:
+    """Child span of the current one for the duration of the block (no-op when tracing is off)."""
+    with use_span(new_span(name, parent, **attributes), end=True) as span:
+        yield span
+
+
+def traced(name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator: a child span per call of an async function, when called inside a trace."""
+    def decorate(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> T:
+            if _current.get() is None:
+                return await fn(*args, **kwargs)
+            with start_span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(key: str | None, span: Span | None) -> None:
+    """Let webhooks that only know `key` (a call_sid or conversation_id) find `span`."""
+    if key and span is not None:
+        if len(_bound) >= _MAX_BOUND_KEYS:
+            _bound.pop(next(iter(_bound)))
+        _bound[key] = span
+
+
+def unbind(*keys: str | None) -> None:
+    for key in keys:
+        if key:
+            _bound.pop(key, None)
+
+
+def bound_span(key: str | None) -> Span | None:
+    return _bound.get(key) if key else None
+
+
+@contextmanager
+def span_for(key: str | None, name: str, **attributes) -> Iterator[Span | None]:
+    """start_span() parented to whatever `key` is bound to (a fresh trace if nothing is)."""
+    with start_span(name, parent=bound_span(key), **attributes) as span:
+        yield span
+
+
+# --- Export ---
+
+
+def _export(span: Span) -> None:
+    if settings.tracing_export_path or settings.tracing_otlp_endpoint:
+        _buffer.append(span)
+
+
+def _as_dict(span: Span) -> dict:
+    return {
+        "trace_id": span.trace_id,
+        "span_id": span.span_id,
+        "parent_id": span.parent_id,
+        "name": span.name,
+        "start_ns": span.start_ns,
+        "end_ns": span.end_ns,
+        "duration_ms": round(span.duration_ms or 0.0, 3),
+        "attributes": span.attributes,
+        "error": span.error,
+    }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(spans: list[Span]) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.tracing_service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "vocero"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+def _write_lines(path: str, spans: list[Span]) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write("".join(json.dumps(_as_dict(s), default=str) + "\n" for s in spans))
+
+
+async def flush_spans() -> int:
+    """Export buffered spans now. Returns how many were exported."""
+    spans = list(_buffer)
+    _buffer.clear()
+    if not spans:
+        return 0
+    if settings.tracing_export_path:
+        await asyncio.to_thread(_write_lines, settings.tracing_export_path, spans)
+    if settings.tracing_otlp_endpoint:
+        try:
+            async with httpx.AsyncClient() as client:
+                resp = await client.post(settings.tracing_otlp_endpoint, json=_otlp_payload(spans), timeout=5.0)
+                resp.raise_for_status()
+        except Exception:
+            logger.warning("OTLP export of %d spans failed", len(spans), exc_info=True)
+    return len(spans)
+
+
+async def _export_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.tracing_flush_interval_seconds)
+        try:
+            await flush_spans()
+        except Exception:
+            logger.exception("Span export failed")
+
+
+def start_tracing() -> None:
+    """Export finished spans in the background (idempotent)."""
+    global _task
+    if settings.tracing_enabled and _task is None:
+        _task = asyncio.create_task(_export_loop())
+
+
+async def stop_tracing() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    await flush_spans()
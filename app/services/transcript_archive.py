@@ -0,0 +1,172 @@
+"""Cold storage for old call transcripts.
+
+Transcripts dominate the size of call_logs rows but are rarely read once a
+call is a few days old. archive_transcripts() moves the ones older than
+transcript_archive_after_days into transcript_archive, compressed (zstd when
+the zstandard package is installed, zlib otherwise), in batches, and clears
+call_logs.transcript so the hot table stays small enough to live in cache.
+Blobs are stored in the table, or as files under transcript_archive_dir when
+it is set. Reads go through load_transcript(s), which decompress on demand.
+"""
+
+import asyncio
+import logging
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.session import async_session
+from app.models import CallLog, TranscriptArchive
+
+try:
+    import zstandard
+except ImportError:  # optional: fall back to zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_ZSTD_LEVEL = 10
+_ZLIB_LEVEL = 9
+
+_task: asyncio.Task | None = None
+
+
+def compress(text: str) -> tuple[str, bytes]:
+    """Return (codec, blob) using the best available codec."""
+    raw = text.encode()
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, _ZLIB_LEVEL)
+
+
+def decompress(codec: str, blob: bytes) -> str:
+    if codec == "zlib":
+        return zlib.decompress(blob).decode()
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Transcript archived with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob).decode()
+    raise ValueError(f"Unknown transcript codec: {codec}")
+
+
+def _blob_path(call_log_id: uuid.UUID, codec: str) -> Path:
+    name = str(call_log_id)
+    return Path(settings.transcript_archive_dir) / name[:2] / f"{name}.{codec}"
+
+
+def _pack(rows: list[tuple[uuid.UUID, str]]) -> list[dict]:
+    """Compress a batch (and write blobs to disk if configured). Runs in a worker thread."""
+    packed = []
+    for call_log_id, transcript in rows:
+        codec, blob = compress(transcript)
+        data: bytes | None = blob
+        if settings.transcript_archive_dir:
+            path = _blob_path(call_log_id, codec)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(blob)
+            data = None
+        packed.append({
+            "call_log_id": call_log_id,
+            "codec": codec,
+            "original_size": len(transcript.encode()),
+            "compressed_size": len(blob),
+            "data": data,
+            "archived_at": datetime.utcnow(),
+        })
+    return packed
+
+
+async def _archive_batch(session: AsyncSession, cutoff: datetime, batch_size: int) -> tuple[int, int, int]:
+    """Archive one batch. Returns (rows, original bytes, compressed bytes)."""
+    rows = (
+        await session.execute(
+            select(CallLog.id, CallLog.transcript)
+            .where(CallLog.created_at < cutoff, CallLog.transcript.is_not(None))
+            .order_by(CallLog.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    if not rows:
+        return 0, 0, 0
+
+    packed = await asyncio.to_thread(_pack, [tuple(row) for row in rows])
+    await session.execute(insert(TranscriptArchive).values(packed).on_conflict_do_nothing())
+    await session.execute(
+        update(CallLog).where(CallLog.id.in_([p["call_log_id"] for p in packed])).values(transcript=None)
+    )
+    await session.commit()
+    return (
+        len(packed),
+        sum(p["original_size"] for p in packed),
+        sum(p["compressed_size"] for p in packed),
+    )
+
+
+async def archive_transcripts(older_than: timedelta | None = None, batch_size: int | None = None) -> int:
+    """Move every transcript older than the cutoff to cold storage. Returns rows moved."""
+    older_than = older_than or timedelta(days=settings.transcript_archive_after_days)
+    batch_size = batch_size or settings.transcript_archive_batch_size
+    cutoff = datetime.utcnow() - older_than
+    moved = original = compressed = 0
+    while True:
+        async with async_session() as session:
+            count, raw_bytes, packed_bytes = await _archive_batch(session, cutoff, batch_size)
+        moved += count
+        original += raw_bytes
+        compressed += packed_bytes
+        if count < batch_size:
+            break
+    if moved:
+        logger.info(
+            "Archived %d transcripts: %d -> %d bytes (%.1fx)",
+            moved, original, compressed, original / compressed if compressed else 0,
+        )
+    return moved
+
+
+async def _read_blob(row: TranscriptArchive) -> bytes:
+    if row.data is not None:
+        return row.data
+    return await asyncio.to_thread(_blob_path(row.call_log_id, row.codec).read_bytes)
+
+
+async def load_transcripts(session: AsyncSession, call_log_ids: list[uuid.UUID]) -> dict[uuid.UUID, str]:
+    """Archived transcripts for the given calls (calls without one are omitted)."""
+    if not call_log_ids:
+        return {}
+    rows = await session.scalars(select(TranscriptArchive).where(TranscriptArchive.call_log_id.in_(call_log_ids)))
+    return {row.call_log_id: decompress(row.codec, await _read_blob(row)) for row in rows}
+
+
+async def load_transcript(session: AsyncSession, call_log_id: uuid.UUID) -> str | None:
+    return (await load_transcripts(session, [call_log_id])).get(call_log_id)
+
+
+async def _archive_loop() -> None:
+    while True:
+        try:
+            await archive_transcripts()
+        except Exception:
+            logger.exception("Transcript archiving failed")
+        await asyncio.sleep(settings.transcript_archive_interval_seconds)
+
+
+def start_transcript_archiver(db_available: bool) -> None:
+    """Run archive_transcripts periodically in the background (idempotent)."""
+    global _task
+    if db_available and settings.transcript_archive_enabled and _task is None:
+        _task = asyncio.create_task(_archive_loop())
+
+
+def stop_transcript_archiver() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
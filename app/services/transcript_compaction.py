@@ -0,0 +1,119 @@
+"""Transcript compaction before sending a call to the summary model.
+
+Transcripts that already fit the token budget are left alone. Longer ones lose
+filler turns ("hola", "gracias", "un momento") and back-to-back repeats, then the
+oldest turns until they fit, while always keeping turns that mention dates,
+times, prices or addresses — the details the summary actually needs.
+"""
+
+import re
+from dataclasses import dataclass
+
+# Rough estimate for Spanish/English text; avoids pulling in a tokenizer
+_CHARS_PER_TOKEN = 4
+
+# Turns made only of these words carry no information
+_FILLER_WORDS = {
+    "hola", "hello", "hi", "hey", "buenas", "buen", "buenos", "día", "dia", "días", "dias", "tardes",
+    "good", "morning", "afternoon", "gracias", "muchas", "thanks", "thank", "you", "de", "nada",
+    "aja", "ajá", "mhm", "mm", "hm", "eh", "uh", "um", "este", "a", "ver", "alo", "aló", "diga",
+    "un", "momento", "momentito", "espere", "espera", "aguarde", "one", "moment", "please",
+    "por", "favor", "chau", "adiós", "adios", "bye",
+}
+
+_KEY_INFO_RE = re.compile(
+    r"\d{1,2}[:.]\d{2}|\d{1,2}\s*((hs|h|am|pm)\b|[ap]\.\s?m\.)"  # times
+    r"|\d{1,2}/\d{1,2}|\d{4}-\d{2}-\d{2}"  # dates
+    r"|\b(lunes|martes|mi[eé]rcoles|jueves|viernes|s[aá]bado|domingo|hoy|mañana|pasado"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday|today|tomorrow"
+    r"|enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre"
+    r"|january|february|march|april|june|july|august|september|october|november|december)\b"
+    r"|\$\s*\d|\b\d+\s*(pesos|d[oó]lares|dollars|usd|ars)\b|\b(precio|cuesta|sale|cost|price)\b"  # prices
+    r"|\b(calle|avenida|av\.|piso|depto|esquina|street|st\.|avenue|ave\.|floor|suite)\b"  # addresses
+    r"|\b(direcci[oó]n|address)\b",
+    re.IGNORECASE,
+)
+
+_WORD_RE = re.compile(r"[\wáéíóúñü]+", re.IGNORECASE)
+
+# The closing turns usually hold the outcome; never drop them for budget
+_KEEP_LAST_TURNS = 2
+
+
+@dataclass
+class CompactedTranscript:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    turns_kept: int
+    turns_total: int
+
+    @property
+    def compression_ratio(self) -> float:
+        """Compacted size over original size (1.0 = nothing removed)."""
+        if not self.original_tokens:
+            return 1.0
+        return self.compacted_tokens / self.original_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def _is_filler(text: str) -> bool:
+    words = _WORD_RE.findall(text.lower())
+    return all(w in _FILLER_WORDS for w in words)
+
+
+def _normalized(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def compact_transcript(turns: list[tuple[str, str]], token_budget: int) -> CompactedTranscript:
+    """Compact (speaker, message) turns into a transcript within token_budget."""
+    lines = [f"{speaker}: {message}" for speaker, message in turns]
+    original_tokens = sum(estimate_tokens(line) + 1 for line in lines)
+
+    if original_tokens <= token_budget:
+        # Every turn fits; even a repeated "Si" may be the answer to a different question
+        return CompactedTranscript(
+            text="\n".join(lines),
+            original_tokens=original_tokens,
+            compacted_tokens=original_tokens,
+            turns_kept=len(turns),
+            turns_total=len(turns),
+        )
+
+    kept: list[tuple[int, str, bool]] = []  # (index, line, has_key_info)
+    previous: tuple[str, str] | None = None
+    last = len(turns) - _KEEP_LAST_TURNS
+    for i, ((speaker, message), line) in enumerate(zip(turns, lines)):
+        key_info = bool(_KEY_INFO_RE.search(message))
+        norm = (speaker, _normalized(message))
+        repeat = norm == previous
+        previous = norm
+        if i < last and not key_info and (_is_filler(message) or repeat):
+            continue
+        kept.append((i, line, key_info))
+
+    # Over budget: drop oldest turns without key info first, then oldest key turns
+    total = sum(estimate_tokens(line) + 1 for _, line, _ in kept)
+    for drop_key_info in (False, True):
+        if total <= token_budget:
+            break
+        for entry in list(kept):
+            if total <= token_budget:
+                break
+            index, line, key_info = entry
+            if key_info != drop_key_info or index >= last:
+                continue
+            kept.remove(entry)
+            total -= estimate_tokens(line) + 1
+
+    return CompactedTranscript(
+        text="\n".join(line for _, line, _ in kept),
+        original_tokens=original_tokens,
+        compacted_tokens=total,
+        turns_kept=len(kept),
+        turns_total=len(turns),
+    )
@@ -6,6 +6,9 @@ import httpx
 from elevenlabs.client import AsyncElevenLabs
 
 from app.config import settings
+from app.log_config import body as log_body
+from app.services.metrics import STAGE_ERRORS, STAGE_SECONDS, instrument
+from app.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +40,8 @@ async def download_media(media_url: str) -> bytes:
         return resp.content
 
 
+@instrument(STAGE_SECONDS, STAGE_ERRORS, stage="transcription")
+@traced("transcription")
 async def transcribe_audio(audio_bytes: bytes) -> TranscriptionResult:
     """Transcribe audio bytes using ElevenLabs Scribe V2. Auto-detects language."""
     client = _get_client()
@@ -52,7 +57,7 @@ async def transcribe_audio(audio_bytes: bytes) -> TranscriptionResult:
         "Transcription: lang=%s (%.2f) text=%s",
         result.language_code,
         result.language_probability,
-        result.text[:100] if result.text else "<empty>",
+        log_body(result.text),
     )
 
     return TranscriptionResult(
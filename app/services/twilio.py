@@ -3,11 +3,11 @@ import logging
 import httpx
 
 from app.config import settings
+from app.services.metrics import STAGE_ERRORS, STAGE_SECONDS, instrument
+from app.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 
-GRAPH_API_URL = "https://graph.facebook.com/v21.0"
-
 
 def _normalize_ar_number(phone: str) -> str:
     """Argentine mobile numbers: Meta sends 549XX but requires 54XX to send back."""
@@ -16,10 +16,12 @@ def _normalize_ar_number(phone: str) -> str:
     return phone
 
 
+@instrument(STAGE_SECONDS, STAGE_ERRORS, stage="whatsapp_send")
+@traced("whatsapp.send")
 async def send_whatsapp_message(to: str, body: str) -> str:
     """Send a WhatsApp message via Meta Cloud API. Returns message ID."""
     to = _normalize_ar_number(to)
-    url = f"{GRAPH_API_URL}/{settings.meta_phone_number_id}/messages"
+    url = f"{settings.meta_graph_base_url}/{settings.meta_phone_number_id}/messages"
     headers = {
         "Authorization": f"Bearer {settings.meta_access_token}",
         "Content-Type": "application/json",
@@ -40,12 +42,14 @@ async def send_whatsapp_message(to: str, body: str) -> str:
     return msg_id
 
 
+@instrument(STAGE_SECONDS, STAGE_ERRORS, stage="media_download")
+@traced("whatsapp.media_download")
 async def download_whatsapp_media(media_id: str) -> bytes:
     """Download media from Meta's WhatsApp Cloud API (2-step: get URL, then download)."""
     headers = {"Authorization": f"Bearer {settings.meta_access_token}"}
     async with httpx.AsyncClient() as client:
         # Step 1: Get the media URL
-        resp = await client.get(f"{GRAPH_API_URL}/{media_id}", headers=headers)
+        resp = await client.get(f"{settings.meta_graph_base_url}/{media_id}", headers=headers)
         resp.raise_for_status()
         media_url = resp.json()["url"]
 
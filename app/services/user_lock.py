@@ -0,0 +1,174 @@
+"""Per-user serialization of everything that reads and writes a user's conversation state.
+
+WhatsApp messages, scheduled dials, tool webhooks and status callbacks for
+the same user run one at a time, so two quick messages can't both start a
+call. settings.user_lock_backend picks how far that reaches:
+
+  memory    an asyncio.Lock per user; enough for a single worker
+  postgres  additionally a transaction-scoped Postgres advisory lock on a
+            connection from app.db.session.engine, so workers serialize too
+
+The postgres backend takes the in-process lock first, so only one coroutine
+per worker and user holds (or waits on) a pooled connection. Each held lock
+uses one connection: size db_pool_size / db_max_overflow for the number of
+users handled at once. If Postgres can't be reached the lock degrades to
+in-process only (logged and counted) rather than stopping message handling.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+from app.config import settings
+from app.db.session import engine
+from app.services.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+_LOCK_NOT_AVAILABLE = "55P03"  # SQLSTATE raised when lock_timeout expires
+
+USER_LOCK_WAIT_SECONDS = Histogram(
+    "vocero_user_lock_wait_seconds", "Time spent waiting for a user's lock, by caller.", ("source",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+USER_LOCK_CONTENDED = Counter(
+    "vocero_user_lock_contended_total", "Lock acquisitions that found the user's lock already held.", ("source",),
+)
+USER_LOCK_TIMEOUTS = Counter(
+    "vocero_user_lock_timeouts_total", "Lock acquisitions that gave up after their timeout.", ("source",),
+)
+USER_LOCK_ERRORS = Counter(
+    "vocero_user_lock_errors_total", "Advisory lock failures that fell back to the in-process lock.",
+)
+
+
+class UserLockTimeout(Exception):
+    """Another handler kept the user's lock for longer than the caller was willing to wait."""
+
+
+_locks: dict[str, asyncio.Lock] = {}
+_waiters: dict[str, int] = {}  # phone -> coroutines holding or waiting for its lock
+_stats = {"held": 0, "contended": 0, "timeouts": 0, "errors": 0}
+
+Gauge("vocero_user_locks_held", "User locks currently held in this worker.", lambda: _stats["held"])
+
+
+def _advisory_key(phone: str) -> int:
+    """Stable signed 64-bit key for pg_advisory_xact_lock (same on every worker)."""
+    digest = hashlib.blake2b(phone.encode(), digest_size=8, person=b"vocero.user").digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@asynccontextmanager
+async def _local_lock(phone: str, timeout: float) -> AsyncIterator[None]:
+    lock = _locks.get(phone)
+    if lock is None:
+        lock = _locks[phone] = asyncio.Lock()
+    _waiters[phone] = _waiters.get(phone, 0) + 1
+    try:
+        await asyncio.wait_for(lock.acquire(), timeout=timeout)
+        try:
+            yield
+        finally:
+            lock.release()
+    finally:
+        _waiters[phone] -= 1
+        if not _waiters[phone]:
+            # Nobody holds or awaits it: forget it so idle users don't accumulate
+            del _waiters[phone]
+            del _locks[phone]
+
+
+def _contended(source: str) -> None:
+    _stats["contended"] += 1
+    USER_LOCK_CONTENDED.inc(source=source)
+
+
+@asynccontextmanager
+async def _advisory_lock(phone: str, source: str, timeout: float) -> AsyncIterator[None]:
+    try:
+        conn = await asyncio.wait_for(engine.connect(), timeout=timeout)
+    except (OSError, SQLAlchemyError, asyncio.TimeoutError) as exc:
+        _stats["errors"] += 1
+        USER_LOCK_ERRORS.inc()
+        logger.warning("Advisory lock unavailable (%r); serializing ...%s in this worker only", exc, phone[-4:])
+        yield
+        return
+    key = {"key": _advisory_key(phone)}
+    try:
+        async with conn.begin():
+            if not (await conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), key)).scalar():
+                # Held by another worker
+                _contended(source)
+                await conn.execute(text(f"SET LOCAL lock_timeout = '{max(1, int(timeout * 1000))}ms'"))
+                try:
+                    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), key)
+                except DBAPIError as exc:
+                    code = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+                    if code == _LOCK_NOT_AVAILABLE:
+                        raise asyncio.TimeoutError from exc
+                    raise
+            # Released when the transaction ends, even if this worker dies holding it
+            yield
+    finally:
+        await conn.close()
+
+
+@asynccontextmanager
+async def user_lock(phone: str, source: str, timeout: float | None = None) -> AsyncIterator[None]:
+    """Hold the user's lock for the block; `source` (message, tool, callback, ...) labels the metrics.
+
+    Raises UserLockTimeout after waiting `timeout` seconds (default settings.user_lock_timeout_seconds).
+    """
+    timeout = settings.user_lock_timeout_seconds if timeout is None else timeout
+    started = time.monotonic()
+    if _waiters.get(phone):
+        _contended(source)
+    async with AsyncExitStack() as stack:
+        try:
+            await stack.enter_async_context(_local_lock(phone, timeout))
+            if settings.user_lock_backend == "postgres":
+                remaining = max(timeout - (time.monotonic() - started), 0.001)
+                await stack.enter_async_context(_advisory_lock(phone, source, remaining))
+        except asyncio.TimeoutError:
+            _stats["timeouts"] += 1
+            USER_LOCK_TIMEOUTS.inc(source=source)
+            USER_LOCK_WAIT_SECONDS.observe(time.monotonic() - started, source=source)
+            raise UserLockTimeout(f"Lock for ...{phone[-4:]} still held after {timeout:.2f}s ({source})") from None
+        USER_LOCK_WAIT_SECONDS.observe(time.monotonic() - started, source=source)
+        _stats["held"] += 1
+        try:
+            yield
+        finally:
+            _stats["held"] -= 1
+
+
+@asynccontextmanager
+async def best_effort_user_lock(phone: str | None, source: str, timeout: float | None = None) -> AsyncIterator[None]:
+    """user_lock for webhooks that can't be dropped or retried (tool calls, status callbacks):
+    with no known user, or once the wait times out, the block runs without the lock."""
+    async with AsyncExitStack() as stack:
+        if phone:
+            try:
+                await stack.enter_async_context(user_lock(phone, source, timeout))
+            except UserLockTimeout as exc:
+                logger.warning("%s; handling it without the lock", exc)
+        yield
+
+
+def user_lock_stats() -> dict:
+    """Snapshot for /health."""
+    return {
+        "backend": settings.user_lock_backend,
+        "held": _stats["held"],
+        "waiting": sum(_waiters.values()) - _stats["held"],
+        "contended": _stats["contended"],
+        "timeouts": _stats["timeouts"],
+        "advisory_errors": _stats["errors"],
+    }
@@ -0,0 +1,86 @@
+"""Shared helpers for the benchmark scripts: local servers, stats and result files."""
+
+import asyncio
+import json
+import logging
+import subprocess
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import uvicorn
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+@asynccontextmanager
+async def serve(app, port: int, lifespan: str = "on"):
+    """Run an ASGI app with uvicorn on 127.0.0.1:port for the duration of the block."""
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan=lifespan)
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()  # Surface startup errors (port in use, etc.)
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+def quiet_logging(level: int = logging.WARNING) -> None:
+    """Per-request INFO logs would dominate the measurements."""
+    logging.getLogger().setLevel(level)
+    for name in ("httpx", "uvicorn.access"):
+        logging.getLogger(name).setLevel(level)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(latencies_ms: list[float], errors: int = 0, elapsed_s: float | None = None) -> dict:
+    """p50/p95/p99/mean/max for a list of latencies, plus throughput if elapsed is known."""
+    values = sorted(latencies_ms)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = round(len(values) / elapsed_s, 1)
+    return summary
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(name: str, results: dict, output: str | None = None) -> Path:
+    """Write results as JSON (default: benchmarks/results/<name>-<git rev>.json)."""
+    revision = git_revision()
+    path = Path(output) if output else RESULTS_DIR / f"{name}-{revision}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "benchmark": name,
+        "git_revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        **results,
+    }
+    path.write_text(json.dumps(payload, indent=2, default=str))
+    return path
@@ -0,0 +1,211 @@
+"""History query benchmark against a seeded Postgres database.
+
+Seeds users / appointment_requests / call_logs / appointments (1M call logs by
+default, each with a realistic transcript) into a dedicated schema, then
+compares, for random users:
+
+  eager     what the old lazy="selectin" relationships did: load the user with
+            every request, every call (transcripts included) and appointment
+  page      app.services.history.list_calls first page (keyset, no transcripts)
+  deep      the same, following cursors to page --deep-page
+
+Needs a scratch Postgres (the app's docker-compose database works: everything
+lives in the --schema schema and the app's own tables are never touched).
+
+    python -m benchmarks.history_queries --calls 1000000 --users 10000 --samples 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks._common import latency_summary, quiet_logging, save_results
+
+_TRANSCRIPT_LINE = "agent: Hola, llamo para pedir un turno. user: Si, tenemos el martes a las diez. "
+
+_SEED_SQL = (
+    """
+    INSERT INTO users (id, phone_number)
+    SELECT md5('u' || g)::uuid, '54911' || lpad(g::text, 8, '0')
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO appointment_requests
+        (id, user_id, service_type, time_preference, location_preference, status, created_at)
+    SELECT md5('r' || g)::uuid, md5('u' || (1 + g % :users))::uuid, 'dentista', 'mañana a la tarde',
+           'Palermo', 'completed', now() - make_interval(mins => g)
+    FROM generate_series(1, :requests) g
+    """,
+    """
+    INSERT INTO call_logs
+        (id, appointment_request_id, provider_name, provider_phone, status, duration_seconds,
+         transcript, outcome, created_at)
+    SELECT md5('c' || g)::uuid, md5('r' || (1 + g % :requests))::uuid, 'Proveedor ' || g,
+           '+5411' || lpad((g % 100000000)::text, 8, '0'),
+           (ARRAY['completed', 'failed', 'busy', 'no-answer'])[1 + g % 4], 30 + g % 300,
+           repeat(:transcript_line, :transcript_repeat), 'Turno confirmado para el martes',
+           now() - make_interval(secs => g)
+    FROM generate_series(1, :calls) g
+    """,
+    """
+    INSERT INTO appointments (id, call_log_id, provider_name, appointment_time, created_at)
+    SELECT md5('a' || g)::uuid, md5('c' || g)::uuid, 'Proveedor ' || g,
+           now() + make_interval(days => g % 30), now()
+    FROM generate_series(1, :calls, 5) g
+    """,
+)
+
+
+async def seed(session_factory: async_sessionmaker, args: argparse.Namespace) -> float:
+    """Seed the schema unless it already holds enough call logs. Returns seconds spent."""
+    async with session_factory() as session:
+        existing = await session.scalar(text("SELECT count(*) FROM call_logs"))
+        if existing >= args.calls and not args.reseed:
+            return 0.0
+        started = time.perf_counter()
+        await session.execute(text("TRUNCATE appointments, call_logs, appointment_requests, users CASCADE"))
+        params = {
+            "users": args.users,
+            "requests": args.calls // args.calls_per_request,
+            "calls": args.calls,
+            "transcript_line": _TRANSCRIPT_LINE,
+            "transcript_repeat": args.transcript_repeat,
+        }
+        for sql in _SEED_SQL:
+            await session.execute(text(sql), params)
+        await session.commit()
+    async with session_factory() as session:
+        await session.execute(text("ANALYZE"))
+    return time.perf_counter() - started
+
+
+async def eager_history(session: AsyncSession, user_id) -> int:
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload, undefer
+
+    from app.models import AppointmentRequest, CallLog, User
+
+    stmt = (
+        select(User)
+        .where(User.id == user_id)
+        .options(
+            selectinload(User.appointment_requests)
+            .selectinload(AppointmentRequest.call_logs)
+            .options(undefer(CallLog.transcript), selectinload(CallLog.appointment))
+        )
+    )
+    user = await session.scalar(stmt)
+    return sum(len(r.call_logs) for r in user.appointment_requests)
+
+
+async def paged_history(session: AsyncSession, user_id, page_size: int, pages: int) -> int:
+    from app.services.history import list_calls
+
+    cursor = None
+    for _ in range(pages):
+        page = await list_calls(session, user_id, limit=page_size, cursor=cursor)
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    return len(page.items)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.db.session import create_schema
+
+    quiet_logging()
+    admin = create_async_engine(args.database_url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{args.schema}"'))
+    await admin.dispose()
+
+    engine = create_async_engine(
+        args.database_url,
+        pool_size=args.concurrency,
+        connect_args={"server_settings": {"search_path": args.schema}},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    seed_seconds = await seed(session_factory, args)
+
+    rng = random.Random(args.seed)
+    async with session_factory() as session:
+        user_ids = list(await session.scalars(text("SELECT id FROM users ORDER BY id LIMIT 50000")))
+        sample = [rng.choice(user_ids) for _ in range(args.samples)]
+        plan = "\n".join(
+            row[0]
+            for row in await session.execute(
+                text(
+                    "EXPLAIN SELECT c.id FROM call_logs c JOIN appointment_requests r "
+                    "ON c.appointment_request_id = r.id WHERE r.user_id = :uid "
+                    "ORDER BY c.created_at DESC, c.id DESC LIMIT 21"
+                ),
+                {"uid": sample[0]},
+            )
+        )
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def measure(query) -> dict:
+        latencies: list[float] = []
+        rows: list[int] = []
+
+        async def one(user_id) -> None:
+            async with semaphore, session_factory() as session:
+                started = time.perf_counter()
+                rows.append(await query(session, user_id))
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(u) for u in sample))
+        summary = latency_summary(latencies, 0, time.perf_counter() - started)
+        return {**summary, "avg_rows": round(sum(rows) / len(rows), 1)} if rows else summary
+
+    results = {
+        "eager": await measure(eager_history),
+        "page": await measure(lambda s, u: paged_history(s, u, args.page_size, 1)),
+        "deep": await measure(lambda s, u: paged_history(s, u, args.page_size, args.deep_page)),
+    }
+    await engine.dispose()
+    return {
+        "params": {k: v for k, v in vars(args).items() if k != "database_url"},
+        "seed_seconds": round(seed_seconds, 1),
+        **results,
+        "page_plan": plan,
+    }
+
+
+def main() -> None:
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--schema", default="bench_history")
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--calls-per-request", type=int, default=3)
+    parser.add_argument("--transcript-repeat", type=int, default=25, help="~2KB transcripts by default")
+    parser.add_argument("--reseed", action="store_true", help="Re-seed even if the schema is already populated")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--deep-page", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/history_queries-<rev>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("history_queries", results, args.output)
+    print(json.dumps({k: results[k] for k in ("seed_seconds", "eager", "page", "deep")}, indent=2))
+    print(results["page_plan"])
+    print(f"Saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
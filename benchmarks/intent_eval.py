@@ -0,0 +1,318 @@
+"""Offline evaluation and replay harness for extract_intent.
+
+Replays a labelled corpus of (message, context) -> expected intent/entities
+through the real extract_intent code path and reports accuracy per intent,
+entity accuracy, token usage and latency percentiles. Use it to validate
+SYSTEM_PROMPT, _JSON_SCHEMA or model changes before deploying.
+
+Modes:
+  record  Call a live OpenAI-compatible endpoint (OPENAI_BASE_URL / --base-url)
+          and store every response in the recordings file.
+  replay  Serve recorded responses from a local OpenAI-compatible stand-in.
+          Requests are keyed by model + prompt + schema + user content, so a
+          prompt change shows up as missing recordings until re-recorded.
+  live    Evaluate directly against --base-url without recording (e.g. a local
+          vLLM / llama.cpp server or another model).
+
+Entity expectations are matched case/accent-insensitively by containment;
+an expected null means the entity must be absent.
+
+    python -m benchmarks.intent_eval --mode replay --concurrency 50
+    python -m benchmarks.intent_eval --mode record --model gpt-4.1-mini
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks._common import latency_summary, quiet_logging, save_results, serve
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+DEFAULT_CORPUS = FIXTURES_DIR / "intent_corpus.jsonl"
+DEFAULT_RECORDINGS = FIXTURES_DIR / "intent_recordings.json"
+
+_CHARS_PER_TOKEN = 4
+
+
+def request_key(body: dict) -> str:
+    """Stable key for a /chat/completions request (ignores transport-only fields)."""
+    relevant = {k: body.get(k) for k in ("model", "messages", "response_format")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def load_corpus(path: Path) -> list[dict]:
+    with path.open() as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_recordings(path: Path) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards to the real endpoint and keeps each response for later replay."""
+
+    def __init__(self, recordings: dict) -> None:
+        self._inner = httpx.AsyncHTTPTransport()
+        self.recordings = recordings
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        content = await response.aread()
+        if response.status_code == 200:
+            self.recordings[request_key(json.loads(request.content))] = {
+                "response": json.loads(content),
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        return httpx.Response(response.status_code, headers=response.headers, content=content)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def build_replay_stub(recordings: dict, latency_ms: float | None, fallback: dict[str, dict]) -> FastAPI:
+    """OpenAI-compatible stand-in answering from recordings (or expected labels on a miss)."""
+    stub = FastAPI()
+    stub.state.misses = 0
+
+    @stub.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        key = request_key(body)
+        recorded = recordings.get(key)
+        if recorded is None:
+            stub.state.misses += 1
+            user_content = body["messages"][-1]["content"]
+            expected = fallback.get(user_content)
+            if expected is None:
+                return JSONResponse({"error": {"message": "no recording for request"}}, status_code=404)
+            content = json.dumps(expected, ensure_ascii=False)
+            recorded = {
+                "response": {"choices": [{"message": {"role": "assistant", "content": content}}]},
+                "latency_ms": 0.0,
+            }
+        delay = latency_ms if latency_ms is not None else recorded.get("latency_ms", 0.0)
+        await asyncio.sleep(delay / 1000)
+        return recorded["response"]
+
+    return stub
+
+
+def _normalize(value) -> str:
+    from app.services.intent_cache import normalize_message
+
+    return normalize_message(str(value))
+
+
+def score_entities(expected: dict, actual: dict) -> tuple[int, int]:
+    """Return (matched, total) for the entities the fixture cares about."""
+    matched = 0
+    for name, want in expected.items():
+        got = actual.get(name)
+        if want is None:
+            matched += got is None
+        elif got is not None and _normalize(want) in _normalize(got):
+            matched += 1
+    return matched, len(expected)
+
+
+def _user_content(case: dict) -> str:
+    if case.get("context"):
+        return f"[Conversation context: {case['context']}]\n\nUser message: {case['message']}"
+    return case["message"]
+
+
+def _fallback_result(case: dict) -> dict:
+    entities = {
+        name: None
+        for name in (
+            "phone_number", "provider_name", "service_type", "date_preference",
+            "time_preference", "location", "special_requests",
+        )
+    }
+    entities.update(case["expected"].get("entities", {}))
+    return {
+        "intent": case["expected"]["intent"],
+        "entities": entities,
+        "language": case["expected"].get("language", "es"),
+        "confidence": 0.9,
+        "response_message": "ok",
+    }
+
+
+async def evaluate(corpus: list[dict], concurrency: int, usage_log: list[dict]) -> dict:
+    from app.services.intent import extract_intent
+
+    per_intent: dict[str, dict] = defaultdict(lambda: {"total": 0, "correct": 0})
+    confusion: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    entity_matched = entity_total = language_correct = 0
+    latencies: list[float] = []
+    failures: list[dict] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(case: dict) -> None:
+        nonlocal entity_matched, entity_total, language_correct, errors
+        expected = case["expected"]
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await extract_intent(case["message"], context=case.get("context"))
+            except Exception as exc:
+                errors += 1
+                failures.append({"id": case["id"], "error": repr(exc)})
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        stats = per_intent[expected["intent"]]
+        stats["total"] += 1
+        confusion[expected["intent"]][result.intent.value] += 1
+        if result.intent == expected["intent"]:
+            stats["correct"] += 1
+        else:
+            failures.append({"id": case["id"], "expected": expected["intent"], "got": result.intent.value})
+        matched, total = score_entities(expected.get("entities", {}), result.entities.model_dump())
+        entity_matched += matched
+        entity_total += total
+        language_correct += result.language == expected.get("language", result.language)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(case) for case in corpus))
+    elapsed = time.perf_counter() - started
+
+    answered = sum(s["total"] for s in per_intent.values())
+    correct = sum(s["correct"] for s in per_intent.values())
+    prompt_tokens = sum(u.get("prompt_tokens", 0) for u in usage_log)
+    completion_tokens = sum(u.get("completion_tokens", 0) for u in usage_log)
+    return {
+        "cases": len(corpus),
+        "intent_accuracy": round(correct / answered, 4) if answered else 0.0,
+        "per_intent": {
+            intent: {**s, "accuracy": round(s["correct"] / s["total"], 4)} for intent, s in sorted(per_intent.items())
+        },
+        "confusion": {k: dict(v) for k, v in confusion.items()},
+        "entity_accuracy": round(entity_matched / entity_total, 4) if entity_total else None,
+        "language_accuracy": round(language_correct / answered, 4) if answered else 0.0,
+        "tokens": {
+            "prompt": prompt_tokens,
+            "completion": completion_tokens,
+            "per_request": round((prompt_tokens + completion_tokens) / len(usage_log), 1) if usage_log else 0,
+        },
+        "latency": latency_summary(latencies, errors, elapsed),
+        "failures": failures,
+    }
+
+
+def _usage_hook(usage_log: list[dict]):
+    async def on_response(response: httpx.Response) -> None:
+        await response.aread()
+        if response.status_code != 200:
+            return
+        data = response.json()
+        usage = data.get("usage")
+        if not usage:
+            # Stand-ins may not report usage; estimate from characters
+            request_body = json.loads(response.request.content)
+            prompt = sum(len(m["content"]) for m in request_body["messages"])
+            completion = len(data["choices"][0]["message"]["content"])
+            usage = {"prompt_tokens": prompt // _CHARS_PER_TOKEN, "completion_tokens": completion // _CHARS_PER_TOKEN}
+        usage_log.append(usage)
+
+    return on_response
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.config import settings
+    from app.services import intent
+
+    quiet_logging()
+    settings.intent_cache_enabled = False
+    if args.model:
+        intent._MODEL = args.model
+
+    corpus = load_corpus(Path(args.corpus))
+    recordings_path = Path(args.recordings)
+    recordings = load_recordings(recordings_path)
+    usage_log: list[dict] = []
+    headers = {"Authorization": f"Bearer {settings.openai_api_key or 'replay'}", "Content-Type": "application/json"}
+    hooks = {"response": [_usage_hook(usage_log)]}
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    if args.mode == "replay":
+        fallback = {_user_content(c): _fallback_result(c) for c in corpus} if args.fallback_expected else {}
+        stub = build_replay_stub(recordings, args.latency_ms, fallback)
+        async with serve(stub, args.port, lifespan="off") as url:
+            intent._client = httpx.AsyncClient(
+                base_url=url, headers=headers, timeout=30.0, limits=limits, event_hooks=hooks
+            )
+            report = await evaluate(corpus, args.concurrency, usage_log)
+            report["recording_misses"] = stub.state.misses
+    else:
+        transport = RecordingTransport(recordings) if args.mode == "record" else None
+        intent._client = httpx.AsyncClient(
+            base_url=args.base_url or settings.openai_base_url,
+            headers=headers,
+            timeout=60.0,
+            limits=limits,
+            transport=transport,
+            event_hooks=hooks,
+        )
+        report = await evaluate(corpus, args.concurrency, usage_log)
+        if transport is not None:
+            recordings_path.parent.mkdir(parents=True, exist_ok=True)
+            recordings_path.write_text(json.dumps(transport.recordings, indent=1, ensure_ascii=False))
+            report["recorded"] = len(transport.recordings)
+
+    await intent._client.aclose()
+    intent._client = None
+    return {"params": vars(args), "model": intent._MODEL, **report}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("replay", "record", "live"), default="replay")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS))
+    parser.add_argument("--recordings", default=str(DEFAULT_RECORDINGS))
+    parser.add_argument("--model", help="Override the intent model (default: the one in app.services.intent)")
+    parser.add_argument("--base-url", help="OpenAI-compatible base URL for record/live (default: OPENAI_BASE_URL)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, help="Replay delay (default: the recorded latency)")
+    parser.add_argument(
+        "--fallback-expected", action="store_true",
+        help="Replay: answer unrecorded requests with the expected labels (harness/latency smoke runs)",
+    )
+    parser.add_argument("--port", type=int, default=18003)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/intent_eval-<rev>.json)")
+    args = parser.parse_args()
+
+    if args.mode == "replay" and not args.fallback_expected and not Path(args.recordings).exists():
+        sys.exit(
+            f"No recordings at {args.recordings}. Record them first with --mode record against an\n"
+            "OpenAI-compatible endpoint, or pass --fallback-expected for a harness/latency smoke run."
+        )
+
+    results = asyncio.run(run(args))
+    path = save_results("intent_eval", results, args.output)
+    summary_keys = ("model", "cases", "intent_accuracy", "entity_accuracy", "language_accuracy", "tokens", "latency")
+    print(json.dumps({k: results.get(k) for k in summary_keys} | {"recording_misses": results.get("recording_misses")}, indent=2))
+    print(f"Saved to {path}")
+    if results.get("recording_misses") and not args.fallback_expected:
+        # Accuracy over a partly unanswered corpus means nothing
+        sys.exit(
+            f"{results['recording_misses']} request(s) had no recording (prompt, schema or model changed?). "
+            "Re-record with --mode record."
+        )
+
+
+if __name__ == "__main__":
+    main()
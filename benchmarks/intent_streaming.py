@@ -0,0 +1,147 @@
+"""Time-to-first-action benchmark: streaming vs. blocking intent extraction.
+
+Runs a stub OpenAI /chat/completions endpoint that emits a structured intent
+result at a configurable time-to-first-token and token rate, then measures how
+long it takes until the pipeline can act (state transition, Places search,
+call dispatch) with extract_intent (before) and extract_intent_streaming (after).
+
+    python -m benchmarks.intent_streaming --messages 200 --concurrency 20 --tokens-per-second 80
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from benchmarks._common import latency_summary, quiet_logging, save_results, serve
+
+CANNED_RESULT = {
+    "intent": "search_providers",
+    "entities": {
+        "phone_number": None,
+        "provider_name": None,
+        "service_type": "dentista",
+        "date_preference": "mañana",
+        "time_preference": "a la tarde",
+        "location": "Palermo",
+        "special_requests": None,
+    },
+    "language": "es",
+    "confidence": 0.92,
+    "response_message": (
+        "Dale! Busco dentistas en Palermo que tengan turno mañana a la tarde. "
+        "En un toque te paso las opciones con rating y direccion para que elijas."
+    ),
+}
+
+_CHARS_PER_TOKEN = 4
+
+
+def build_openai_stub(ttft_ms: float, tokens_per_second: float) -> FastAPI:
+    stub = FastAPI()
+    content = json.dumps(CANNED_RESULT, ensure_ascii=False)
+    tokens = [content[i:i + _CHARS_PER_TOKEN] for i in range(0, len(content), _CHARS_PER_TOKEN)]
+    token_delay = 1.0 / tokens_per_second
+
+    @stub.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(ttft_ms / 1000)
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) * token_delay)
+            return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+        async def events():
+            for token in tokens:
+                chunk = {"choices": [{"delta": {"content": token}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return stub
+
+
+async def measure(mode: str, messages: int, concurrency: int) -> dict:
+    from app.services import intent
+
+    first_action: list[float] = []
+    total: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            acted: list[float] = []
+
+            async def on_head(_result) -> None:
+                acted.append((time.perf_counter() - started) * 1000)
+
+            try:
+                # Unique text per message so the intent cache never short-circuits
+                text = f"busco dentista en palermo #{mode}-{i}"
+                if mode == "streaming":
+                    await intent.extract_intent_streaming(text, on_head=on_head)
+                else:
+                    await on_head(await intent.extract_intent(text))
+            except Exception:
+                errors += 1
+                return
+            first_action.append(acted[0])
+            total.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - started
+    return {
+        "time_to_first_action": latency_summary(first_action, errors, elapsed),
+        "time_to_full_result": latency_summary(total, errors),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.services import intent
+
+    quiet_logging()
+    async with serve(build_openai_stub(args.ttft_ms, args.tokens_per_second), args.port, lifespan="off") as url:
+        intent._client = httpx.AsyncClient(base_url=url, timeout=30.0)
+        try:
+            results = {mode: await measure(mode, args.messages, args.concurrency) for mode in ("blocking", "streaming")}
+        finally:
+            await intent._client.aclose()
+            intent._client = None
+
+    before = results["blocking"]["time_to_first_action"]["p50_ms"]
+    after = results["streaming"]["time_to_first_action"]["p50_ms"]
+    return {
+        "params": vars(args),
+        **results,
+        "p50_first_action_saved_ms": round(before - after, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ttft-ms", type=float, default=400.0, help="Simulated time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--port", type=int, default=18002)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/intent_streaming-<rev>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("intent_streaming", results, args.output)
+    print(json.dumps({k: v for k, v in results.items() if k != "params"}, indent=2))
+    print(f"Saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""End-to-end load test: N simulated users through search -> "todos" -> calls -> ranked results.
+
+Starts the upstream simulators (benchmarks.upstreams) and the app on local
+ports, points the app at the simulators, and runs each user's whole flow
+through the real webhooks:
+
+  1. WhatsApp "busco dentista ..."      -> wait for the search results message
+  2. WhatsApp "todos"                    -> wait for "Llamando a N proveedores"
+  3. simulated calls hit /api/tools/* and /api/call-status
+                                         -> wait for the ranked results message
+
+It reports per-stage latency, completed flows per second, tool-webhook and
+status-callback latency as the simulated agent and Twilio saw them, and
+upstream request/error counts. With --app-url it drives an app you started
+yourself instead (e.g. several uvicorn workers). That app needs the
+environment that `python -m benchmarks.upstreams` prints, pointing at
+--sim-port.
+
+    python -m benchmarks.load_e2e --users 100 --concurrency 50 --upstream openai=900:0.4:0.02
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from benchmarks._common import latency_summary, quiet_logging, save_results, serve
+from benchmarks.upstreams import Upstreams, add_arguments, app_environment, from_arguments
+
+STAGES = ("search_results", "calls_started", "ranked_results", "total")
+
+
+def _webhook_payload(phone: str, name: str, text: str) -> dict:
+    return {"entry": [{"changes": [{"value": {
+        "contacts": [{"profile": {"name": name}}],
+        "messages": [{"id": f"wamid.load{uuid.uuid4().hex}", "from": phone, "type": "text", "text": {"body": text}}],
+    }}]}]}
+
+
+def _configure_app(sim_url: str, app_url: str) -> None:
+    """Point the in-process app's settings and cached clients at the simulators."""
+    from app.config import settings
+    from app.services import intent, messages
+
+    for key, value in app_environment(sim_url).items():
+        field = key.lower()
+        setattr(settings, field, value == "true" if value in ("true", "false") else value)
+    settings.app_base_url = app_url
+    intent._client = None
+    messages._client = None
+
+
+async def _user_flow(
+    client: httpx.AsyncClient, upstreams: Upstreams, i: int, timeout: float,
+    latencies: dict[str, list[float]], failures: dict[str, int],
+) -> None:
+    phone = f"1555{i:07d}"
+    stage = "search_results"
+    try:
+        started = time.monotonic()
+        await client.post("/api/whatsapp", json=_webhook_payload(
+            phone, f"Load {i}", f"busco dentista en palermo para manana a la tarde (#{i})",
+        ))
+        index, at = await upstreams.wait_for_message(
+            phone, lambda body: body.startswith(("Encontre", "Here are")), timeout=timeout,
+        )
+        latencies[stage].append((at - started) * 1000)
+
+        stage = "calls_started"
+        todos_at = time.monotonic()
+        await client.post("/api/whatsapp", json=_webhook_payload(phone, f"Load {i}", "todos"))
+        index, at = await upstreams.wait_for_message(
+            phone, lambda body: body.startswith(("Llamando a", "Calling")), after=index + 1, timeout=timeout,
+        )
+        latencies[stage].append((at - todos_at) * 1000)
+
+        stage = "ranked_results"
+        _, at = await upstreams.wait_for_message(
+            phone, lambda body: body.startswith(("*Resultados de", "*Results from")), after=index + 1, timeout=timeout,
+        )
+        latencies[stage].append((at - todos_at) * 1000)
+        latencies["total"].append((at - started) * 1000)
+    except (asyncio.TimeoutError, httpx.HTTPError):
+        failures[stage] += 1
+
+
+async def _drive(app_url: str, upstreams: Upstreams, args: argparse.Namespace) -> dict:
+    latencies: dict[str, list[float]] = {s: [] for s in STAGES}
+    failures: dict[str, int] = {s: 0 for s in STAGES}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=app_url, timeout=30.0, limits=httpx.Limits(max_connections=200)) as client:
+
+        async def one(i: int) -> None:
+            async with semaphore:
+                await _user_flow(client, upstreams, i, args.flow_timeout, latencies, failures)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    completed = len(latencies["total"])
+    return {
+        "params": vars(args),
+        "elapsed_s": round(elapsed, 2),
+        "flows_completed": completed,
+        "flows_failed": failures,
+        "flows_per_second": round(completed / elapsed, 3) if elapsed else 0.0,
+        "stages": {s: latency_summary(latencies[s], failures.get(s, 0)) for s in STAGES},
+        "tools": {t: latency_summary(v) for t, v in sorted(upstreams.tool_latencies.items())},
+        "tool_over_budget": sum(1 for v in upstreams.tool_latencies.values() for ms in v if ms > 500),
+        "status_callbacks": {s: latency_summary(v) for s, v in sorted(upstreams.callback_latencies.items())},
+        "upstreams": upstreams.stats(),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.main import app
+
+    quiet_logging()
+    upstreams = from_arguments(args)
+    try:
+        async with serve(upstreams.app(), args.sim_port, lifespan="off") as sim_url:
+            if args.app_url:
+                return await _drive(args.app_url.rstrip("/"), upstreams, args)
+
+            app_url = f"http://127.0.0.1:{args.app_port}"
+            _configure_app(sim_url, app_url)
+            async with serve(app, args.app_port):
+                return await _drive(app_url, upstreams, args)
+    finally:
+        await upstreams.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50, help="Users in flight at once")
+    parser.add_argument("--flow-timeout", type=float, default=120.0, help="Seconds to wait for each stage")
+    parser.add_argument("--app-port", type=int, default=18000)
+    parser.add_argument("--sim-port", type=int, default=18100)
+    parser.add_argument("--app-url", help="Drive an already running app instead of starting one in-process")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load_e2e-<rev>.json)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("load_e2e", results, args.output)
+    print(json.dumps({k: v for k, v in results.items() if k != "params"}, indent=2))
+    print(f"Saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""Microbenchmarks of pure hot functions, with stored baselines and a regression gate.
+
+Each function runs on synthetic inputs at three sizes (small / medium / large,
+roughly: a quiet conversation, a typical one, and the worst we expect to see).
+A case's time is the median of --repeat timeit rounds, in microseconds.
+
+    python -m benchmarks.microbench                       # measure and save a result file
+    python -m benchmarks.microbench --save-baseline       # 3 passes in fresh processes, stored as the baseline
+    python -m benchmarks.microbench --compare --threshold 20   # exit 1 on a confirmed regression
+
+The baseline also records each case's spread (the range of its pass medians).
+A case may slow down by --threshold percent, or by twice its baseline spread
+if that is larger. Flagged cases are re-measured --confirm times, each in a
+fresh process, and only fail if every re-measurement is still too slow.
+
+Baselines (benchmarks/baselines/, not committed) only mean something on the
+machine that recorded them. Record one on the CI runner or on your machine at
+main, then compare your branch against it. --filter limits the run to cases
+whose name contains the given text.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable
+
+from benchmarks._common import git_revision, save_results
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "microbench.json"
+SIZES = ("small", "medium", "large")
+_SPREAD_FACTOR = 2  # a case may slow down by this many times its baseline spread before failing
+_TODAY = date(2026, 3, 2)  # fixed, so relative dates rank the same on every run
+
+
+@dataclass
+class Case:
+    function: str
+    size: str
+    setup: Callable[[str], Callable[[], object]]  # size -> zero-argument call to time
+
+    @property
+    def name(self) -> str:
+        return f"{self.function}[{self.size}]"
+
+
+def _entities(size: str):
+    from app.schemas.intent import Entities
+
+    if size == "small":
+        return Entities(service_type="dentista")
+    if size == "medium":
+        return Entities(service_type="dentista", date_preference="manana", time_preference="a la tarde")
+    return Entities(
+        phone_number="+5491122334455",
+        provider_name="Consultorio Odontologico Palermo Soho",
+        service_type="dentista",
+        date_preference="el martes que viene o el miercoles",
+        time_preference="entre las 14 y las 18, no antes",
+        location="Palermo, Buenos Aires",
+        special_requests="Es una urgencia, me duele una muela desde ayer. Acepto OSDE 310.",
+    )
+
+
+def _summary(i: int, size: str):
+    from app.services.messages import SmartSummaryResult
+
+    detail = " Tienen estacionamiento y aceptan obras sociales." * (3 if size == "large" else 1)
+    if i % 4 == 0:
+        return SmartSummaryResult(f"Turno confirmado.{detail}", True, "2026-03-03", "15:30", 60, f"Proveedor {i}")
+    if i % 4 == 1:
+        return SmartSummaryResult(f"Ofrecen turno.{detail}", False, f"2026-03-{4 + i % 20:02d}", "10:00")
+    if i % 4 == 2:
+        return SmartSummaryResult(f"No tienen turnos esta semana.{detail}", False)
+    return None
+
+
+def _results(size: str) -> list[dict]:
+    rows = {"small": 3, "medium": 10, "large": 50}[size]
+    return [
+        {
+            "provider_name": f"Proveedor {i}",
+            "phone": f"+5411{i:08d}",
+            "summary": _summary(i, size),
+            "outcome": "failed" if i % 4 == 3 else "completed",
+            "rating": None if i % 7 == 6 else 3.5 + (i % 15) / 10,
+            "total_ratings": 10 * i,
+            "latitude": -34.58 + i / 1000,
+            "longitude": -58.43 - i / 1000,
+        }
+        for i in range(rows)
+    ]
+
+
+def _conversation_state(size: str):
+    from app.services.state import ConversationState, ConversationStatus
+
+    state = ConversationState()
+    if size == "small":
+        state.message_history = ["user: hola"]
+        return state
+    state.status = ConversationStatus.AWAITING_PROVIDER if size == "medium" else ConversationStatus.COMPLETED
+    state.pending_entities = _entities(size)
+    turns = 6 if size == "medium" else 10
+    text = "busco un dentista en palermo para manana" if size == "medium" else "mensaje largo " * 40
+    state.message_history = [f"{'user' if n % 2 else 'assistant'}: {text}" for n in range(turns)]
+    if size == "large":
+        state.provider_phone = "+5491122334455"
+        state.provider_name = "Consultorio Odontologico Palermo Soho"
+        state.call_results = [
+            {"provider": f"Proveedor {n}", "outcome": "has_slots", "slots": [f"2026-03-0{d} 1{d}:00" for d in range(1, 6)]}
+            for n in range(5)
+        ]
+    return state
+
+
+def _build_context(size: str):
+    from app.services.state import build_context
+
+    state = _conversation_state(size)
+    return lambda: build_context(state)
+
+
+def _merge_entities(size: str):
+    from app.schemas.intent import Entities
+    from app.services.state import merge_entities
+
+    existing = None if size == "small" else _entities(size)
+    new = Entities(time_preference="a la manana", location="Belgrano")
+    return lambda: merge_entities(existing, new)
+
+
+def _find_state_by_conversation_id(size: str):
+    """Worst case: the owner is the last of N users, every one with a 3-call campaign."""
+    from app.services import state as conversation_state
+    from app.services.state import MultiCallCampaign, MultiCallProvider, find_state_by_conversation_id
+
+    users = {"small": 100, "medium": 1000, "large": 10000}[size]
+    conversation_state._conversations.clear()
+    for i in range(users):
+        state = conversation_state.get_state(f"54911{i:08d}")
+        providers = [
+            MultiCallProvider(
+                name=f"Proveedor {i}-{j}",
+                phone=f"+5411{i:04d}{j:04d}",
+                call_sid=f"CA{i:06d}{j}",
+                conversation_id=f"conv_{i:06d}_{j}",
+            )
+            for j in range(3)
+        ]
+        state.multi_call = MultiCallCampaign(providers=providers, pending_count=3)
+        state.active_call_ids = [p.conversation_id for p in providers]
+    target = f"CA{users - 1:06d}2"
+    return lambda: find_state_by_conversation_id(target)
+
+
+def _rank_results(size: str):
+    from app.services.preferences import parse_preference
+    from app.services.ranking import rank_results
+
+    results = _results(size)
+    window = parse_preference("esta semana", "a la tarde", today=_TODAY)
+    origin = (-34.5875, -58.4267)
+    return lambda: rank_results(results, window=window, origin=origin, today=_TODAY)
+
+
+def _format_ranked_results(size: str):
+    from app.services.messages import format_ranked_results
+
+    results = _results(size)
+    return lambda: format_ranked_results(results, "es")
+
+
+def _format_transcript(size: str):
+    from app.services.messages import format_transcript
+
+    turns = {"small": 10, "medium": 50, "large": 200}[size]
+    data = {"transcript": [
+        {
+            "role": "agent" if n % 2 == 0 else "user",
+            "message": (
+                f"Hola, llamo para consultar por un turno para el martes {n}. [pausa] Gracias."
+                if n % 2 == 0 else f"Si, tengo disponible a las {9 + n % 9}:00 o a las {9 + n % 9}:30."
+            ),
+        }
+        for n in range(turns)
+    ]}
+    return lambda: format_transcript("Consultorio Palermo", data, "es")
+
+
+def _parse_vcard(size: str):
+    from app.services.contact import parse_vcard
+
+    lines = ["BEGIN:VCARD", "VERSION:3.0", "FN:Dra. Maria Gonzalez"]
+    if size != "small":
+        lines += [
+            "N:Gonzalez;Maria;;Dra.;",
+            "ORG:Consultorio Odontologico Palermo;",
+            "TITLE:Odontologa",
+            "EMAIL;type=INTERNET;type=WORK;type=pref:maria@example.com",
+            "item1.ADR;type=WORK;type=pref:;;Av. Santa Fe 3200;Buenos Aires;;C1425;Argentina",
+            "NOTE:Atiende martes y jueves",
+        ]
+    if size == "large":
+        lines += [f"item{n}.URL;type=pref:https://example.com/{n}" for n in range(2, 20)]
+        lines.append("PHOTO;ENCODING=b;TYPE=JPEG:" + "A" * 8000)
+    lines += ["TEL;type=CELL;type=VOICE;type=pref:+54 9 11 2233-4455", "END:VCARD"]
+    vcard = "\n".join(lines)
+    return lambda: parse_vcard(vcard)
+
+
+def _extract_phone_from_text(size: str):
+    from app.services.contact import extract_phone_from_text
+
+    if size == "small":
+        text = "llama al +54 9 11 2233-4455 por favor"
+    elif size == "medium":
+        text = "Hola, te paso el numero del dentista que me recomendaron. " * 8 + "Es el 11 2233-4455."
+    else:
+        text = "Mensaje largo sin ningun numero de telefono, solo texto de relleno. " * 150
+    return lambda: extract_phone_from_text(text)
+
+
+def _build_calendar_link(size: str):
+    from app.services.calendar import build_calendar_link
+
+    location = None if size == "small" else "Av. Santa Fe 3200, C1425 Buenos Aires, Argentina"
+    description = {
+        "small": None,
+        "medium": "Turno con Dra. Maria Gonzalez",
+        "large": "Turno con Dra. Maria Gonzalez. Traer estudios previos y la credencial de OSDE. " * 10,
+    }[size]
+    return lambda: build_calendar_link("Dentista", "2026-03-03", "15:30", 45, location, description)
+
+
+def _intent_model_validate_json(size: str):
+    from app.schemas.intent import IntentResult
+
+    payload = {
+        "intent": "search_providers",
+        "entities": _entities(size).model_dump(exclude_none=True),
+        "language": "es",
+        "confidence": 0.93,
+        "response_message": "Busco dentistas cerca tuyo." * (1 if size != "large" else 20),
+    }
+    raw = json.dumps(payload)
+    return lambda: IntentResult.model_validate_json(raw)
+
+
+_FUNCTIONS: dict[str, Callable[[str], Callable[[], object]]] = {
+    "build_context": _build_context,
+    "merge_entities": _merge_entities,
+    "find_state_by_conversation_id": _find_state_by_conversation_id,
+    "rank_results": _rank_results,
+    "format_ranked_results": _format_ranked_results,
+    "format_transcript": _format_transcript,
+    "parse_vcard": _parse_vcard,
+    "extract_phone_from_text": _extract_phone_from_text,
+    "build_calendar_link": _build_calendar_link,
+    "IntentResult.model_validate_json": _intent_model_validate_json,
+}
+
+CASES = [Case(function, size, setup) for function, setup in _FUNCTIONS.items() for size in SIZES]
+
+
+def measure(case: Case, repeat: int, min_time: float) -> dict:
+    """Median time per call over `repeat` timeit rounds (microseconds), and the rounds' spread."""
+    call = case.setup(case.size)
+    timer = timeit.Timer(call)
+    number, elapsed = timer.autorange()
+    # autorange aims for 0.2s rounds; scale to min_time so many rounds stay affordable
+    number = max(1, round(number * min_time / max(elapsed, 1e-9)))
+    rounds = sorted(t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number))
+    median = statistics.median(rounds)
+    q1, q3 = rounds[len(rounds) // 4], rounds[(3 * len(rounds)) // 4]
+    return {
+        "median_us": round(median, 3),
+        "best_us": round(rounds[0], 3),
+        "spread_pct": round((q3 - q1) / median * 100, 1) if median else 0.0,
+        "calls_per_round": number,
+    }
+
+
+def _pass_in_subprocess(filter_text: str, repeat: int, min_time: float) -> dict[str, dict]:
+    """One pass in a fresh interpreter: timings shift from one process to the next
+    (memory layout, hash seed), so passes in a single process understate the spread."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "pass.json"
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.microbench", "--filter", filter_text, "--passes", "1",
+             "--repeat", str(repeat), "--min-time", str(min_time), "--output", str(output)],
+            cwd=Path(__file__).parent.parent, stdout=subprocess.DEVNULL, check=True,
+        )
+        return json.loads(output.read_text())["cases"]
+
+
+def measure_all(cases: list[Case], passes: int, repeat: int, min_time: float, filter_text: str = "") -> dict[str, dict]:
+    """Measure every case once in this process, or `passes` times in fresh processes.
+
+    With several passes a case keeps the median of its pass medians, and its
+    spread_pct is the range of the pass medians relative to that median. With
+    one pass it is the rounds' interquartile range.
+    """
+    if passes == 1:
+        samples = {case.name: [measure(case, repeat, min_time)] for case in cases}
+    else:
+        samples = {case.name: [] for case in cases}
+        for i in range(passes):
+            print(f"Pass {i + 1}/{passes}...")
+            for name, run in _pass_in_subprocess(filter_text, repeat, min_time).items():
+                samples[name].append(run)
+    results = {}
+    for case in cases:
+        runs = samples[case.name]
+        medians = [r["median_us"] for r in runs]
+        median = statistics.median(medians)
+        if passes > 1:
+            spread = (max(medians) - min(medians)) / median * 100 if median else 0.0
+        else:
+            spread = runs[0]["spread_pct"]
+        results[case.name] = {
+            "median_us": round(median, 3),
+            "best_us": min(r["best_us"] for r in runs),
+            "spread_pct": round(spread, 1),
+            "passes": passes,
+        }
+        print(f"{case.name:<45} {median:>12.3f} us  ±{spread:.0f}%")
+    return results
+
+
+def allowed_slowdown(baseline_case: dict, threshold_pct: float) -> float:
+    """Slowdown tolerated for a case: the threshold, or more if its baseline was that noisy."""
+    return max(threshold_pct, _SPREAD_FACTOR * baseline_case.get("spread_pct", 0.0))
+
+
+def compare(cases: dict[str, dict], baseline: dict, threshold_pct: float) -> tuple[list[dict], list[str]]:
+    """Change of each case's median against the baseline; returns (rows, names over their allowed slowdown)."""
+    rows, flagged = [], []
+    for name, current in cases.items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            rows.append({"case": name, "baseline_us": None, "current_us": current["median_us"], "change_pct": None})
+            continue
+        change = (current["median_us"] / before["median_us"] - 1) * 100 if before["median_us"] else 0.0
+        allowed = allowed_slowdown(before, threshold_pct)
+        rows.append({
+            "case": name,
+            "baseline_us": before["median_us"],
+            "current_us": current["median_us"],
+            "change_pct": round(change, 1),
+            "allowed_pct": round(allowed, 1),
+        })
+        if change > allowed:
+            flagged.append(name)
+    return rows, flagged
+
+
+def confirm(flagged: list[str], rows: list[dict], baseline: dict, args: argparse.Namespace) -> list[str]:
+    """Re-measure flagged cases in fresh processes; only those still over their allowed slowdown every time count."""
+    regressions = []
+    for name in flagged:
+        medians = [
+            _pass_in_subprocess(name, args.repeat, args.min_time)[name]["median_us"] for _ in range(args.confirm)
+        ]
+        before = baseline["cases"][name]
+        change = (min(medians) / before["median_us"] - 1) * 100
+        row = next(r for r in rows if r["case"] == name)
+        row["confirmed_change_pct"] = round(change, 1)
+        if change > allowed_slowdown(before, args.threshold):
+            regressions.append(name)
+    return regressions
+
+
+def _environment() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=15, help="timeit rounds per case (the median counts)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per round")
+    parser.add_argument("--passes", type=int, help="Passes over all cases, each in a fresh process (default: 3 with --save-baseline, else 1)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline, exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed slowdown in percent (--compare)")
+    parser.add_argument("--confirm", type=int, default=3, help="Re-measurements of a flagged case before it fails")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline file")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/microbench-<rev>.json)")
+    args = parser.parse_args()
+    passes = args.passes or (3 if args.save_baseline else 1)
+
+    selected = [case for case in CASES if args.filter in case.name]
+    cases = measure_all(selected, passes, args.repeat, args.min_time, args.filter)
+
+    results = {"params": vars(args), "environment": _environment(), "cases": cases}
+    exit_code = 0
+    if args.compare:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            sys.exit(f"No baseline at {baseline_path}; record one on this machine with --save-baseline first")
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get("environment", {}) != results["environment"]:
+            print(f"Warning: baseline was recorded on {baseline.get('environment')}, timings may not be comparable")
+        rows, flagged = compare(cases, baseline, args.threshold)
+        if flagged:
+            print(f"\nRe-measuring {len(flagged)} flagged case(s) {args.confirm} times...")
+        regressions = confirm(flagged, rows, baseline, args)
+        results["comparison"] = {
+            "baseline_revision": baseline.get("git_revision"),
+            "rows": rows,
+            "flagged": flagged,
+            "regressions": regressions,
+        }
+        print(f"\nAgainst baseline {baseline.get('git_revision')} (threshold +{args.threshold:g}%, more for noisy cases):")
+        for row in rows:
+            change = "new" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+            if row["case"] in regressions:
+                marker = f"  REGRESSION (allowed +{row['allowed_pct']:g}%, re-measured {row['confirmed_change_pct']:+.1f}%)"
+            elif row["case"] in flagged:
+                marker = f"  noise (re-measured {row['confirmed_change_pct']:+.1f}%)"
+            else:
+                marker = ""
+            print(f"  {row['case']:<45} {change:>8}{marker}")
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed beyond their allowed slowdown")
+            exit_code = 1
+
+    path = save_results("microbench", results, args.output)
+    print(f"Saved to {path}")
+    if args.save_baseline:
+        baseline_path = Path(args.baseline)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        previous = json.loads(baseline_path.read_text())["cases"] if baseline_path.exists() else {}
+        baseline = {
+            "git_revision": git_revision(),
+            "environment": results["environment"],
+            "cases": {**previous, **cases} if args.filter else cases,
+        }
+        baseline_path.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline saved to {baseline_path}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
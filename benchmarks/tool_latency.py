@@ -0,0 +1,186 @@
+"""Latency benchmark for the ElevenLabs tool webhooks.
+
+Starts the FastAPI app and a stub Meta Graph API on local ports, seeds N users
+and M active multi-call campaigns in app.services.state, fires concurrent
+requests at the four /api/tools/* endpoints and reports p50/p95/p99 latency and
+throughput per endpoint. Results are saved as JSON so versions can be compared.
+
+    python -m benchmarks.tool_latency --users 1000 --campaigns 200 --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from benchmarks._common import latency_summary, quiet_logging, save_results, serve
+
+ENDPOINTS = (
+    "report_available_slots",
+    "check_user_preference",
+    "confirm_booking",
+    "end_call_no_availability",
+)
+
+
+def build_graph_stub(latency_ms: float) -> FastAPI:
+    """Minimal Meta Graph API: accepts message sends after a fixed delay."""
+    stub = FastAPI()
+    stub.state.sent = 0
+
+    @stub.post("/{phone_number_id}/messages")
+    async def send_message(phone_number_id: str, request: Request):
+        await request.body()
+        await asyncio.sleep(latency_ms / 1000)
+        stub.state.sent += 1
+        return {"messages": [{"id": f"wamid.bench{stub.state.sent}"}]}
+
+    return stub
+
+
+def seed_state(users: int, campaigns: int) -> list[str]:
+    """Populate conversation state; returns the conversation_ids of active calls."""
+    from app.schemas.intent import Entities, IntentType, Language
+    from app.services.state import (
+        ConversationStatus,
+        MultiCallCampaign,
+        MultiCallProvider,
+        get_state,
+        reset_state,
+    )
+
+    conversation_ids: list[str] = []
+    for i in range(users):
+        phone = f"54911{i:08d}"
+        reset_state(phone)
+        state = get_state(phone)
+        state.language = Language.ES if i % 3 else Language.EN
+        state.pending_intent = IntentType.SEARCH_PROVIDERS
+        state.pending_entities = Entities(
+            service_type="dentista",
+            date_preference="mañana" if i % 2 else "next tuesday",
+            time_preference="entre 2 y 4" if i % 2 else "morning",
+        )
+        state.message_history = [f"user: mensaje {n}" for n in range(10)]
+        if i >= campaigns:
+            continue
+        providers = [
+            MultiCallProvider(
+                name=f"Proveedor {i}-{j}",
+                phone=f"+5411{i:04d}{j:04d}",
+                rating=4.0 + j / 10,
+                total_ratings=100 * j,
+                call_sid=f"CA{i:06d}{j}",
+                conversation_id=f"conv_{i:06d}_{j}",
+            )
+            for j in range(3)
+        ]
+        state.multi_call = MultiCallCampaign(providers=providers, pending_count=len(providers))
+        state.status = ConversationStatus.CALLING
+        for p in providers:
+            state.active_call_ids.extend([p.conversation_id, p.call_sid])
+            conversation_ids.append(p.conversation_id)
+    return conversation_ids
+
+
+def build_payload(endpoint: str, conversation_id: str) -> dict:
+    if endpoint == "report_available_slots":
+        return {
+            "conversation_id": conversation_id,
+            "slots": [{"date": "2026-10-20", "time": "15:00"}, {"date": "2026-10-21", "time": "10:00"}],
+        }
+    if endpoint == "check_user_preference":
+        return {"conversation_id": conversation_id, "proposed_date": "2026-10-20", "proposed_time": "15:00"}
+    if endpoint == "confirm_booking":
+        return {"conversation_id": conversation_id, "date": "2026-10-20", "time": "15:00", "notes": "Traer DNI"}
+    return {"conversation_id": conversation_id, "reason": "no_availability"}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app.config import settings
+    from app.main import app
+
+    quiet_logging()
+    rng = random.Random(args.seed)
+    conversation_ids = seed_state(args.users, args.campaigns)
+
+    async with serve(build_graph_stub(args.graph_latency_ms), args.graph_port) as graph_url:
+        settings.meta_graph_base_url = graph_url
+        async with serve(app, args.app_port) as app_url:
+            jobs = [
+                (
+                    endpoint := rng.choice(ENDPOINTS),
+                    build_payload(
+                        endpoint,
+                        rng.choice(conversation_ids) if rng.random() >= args.miss_ratio else "conv_unknown",
+                    ),
+                )
+                for _ in range(args.requests)
+            ]
+            latencies: dict[str, list[float]] = {e: [] for e in ENDPOINTS}
+            errors: dict[str, int] = {e: 0 for e in ENDPOINTS}
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=30.0) as client:
+
+                async def fire(endpoint: str, payload: dict) -> None:
+                    async with semaphore:
+                        start = time.perf_counter()
+                        try:
+                            resp = await client.post(f"/api/tools/{endpoint}", json=payload)
+                            ok = resp.status_code == 200
+                        except httpx.HTTPError:
+                            ok = False
+                        elapsed_ms = (time.perf_counter() - start) * 1000
+                    if ok:
+                        latencies[endpoint].append(elapsed_ms)
+                    else:
+                        errors[endpoint] += 1
+
+                # Warm-up: imports, connection pool, first-request caches
+                await asyncio.gather(*(fire(e, p) for e, p in jobs[: min(50, len(jobs))]))
+                for e in ENDPOINTS:
+                    latencies[e].clear()
+                    errors[e] = 0
+
+                started = time.perf_counter()
+                await asyncio.gather(*(fire(e, p) for e, p in jobs))
+                elapsed = time.perf_counter() - started
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "params": vars(args),
+        "overall": latency_summary(all_latencies, sum(errors.values()), elapsed),
+        "endpoints": {e: latency_summary(latencies[e], errors[e]) for e in ENDPOINTS},
+        "budget_ms": 500,
+        "over_budget": sum(1 for v in all_latencies if v > 500),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--miss-ratio", type=float, default=0.05, help="Share of requests for unknown conversations")
+    parser.add_argument("--graph-latency-ms", type=float, default=300.0, help="Simulated Graph API latency")
+    parser.add_argument("--app-port", type=int, default=18000)
+    parser.add_argument("--graph-port", type=int, default=18001)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/tool_latency-<rev>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("tool_latency", results, args.output)
+    print(json.dumps({"overall": results["overall"], "endpoints": results["endpoints"]}, indent=2))
+    print(f"Saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
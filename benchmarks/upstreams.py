@@ -0,0 +1,497 @@
+"""Local stand-ins for every upstream Vocero calls, for end-to-end load tests.
+
+One ASGI app serves five simulated APIs, each under its own prefix:
+
+  /graph       Meta Graph: POST /{phone_number_id}/messages, media URL + download
+  /openai      POST /chat/completions, with the intent_result and call_summary
+               structured outputs, blocking or streamed (SSE)
+  /elevenlabs  POST /convai/twilio/register-call (TwiML with a conversation_id),
+               GET /convai/conversations/{id} (transcript matching how the call went)
+  /twilio      POST /Accounts/{sid}/Calls.json, and hang-up
+  /places      POST /places:searchText
+
+Each upstream answers after a log-normal delay (median and spread) and fails
+a configurable share of requests with a 503. Calls accepted by /twilio are
+played out the way a real call reaches Vocero. After a ring delay, the
+simulator either posts a failure status to the StatusCallback, or posts
+"in-progress", calls the /api/tools/* webhooks as the voice agent would,
+and posts "completed". WhatsApp messages sent to each user are recorded,
+so a load generator can wait for them (see benchmarks.load_e2e).
+
+Run standalone against a separately started app:
+
+    python -m benchmarks.upstreams --port 18100 --upstream openai=900:0.4:0.01
+
+then start the app with the environment it prints.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+UPSTREAMS = ("graph", "openai", "elevenlabs", "twilio", "places")
+
+_CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class Behavior:
+    """Latency (log-normal: median, sigma) and error rate of one simulated upstream."""
+
+    median_ms: float
+    sigma: float = 0.3
+    error_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Behavior":
+        """"median_ms[:sigma[:error_rate]]", e.g. "900:0.4:0.01"."""
+        parts = [float(p) for p in spec.split(":")]
+        return cls(*parts)
+
+    def delay(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+
+DEFAULT_BEHAVIORS = {
+    "graph": Behavior(250),
+    "openai": Behavior(900, 0.4),
+    "elevenlabs": Behavior(400),
+    "twilio": Behavior(300),
+    "places": Behavior(350),
+}
+
+
+@dataclass
+class CallScript:
+    """How simulated calls play out (rates are shares of all placed calls)."""
+
+    ring_ms: float = 3000.0
+    talk_ms: float = 9000.0
+    no_answer_rate: float = 0.1
+    busy_rate: float = 0.05
+    book_rate: float = 0.55  # of answered calls: agent books through confirm_booking
+    silent_rate: float = 0.15  # of answered calls: agent reports nothing, so the summary needs the LLM
+    tokens_per_second: float = 80.0  # streamed /chat/completions
+
+
+@dataclass
+class _Call:
+    sid: str
+    conversation_id: str
+    to: str
+    outcome: str = "pending"
+    slot: tuple[str, str] | None = None
+
+
+@dataclass
+class Upstreams:
+    behaviors: dict[str, Behavior] = field(default_factory=lambda: dict(DEFAULT_BEHAVIORS))
+    script: CallScript = field(default_factory=CallScript)
+    provider_pool: int = 0  # >0: Places phones come from a pool this size, so users share providers
+    seed: int = 42
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.seed)
+        self.requests: dict[str, int] = defaultdict(int)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.messages: dict[str, list[tuple[float, str]]] = defaultdict(list)
+        self.tool_latencies: dict[str, list[float]] = defaultdict(list)
+        self.callback_latencies: dict[str, list[float]] = defaultdict(list)
+        self.webhook_errors = 0
+        self.call_outcomes: dict[str, int] = defaultdict(int)
+        self._calls: dict[str, _Call] = {}
+        self._by_conversation: dict[str, _Call] = {}
+        self._message_events: dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+        self._tasks: set[asyncio.Task] = set()
+        self._client: httpx.AsyncClient | None = None
+
+    # --- Helpers ---
+
+    async def _upstream(self, name: str) -> None:
+        """Count, delay and maybe fail one upstream request."""
+        self.requests[name] += 1
+        behavior = self.behaviors[name]
+        await asyncio.sleep(behavior.delay(self.rng))
+        if self.rng.random() < behavior.error_rate:
+            self.errors[name] += 1
+            raise HTTPException(status_code=503, detail=f"simulated {name} error")
+
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        """Client for the simulated agent's and Twilio's requests back to the app."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=500))
+        return self._client
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def wait_for_message(self, to: str, predicate, after: int = 0, timeout: float = 120.0) -> tuple[int, float]:
+        """Wait for a WhatsApp message to `to` (index >= after) matching predicate; returns (index, monotonic time)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            sent = self.messages.get(to, [])
+            for index in range(after, len(sent)):
+                if predicate(sent[index][1]):
+                    return index, sent[index][0]
+            after = len(sent)
+            event = self._message_events[to]
+            event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"no matching message to {to}")
+            await asyncio.wait_for(event.wait(), remaining)
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "call_outcomes": dict(self.call_outcomes),
+            "webhook_errors": self.webhook_errors,
+        }
+
+    # --- Canned content ---
+
+    def _intent(self, text: str) -> dict:
+        lowered = text.lower()
+        searching = any(word in lowered for word in ("busco", "necesito", "search", "find"))
+        return {
+            "intent": "search_providers" if searching else "help",
+            "entities": {
+                "phone_number": None,
+                "provider_name": None,
+                "service_type": "dentista" if searching else None,
+                "date_preference": "manana" if searching else None,
+                "time_preference": "a la tarde" if searching else None,
+                "location": "Palermo" if searching else None,
+                "special_requests": None,
+            },
+            "language": "es",
+            "confidence": 0.93,
+            "response_message": (
+                "Dale! Busco dentistas en Palermo con turno manana a la tarde. Ya te paso opciones."
+                if searching else "Contame que turno necesitas y lo busco."
+            ),
+        }
+
+    def _summary(self, call: _Call | None) -> dict:
+        booked = call is not None and call.slot is not None
+        return {
+            "summary_text": (
+                f"Te consegui turno el *{call.slot[0]}* a las *{call.slot[1]}*." if booked
+                else "No tenian turnos para esta semana."
+            ),
+            "booking_confirmed": booked,
+            "date": call.slot[0] if booked else None,
+            "time": call.slot[1] if booked else None,
+            "duration_minutes": 45 if booked else None,
+            "provider_name": None,
+            "address": None,
+            "service_description": "Consulta odontologica" if booked else None,
+            "notes": None,
+        }
+
+    def _transcript(self, call: _Call | None) -> list[dict]:
+        turns = [
+            {"role": "agent", "message": "Hola, buenas tardes. Llamo para pedir un turno con el dentista."},
+            {"role": "user", "message": "Si, como no. Para cuando lo necesita?"},
+            {"role": "agent", "message": "Para manana a la tarde, si puede ser."},
+        ]
+        if call is not None and call.slot:
+            turns += [
+                {"role": "user", "message": f"Tengo el {call.slot[0]} a las {call.slot[1]}."},
+                {"role": "agent", "message": "Perfecto, lo reservo. Muchas gracias."},
+            ]
+        else:
+            turns += [
+                {"role": "user", "message": "Uh, esta semana no tengo nada, estamos completos."},
+                {"role": "agent", "message": "Entiendo, gracias igual."},
+            ]
+        return turns
+
+    def _place(self, query: str, index: int) -> dict:
+        if self.provider_pool:
+            number = self.rng.randrange(self.provider_pool)
+        else:
+            number = self.rng.randrange(10_000_000)
+        phone = f"+54 11 4{number // 10000 % 1000:03d}-{number % 10000:04d}"
+        return {
+            "id": f"sim_{uuid.uuid4().hex[:12]}",
+            "displayName": {"text": f"Sim Consultorio {number}"},
+            "formattedAddress": f"Av. Santa Fe {1000 + index * 37}, Palermo, CABA",
+            "internationalPhoneNumber": phone,
+            "rating": round(self.rng.uniform(3.8, 5.0), 1),
+            "userRatingCount": self.rng.randrange(5, 900),
+            "location": {"latitude": -34.58 + self.rng.uniform(-0.02, 0.02), "longitude": -58.42 + self.rng.uniform(-0.02, 0.02)},
+        }
+
+    # --- Simulated calls ---
+
+    async def _post_status(self, callback_url: str, call: _Call, status: str) -> None:
+        started = time.perf_counter()
+        try:
+            resp = await self._http.post(callback_url, data={"CallSid": call.sid, "CallStatus": status})
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            self.webhook_errors += 1
+            return
+        self.callback_latencies[status].append((time.perf_counter() - started) * 1000)
+
+    async def _tool(self, app_url: str, tool: str, payload: dict) -> dict | None:
+        started = time.perf_counter()
+        try:
+            resp = await self._http.post(f"{app_url}/api/tools/{tool}", json=payload)
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            self.webhook_errors += 1
+            return None
+        self.tool_latencies[tool].append((time.perf_counter() - started) * 1000)
+        return resp.json()
+
+    async def _play_call(self, call: _Call, callback_url: str) -> None:
+        script = self.script
+        await asyncio.sleep(script.ring_ms / 1000)
+        roll = self.rng.random()
+        if roll < script.no_answer_rate:
+            call.outcome = "no-answer"
+        elif roll < script.no_answer_rate + script.busy_rate:
+            call.outcome = "busy"
+        if call.outcome != "pending":
+            self.call_outcomes[call.outcome] += 1
+            await self._post_status(callback_url, call, call.outcome)
+            return
+
+        await self._post_status(callback_url, call, "in-progress")
+        app_url = callback_url.rsplit("/api/", 1)[0]
+        step = script.talk_ms / 3000
+        roll = self.rng.random()
+        day = f"2026-{self.rng.randrange(1, 13):02d}-{self.rng.randrange(1, 29):02d}"
+        slot = (day, f"{self.rng.randrange(9, 19):02d}:{self.rng.choice(('00', '30'))}")
+        conv = call.conversation_id
+
+        await asyncio.sleep(step)
+        if roll < script.silent_rate:
+            call.outcome = "silent"
+        else:
+            await self._tool(app_url, "report_available_slots", {
+                "conversation_id": conv, "slots": [{"date": slot[0], "time": slot[1]}],
+            })
+            await asyncio.sleep(step)
+            if roll < script.silent_rate + script.book_rate:
+                check = await self._tool(app_url, "check_user_preference", {
+                    "conversation_id": conv, "proposed_date": slot[0], "proposed_time": slot[1],
+                })
+                booked = await self._tool(app_url, "confirm_booking", {
+                    "conversation_id": conv, "date": slot[0], "time": slot[1], "notes": "Traer DNI",
+                }) if check is not None else None
+                call.outcome = "booked" if booked and booked.get("booking_confirmed") else "rejected"
+                if call.outcome == "booked":
+                    call.slot = slot
+            else:
+                await self._tool(app_url, "end_call_no_availability", {"conversation_id": conv, "reason": "no_availability"})
+                call.outcome = "no_availability"
+        await asyncio.sleep(step)
+        self.call_outcomes[call.outcome] += 1
+        await self._post_status(callback_url, call, "completed")
+
+    # --- App ---
+
+    def app(self) -> FastAPI:
+        sim = FastAPI(title="Vocero upstream simulators")
+
+        # Meta Graph
+        @sim.post("/graph/{phone_number_id}/messages")
+        async def graph_send(phone_number_id: str, request: Request):
+            body = await request.json()
+            await self._upstream("graph")
+            to = body.get("to", "")
+            self.messages[to].append((time.monotonic(), body.get("text", {}).get("body", "")))
+            self._message_events[to].set()
+            return {"messages": [{"id": f"wamid.sim{uuid.uuid4().hex[:16]}"}]}
+
+        @sim.get("/graph/media/{media_id}")
+        async def graph_media_download(media_id: str):
+            await self._upstream("graph")
+            return Response(content=b"\x00" * 16_000, media_type="audio/ogg")
+
+        @sim.get("/graph/{media_id}")
+        async def graph_media_url(media_id: str, request: Request):
+            await self._upstream("graph")
+            return {"url": str(request.url_for("graph_media_download", media_id=media_id))}
+
+        # OpenAI
+        @sim.post("/openai/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            schema = body.get("response_format", {}).get("json_schema", {}).get("name")
+            await self._upstream("openai")
+            if schema == "call_summary":
+                match = re.search(r"conv_sim_[0-9a-f]+", json.dumps(body["messages"]))
+                content = json.dumps(self._summary(self._by_conversation.get(match.group(0)) if match else None))
+            else:
+                content = json.dumps(self._intent(body["messages"][-1]["content"]), ensure_ascii=False)
+            usage = {"prompt_tokens": 600, "completion_tokens": len(content) // _CHARS_PER_TOKEN}
+            if not body.get("stream"):
+                return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+
+            token_delay = 1.0 / self.script.tokens_per_second
+
+            async def events():
+                for i in range(0, len(content), _CHARS_PER_TOKEN):
+                    yield f"data: {json.dumps({'choices': [{'delta': {'content': content[i:i + _CHARS_PER_TOKEN]}}]})}\n\n"
+                    await asyncio.sleep(token_delay)
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        # ElevenLabs
+        @sim.post("/elevenlabs/convai/twilio/register-call")
+        async def register_call(request: Request):
+            body = await request.json()
+            await self._upstream("elevenlabs")
+            conversation_id = f"conv_sim_{uuid.uuid4().hex[:16]}"
+            twiml = (
+                '<?xml version="1.0" encoding="UTF-8"?><Response><Connect>'
+                '<Stream url="wss://sim.invalid/convai">'
+                f'<Parameter name="conversation_id" value="{conversation_id}"/>'
+                f'<Parameter name="to_number" value="{body.get("to_number", "")}"/>'
+                "</Stream></Connect></Response>"
+            )
+            return Response(content=twiml, media_type="application/xml")
+
+        @sim.get("/elevenlabs/convai/conversations/{conversation_id}")
+        async def conversation(conversation_id: str):
+            await self._upstream("elevenlabs")
+            call = self._by_conversation.get(conversation_id)
+            # Tag the transcript so the summary stub knows which call it is looking at
+            transcript = self._transcript(call)
+            transcript[0]["message"] += f" ({conversation_id})"
+            return {
+                "conversation_id": conversation_id,
+                "status": "done",
+                "transcript": transcript,
+                "metadata": {"call_duration_secs": round(self.script.talk_ms / 1000)},
+                "analysis": {"call_successful": "success" if call and call.slot else "failure"},
+            }
+
+        # Twilio
+        @sim.post("/twilio/Accounts/{account_sid}/Calls.json")
+        async def create_call(account_sid: str, request: Request):
+            form = await request.form()
+            await self._upstream("twilio")
+            match = re.search(r'name="conversation_id"\s+value="([^"]+)"', str(form.get("Twiml", "")))
+            call = _Call(sid=f"CA{uuid.uuid4().hex}", conversation_id=match.group(1) if match else "", to=str(form.get("To", "")))
+            self._calls[call.sid] = call
+            if call.conversation_id:
+                self._by_conversation[call.conversation_id] = call
+            callback_url = str(form.get("StatusCallback", ""))
+            if callback_url:
+                self._spawn(self._play_call(call, callback_url))
+            return {"sid": call.sid, "status": "queued", "to": call.to}
+
+        @sim.post("/twilio/Accounts/{account_sid}/Calls/{call_sid}.json")
+        async def update_call(account_sid: str, call_sid: str):
+            await self._upstream("twilio")
+            return {"sid": call_sid, "status": "completed"}
+
+        # Google Places
+        @sim.post("/places/places:searchText")
+        async def search_text(request: Request):
+            body = await request.json()
+            await self._upstream("places")
+            count = int(body.get("maxResultCount", 5))
+            return {"places": [self._place(body.get("textQuery", ""), i) for i in range(count)]}
+
+        return sim
+
+
+def app_environment(base_url: str) -> dict[str, str]:
+    """Settings that point the Vocero app at a simulator served at base_url."""
+    return {
+        "META_GRAPH_BASE_URL": f"{base_url}/graph",
+        "OPENAI_BASE_URL": f"{base_url}/openai",
+        "ELEVENLABS_BASE_URL": f"{base_url}/elevenlabs",
+        "TWILIO_BASE_URL": f"{base_url}/twilio",
+        "GOOGLE_PLACES_BASE_URL": f"{base_url}/places",
+        # Any non-empty credentials: the simulators don't check them
+        "META_PHONE_NUMBER_ID": "sim",
+        "META_ACCESS_TOKEN": "sim",
+        "OPENAI_API_KEY": "sim",
+        "ELEVENLABS_API_KEY": "sim",
+        "TWILIO_ACCOUNT_SID": "ACsim",
+        "TWILIO_AUTH_TOKEN": "sim",
+        "GOOGLE_PLACES_API_KEY": "sim",
+        "CALL_SCREENING_ENABLED": "false",
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Simulator options shared with benchmarks.load_e2e."""
+    parser.add_argument(
+        "--upstream", action="append", default=[], metavar="NAME=MEDIAN_MS[:SIGMA[:ERROR_RATE]]",
+        help=f"Latency/errors of one upstream ({', '.join(UPSTREAMS)}); repeatable",
+    )
+    parser.add_argument("--ring-ms", type=float, default=3000.0)
+    parser.add_argument("--talk-ms", type=float, default=9000.0)
+    parser.add_argument("--no-answer-rate", type=float, default=0.1)
+    parser.add_argument("--busy-rate", type=float, default=0.05)
+    parser.add_argument("--book-rate", type=float, default=0.55)
+    parser.add_argument("--silent-rate", type=float, default=0.15)
+    parser.add_argument("--provider-pool", type=int, default=0, help="Share providers between users (0 = all distinct)")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def from_arguments(args: argparse.Namespace) -> Upstreams:
+    behaviors = dict(DEFAULT_BEHAVIORS)
+    for spec in args.upstream:
+        name, _, value = spec.partition("=")
+        if name not in UPSTREAMS:
+            raise SystemExit(f"Unknown upstream {name!r} (one of {', '.join(UPSTREAMS)})")
+        behaviors[name] = Behavior.parse(value)
+    script = CallScript(
+        ring_ms=args.ring_ms, talk_ms=args.talk_ms, no_answer_rate=args.no_answer_rate,
+        busy_rate=args.busy_rate, book_rate=args.book_rate, silent_rate=args.silent_rate,
+    )
+    return Upstreams(behaviors=behaviors, script=script, provider_pool=args.provider_pool, seed=args.seed)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=18100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    upstreams = from_arguments(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    print("Point the app at the simulators with:")
+    for key, value in app_environment(base_url).items():
+        print(f"  {key}={value}")
+    print("and APP_BASE_URL set to the app's own URL (status callbacks and tool calls go there).")
+    uvicorn.run(upstreams.app(), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()